@@ -0,0 +1,225 @@
+from typing import Callable, Dict, Optional
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select, update
+
+from models.models import Reserva, StatusReserva, TarefaAgendada
+from analise import foto, registrar_alteracoes
+from caches import incrementar_versao_cache, VERSAO_RESERVAS
+from disponibilidade import grade_ocupacao
+from eventos import publicar_reserva
+from arquivamento import arquivar_lote
+from database import iniciar_escrita, sessao_avulsa, executar
+from metricas import Contador, Histograma, LIMITES_SEGUNDOS
+import config
+
+# Tarefas Periódicas
+#
+# Um laço asyncio por processo, iniciado no lifespan, roda as tarefas de manutenção das
+# reservas: pendentes cujo dia passou viram EXPIRADA e aprovadas cujo horário terminou
+# viram CONCLUIDA. Assim elas deixam de entrar nas verificações de conflito e na grade
+# de ocupação (STATUS_ATIVOS). Depois do horizonte de arquivamento, as encerradas saem
+# da tabela de reservas (arquivamento.py).
+#
+# Cada tarefa trabalha em lotes de config.AGENDADOR_LOTE reservas, um UPDATE por lote e
+# uma transação curta por vez, com uma pausa entre elas para os demais escritores. Com
+# vários workers, a linha da tarefa em TarefaAgendada serve de trava: só quem consegue
+# gravar o próprio nome nela (trava vencida e execução devida) roda a tarefa.
+
+log = logging.getLogger("labkey.agendador")
+
+# Identifica o processo dono da trava
+DONO = f"{socket.gethostname()}:{os.getpid()}"
+
+execucoes = Contador("labkey_tarefa_execucoes_total", "Execuções das tarefas periódicas por resultado",
+                     ("tarefa", "resultado"))
+alteradas = Contador("labkey_tarefa_reservas_alteradas_total", "Reservas alteradas pelas tarefas periódicas", ("tarefa",))
+duracao_tarefa = Histograma("labkey_tarefa_duracao_segundos", "Duração de cada execução das tarefas periódicas",
+                            ("tarefa",), LIMITES_SEGUNDOS)
+duracao_lote = Histograma("labkey_tarefa_lote_segundos", "Duração de cada lote (transação de escrita) das tarefas periódicas",
+                          ("tarefa",), LIMITES_SEGUNDOS)
+
+
+# Tarefas (cada chamada processa um lote e retorna quantas reservas alterou)
+
+def _encerrar_lote(session: Session, de: StatusReserva, para: StatusReserva, condicao, lote: int, acao: str) -> int:
+    """Move até 'lote' reservas de 'de' para 'para' numa transação curta."""
+    iniciar_escrita(session)
+    linhas = session.exec(
+        select(Reserva.id, Reserva.sala_id, Reserva.usuario_id, Reserva.data, Reserva.hora_inicio, Reserva.hora_fim, Reserva.status)
+        .where(Reserva.status == de, condicao)
+        .order_by(Reserva.data, Reserva.id)
+        .limit(lote)
+    ).all()
+    if not linhas:
+        session.commit()
+        return 0
+
+    session.exec(
+        update(Reserva).where(Reserva.id.in_([l.id for l in linhas]), Reserva.status == de).values(status=para, versao=Reserva.versao + 1),
+        execution_options={"synchronize_session": False},
+    )
+    registrar_alteracoes(session, [(foto(l), foto(l)._replace(status=para)) for l in linhas])
+    versao = incrementar_versao_cache(session, VERSAO_RESERVAS)
+    session.commit()
+
+    for linha in linhas:
+        # Só os atributos lidos pela grade e pelo evento (sem o custo de montar um modelo ORM)
+        reserva = SimpleNamespace(**{**linha._asdict(), "status": para})
+        grade_ocupacao.registrar(reserva, versao)
+        publicar_reserva(reserva, acao)
+    return len(linhas)
+
+
+def expirar_pendentes(session: Session, agora: datetime, lote: int) -> int:
+    """Pendentes cujo dia já passou sem decisão viram EXPIRADA."""
+    return _encerrar_lote(session, StatusReserva.PENDENTE, StatusReserva.EXPIRADA, Reserva.data < agora.date(), lote, "expirada")
+
+
+def concluir_aprovadas(session: Session, agora: datetime, lote: int) -> int:
+    """Aprovadas cujo horário já terminou viram CONCLUIDA."""
+    terminou = or_(Reserva.data < agora.date(), and_(Reserva.data == agora.date(), Reserva.hora_fim <= agora.time()))
+    return _encerrar_lote(session, StatusReserva.APROVADA, StatusReserva.CONCLUIDA, terminou, lote, "concluida")
+
+
+TAREFAS: Dict[str, Callable[[Session, datetime, int], int]] = {
+    "expirar_pendentes": expirar_pendentes,
+    "concluir_aprovadas": concluir_aprovadas,
+    "arquivar_reservas": arquivar_lote,
+}
+
+
+# Trava entre Workers
+
+def reservar_tarefa(session: Session, nome: str, dono: str = DONO) -> bool:
+    """
+    Tenta pegar a trava da tarefa: só funciona se ela estiver livre (ou vencida) e se a
+    execução já for devida. Retorna True se este processo deve rodar a tarefa agora.
+    """
+    iniciar_escrita(session)
+    agora = datetime.now()
+    resultado = session.exec(
+        update(TarefaAgendada)
+        .where(TarefaAgendada.nome == nome)
+        .where(or_(TarefaAgendada.travada_ate.is_(None), TarefaAgendada.travada_ate < agora))
+        .where(or_(TarefaAgendada.proxima_execucao.is_(None), TarefaAgendada.proxima_execucao <= agora))
+        .values(dono=dono, travada_ate=agora + timedelta(seconds=config.AGENDADOR_TRAVA_S))
+    )
+    if resultado.rowcount == 0:
+        if session.get(TarefaAgendada, nome) is not None:
+            session.commit()
+            return False
+        session.add(TarefaAgendada(nome=nome, dono=dono, travada_ate=agora + timedelta(seconds=config.AGENDADOR_TRAVA_S)))
+    try:
+        session.commit()
+    except IntegrityError:
+        # Outro worker criou a linha ao mesmo tempo (e ficou com a trava)
+        session.rollback()
+        return False
+    return True
+
+
+def liberar_tarefa(session: Session, nome: str, inicio: datetime, total: int, duracao: float,
+                   erro: Optional[str] = None, dono: str = DONO):
+    """Solta a trava e registra a execução; a próxima fica para daqui a um intervalo."""
+    # Um lote que falhou deixa a sessão com a transação desfeita pendente
+    session.rollback()
+    iniciar_escrita(session)
+    session.exec(
+        update(TarefaAgendada)
+        .where(TarefaAgendada.nome == nome, TarefaAgendada.dono == dono)
+        .values(
+            travada_ate=None, proxima_execucao=inicio + timedelta(seconds=config.AGENDADOR_INTERVALO_S),
+            ultima_execucao=inicio, ultima_duracao_ms=round(duracao * 1000, 1), ultimas_alteradas=total, ultimo_erro=erro,
+        )
+    )
+    session.commit()
+
+
+def listar_tarefas(session: Session) -> list:
+    return [t.model_dump() for t in session.exec(select(TarefaAgendada).order_by(TarefaAgendada.nome)).all()]
+
+
+# Execução
+
+async def executar_tarefa(nome: str) -> Optional[int]:
+    """
+    Roda a tarefa em lotes até esgotar o que há para alterar (ou até metade da validade da
+    trava). Retorna quantas reservas foram alteradas, ou None se outro worker está com ela
+    ou ainda não é hora.
+    """
+    async with sessao_avulsa() as session:
+        if not await executar(session, reservar_tarefa, nome):
+            execucoes.incrementar((nome, "ignorada"))
+            return None
+
+        agora = datetime.now().replace(microsecond=0)
+        inicio = time.perf_counter()
+        prazo = inicio + config.AGENDADOR_TRAVA_S / 2
+        total, erro = 0, None
+        try:
+            while True:
+                inicio_lote = time.perf_counter()
+                quantidade = await executar(session, TAREFAS[nome], agora, config.AGENDADOR_LOTE)
+                duracao_lote.observar((nome,), time.perf_counter() - inicio_lote)
+                total += quantidade
+                if quantidade < config.AGENDADOR_LOTE or time.perf_counter() > prazo:
+                    break
+                await asyncio.sleep(config.AGENDADOR_PAUSA_MS / 1000)
+        except Exception as e:
+            erro = repr(e)
+            log.exception("Tarefa '%s' falhou após alterar %d reserva(s).", nome, total)
+        finally:
+            duracao = time.perf_counter() - inicio
+            duracao_tarefa.observar((nome,), duracao)
+            alteradas.incrementar((nome,), total)
+            execucoes.incrementar((nome, "erro" if erro else "ok"))
+            await executar(session, liberar_tarefa, nome, agora, total, duracao, erro)
+
+    if total:
+        log.info("Tarefa '%s': %d reserva(s) alterada(s) em %.2f s.", nome, total, duracao)
+    return total
+
+
+async def _laco():
+    # Atraso inicial aleatório: os workers não disputam a trava todos ao mesmo tempo
+    await asyncio.sleep(random.uniform(1, 5))
+    while True:
+        for nome in TAREFAS:
+            try:
+                await executar_tarefa(nome)
+            except Exception:
+                log.exception("Falha ao agendar a tarefa '%s'.", nome)
+        # Cada worker verifica a cada intervalo; a trava garante uma execução por intervalo
+        await asyncio.sleep(config.AGENDADOR_INTERVALO_S * random.uniform(0.5, 1.0))
+
+
+class Agendador:
+    def __init__(self):
+        self._tarefa: Optional[asyncio.Task] = None
+
+    def iniciar(self):
+        """Inicia o laço de tarefas periódicas no event loop atual (chamar no lifespan)."""
+        if config.AGENDADOR_ATIVO and self._tarefa is None:
+            self._tarefa = asyncio.get_running_loop().create_task(_laco(), name="labkey-agendador")
+
+    async def parar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+
+
+agendador = Agendador()
@@ -0,0 +1,287 @@
+from typing import Iterable, NamedTuple, Optional, Tuple
+from collections import defaultdict
+from datetime import date, time, timedelta
+from sqlalchemy import func, delete, select, case
+from sqlalchemy.orm import Session as SessionORM
+from sqlalchemy.dialects import sqlite, postgresql
+
+from models.models import (
+    Reserva, ReservaArquivada, Sala, Usuario, StatusReserva, ResumoSemanalSala, ResumoHorarioSala, ResumoUsuario
+)
+
+# Análise de Uso das Salas
+#
+# As estatísticas saem de três tabelas de resumo (sala x semana x status, sala x hora x status
+# e usuário x status), mantidas de forma incremental: cada escrita de reserva informa o estado
+# antes e depois dela e os contadores são ajustados na mesma transação, com um UPSERT em lote.
+# O painel só lê essas tabelas pequenas, então o tempo de resposta não depende do histórico.
+# reconstruir_resumos() recalcula tudo a partir das reservas, ativas e arquivadas (agregando em SQL).
+
+STATUS_OCUPAM = (StatusReserva.PENDENTE, StatusReserva.APROVADA, StatusReserva.CONCLUIDA)
+# Uma reserva aprovada continua contando como aprovada depois de concluída (agendador.py)
+STATUS_APROVADAS = (StatusReserva.APROVADA, StatusReserva.CONCLUIDA)
+# Período do painel quando nenhuma data é informada (as últimas N semanas)
+SEMANAS_PADRAO_PAINEL = 12
+
+
+class FotoReserva(NamedTuple):
+    """Os campos de uma reserva que entram nos resumos, num dado momento."""
+    sala_id: int
+    usuario_id: int
+    data: date
+    hora_inicio: time
+    hora_fim: time
+    status: StatusReserva
+
+
+def foto(reserva) -> FotoReserva:
+    """Copia os campos relevantes de uma reserva (objeto ORM ou linha de consulta)."""
+    return FotoReserva(reserva.sala_id, reserva.usuario_id, reserva.data, reserva.hora_inicio, reserva.hora_fim, reserva.status)
+
+
+def _minutos(inicio: time, fim: time) -> int:
+    return (fim.hour * 60 + fim.minute) - (inicio.hour * 60 + inicio.minute)
+
+
+def _horas(inicio: time, fim: time) -> range:
+    """Horas do dia (0-23) ocupadas, ao menos em parte, pelo intervalo."""
+    return range(inicio.hour, fim.hour + (1 if (fim.minute or fim.second or fim.microsecond) else 0))
+
+
+def _conexao(origem):
+    """Aceita uma Session (usa a conexão da transação corrente) ou uma Connection."""
+    return origem.connection() if isinstance(origem, SessionORM) else origem
+
+
+class _Deltas:
+    """Acumula as variações dos três resumos antes de gravá-las de uma vez."""
+
+    def __init__(self):
+        self.semanal = defaultdict(lambda: [0, 0])
+        self.horario = defaultdict(int)
+        self.usuario = defaultdict(lambda: [0, 0])
+
+    def somar_sala(self, sala_id, data, inicio, fim, status, peso):
+        semana = data - timedelta(days=data.weekday())
+        item = self.semanal[(sala_id, semana, status)]
+        item[0] += peso
+        item[1] += peso * _minutos(inicio, fim)
+        for hora in _horas(inicio, fim):
+            self.horario[(sala_id, hora, status)] += peso
+
+    def somar_usuario(self, usuario_id, inicio, fim, status, peso):
+        item = self.usuario[(usuario_id, status)]
+        item[0] += peso
+        item[1] += peso * _minutos(inicio, fim)
+
+    def somar(self, reserva: FotoReserva, peso: int):
+        self.somar_sala(reserva.sala_id, reserva.data, reserva.hora_inicio, reserva.hora_fim, reserva.status, peso)
+        self.somar_usuario(reserva.usuario_id, reserva.hora_inicio, reserva.hora_fim, reserva.status, peso)
+
+    def gravar(self, conn):
+        _upsert(conn, ResumoSemanalSala, ["sala_id", "semana", "status"], [
+            {"sala_id": s, "semana": w, "status": st, "quantidade": q, "minutos": m}
+            for (s, w, st), (q, m) in self.semanal.items() if q or m
+        ])
+        _upsert(conn, ResumoHorarioSala, ["sala_id", "hora", "status"], [
+            {"sala_id": s, "hora": h, "status": st, "quantidade": q}
+            for (s, h, st), q in self.horario.items() if q
+        ])
+        _upsert(conn, ResumoUsuario, ["usuario_id", "status"], [
+            {"usuario_id": u, "status": st, "quantidade": q, "minutos": m}
+            for (u, st), (q, m) in self.usuario.items() if q or m
+        ])
+
+
+def _upsert(conn, modelo, chaves, linhas):
+    """INSERT ... ON CONFLICT DO UPDATE somando os contadores (executemany)."""
+    if not linhas:
+        return
+    tabela = modelo.__table__
+    insert_dialeto = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}[conn.dialect.name]
+    comando = insert_dialeto(tabela)
+    contadores = [c for c in linhas[0] if c not in chaves]
+    comando = comando.on_conflict_do_update(
+        index_elements=chaves,
+        set_={c: tabela.c[c] + comando.excluded[c] for c in contadores},
+    )
+    conn.execute(comando, linhas)
+
+
+# Manutenção dos Resumos
+
+def registrar_alteracoes(origem, alteracoes: Iterable[Tuple[Optional[FotoReserva], Optional[FotoReserva]]]):
+    """
+    Ajusta os resumos na transação corrente (sem commit). Cada alteração é o par
+    (antes, depois) de uma reserva: None em 'antes' para criação, em 'depois' para remoção.
+    """
+    deltas = _Deltas()
+    for antes, depois in alteracoes:
+        if antes == depois:
+            continue
+        if antes is not None:
+            deltas.somar(antes, -1)
+        if depois is not None:
+            deltas.somar(depois, +1)
+    deltas.gravar(_conexao(origem))
+
+
+def reconstruir_resumos(origem):
+    """
+    Recalcula os três resumos a partir de todas as reservas, inclusive as arquivadas. A
+    agregação pesada fica no banco (GROUP BY por sala/dia/horário/status e por
+    usuário/horário/status); o Python só distribui cada grupo pelas semanas e horas, com o
+    peso igual à contagem do grupo.
+    """
+    conn = _conexao(origem)
+    for modelo in (ResumoSemanalSala, ResumoHorarioSala, ResumoUsuario):
+        conn.execute(delete(modelo))
+
+    deltas = _Deltas()
+    for tabela in (Reserva, ReservaArquivada):
+        por_sala = (
+            select(tabela.sala_id, tabela.data, tabela.hora_inicio, tabela.hora_fim, tabela.status, func.count())
+            .group_by(tabela.sala_id, tabela.data, tabela.hora_inicio, tabela.hora_fim, tabela.status)
+            .execution_options(yield_per=5000)
+        )
+        for sala_id, data, inicio, fim, status, quantidade in conn.execute(por_sala):
+            deltas.somar_sala(sala_id, data, inicio, fim, status, quantidade)
+
+        por_usuario = (
+            select(tabela.usuario_id, tabela.hora_inicio, tabela.hora_fim, tabela.status, func.count())
+            .group_by(tabela.usuario_id, tabela.hora_inicio, tabela.hora_fim, tabela.status)
+            .execution_options(yield_per=5000)
+        )
+        for usuario_id, inicio, fim, status, quantidade in conn.execute(por_usuario):
+            deltas.somar_usuario(usuario_id, inicio, fim, status, quantidade)
+
+    deltas.gravar(conn)
+
+
+# Painel
+
+def _taxa(parte: int, total: int) -> Optional[float]:
+    return round(parte / total, 4) if total else None
+
+
+def painel(
+    origem,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    sala_id: Optional[int] = None,
+    limite_usuarios: int = 10,
+    limite_picos: int = 3,
+) -> dict:
+    """
+    Monta o painel de uso: por sala, horas reservadas por semana, reservas por status, taxas
+    de aprovação/rejeição e horários de pico; e os usuários que mais reservam.
+    O período (por semana; padrão: as últimas SEMANAS_PADRAO_PAINEL) vale para as séries
+    semanais e as taxas; horários de pico e usuários consideram todo o histórico.
+    """
+    conn = _conexao(origem)
+
+    periodo = timedelta(weeks=SEMANAS_PADRAO_PAINEL)
+    if data_fim is None:
+        data_fim = data_inicio + periodo if data_inicio is not None else date.today()
+    if data_inicio is None:
+        data_inicio = data_fim - periodo
+    # Semanas (de segunda-feira) do período, com ou sem reservas: base das médias semanais
+    primeira_semana = data_inicio - timedelta(days=data_inicio.weekday())
+    semanas_periodo = max(1, (data_fim - primeira_semana).days // 7 + 1)
+
+    consulta = (
+        select(ResumoSemanalSala.sala_id, ResumoSemanalSala.semana, ResumoSemanalSala.status,
+               ResumoSemanalSala.quantidade, ResumoSemanalSala.minutos)
+        .where(ResumoSemanalSala.quantidade > 0)
+        .where(ResumoSemanalSala.semana >= primeira_semana)
+        .where(ResumoSemanalSala.semana <= data_fim)
+    )
+    if sala_id is not None:
+        consulta = consulta.where(ResumoSemanalSala.sala_id == sala_id)
+
+    salas = {}
+    # Uma linha por (sala, semana, status): acumula com chaves do próprio enum e converte no fim
+    for id_sala, inicio_semana, status_linha, quantidade, minutos in conn.execute(
+        consulta.order_by(ResumoSemanalSala.sala_id, ResumoSemanalSala.semana)
+    ):
+        sala = salas.get(id_sala)
+        if sala is None:
+            sala = salas[id_sala] = {"reservas": dict.fromkeys(StatusReserva, 0), "minutos": dict.fromkeys(StatusReserva, 0), "semanas": {}}
+        sala["reservas"][status_linha] += quantidade
+        sala["minutos"][status_linha] += minutos
+        semana = sala["semanas"].get(inicio_semana)
+        if semana is None:
+            semana = sala["semanas"][inicio_semana] = {"semana": inicio_semana, "horas_aprovadas": 0.0, "horas_pendentes": 0.0}
+        if status_linha in STATUS_APROVADAS:
+            semana["horas_aprovadas"] = round(semana["horas_aprovadas"] + minutos / 60, 2)
+        elif status_linha is StatusReserva.PENDENTE:
+            semana["horas_pendentes"] = round(minutos / 60, 2)
+
+    # Horários de pico: reservas que ocupam a sala (pendentes, aprovadas e concluídas) por hora do dia
+    total_hora = func.sum(ResumoHorarioSala.quantidade)
+    consulta_picos = (
+        select(ResumoHorarioSala.sala_id, ResumoHorarioSala.hora, total_hora.label("reservas"))
+        .where(ResumoHorarioSala.status.in_(STATUS_OCUPAM))
+        .group_by(ResumoHorarioSala.sala_id, ResumoHorarioSala.hora)
+        .having(total_hora > 0)
+        .order_by(ResumoHorarioSala.sala_id, total_hora.desc(), ResumoHorarioSala.hora)
+    )
+    if sala_id is not None:
+        consulta_picos = consulta_picos.where(ResumoHorarioSala.sala_id == sala_id)
+    picos = defaultdict(list)
+    for linha in conn.execute(consulta_picos):
+        if len(picos[linha.sala_id]) < limite_picos:
+            picos[linha.sala_id].append({"hora": f"{linha.hora:02d}:00", "reservas": linha.reservas})
+
+    nomes = dict(conn.execute(select(Sala.id, Sala.nome)).all())
+    resultado_salas = []
+    for id_sala, dados in salas.items():
+        reservas = {status_item.value: total for status_item, total in dados["reservas"].items()}
+        minutos = {status_item.value: total for status_item, total in dados["minutos"].items()}
+        aprovadas = sum(reservas[s.value] for s in STATUS_APROVADAS)
+        rejeitadas = reservas[StatusReserva.REJEITADA.value]
+        minutos_aprovados = sum(minutos[s.value] for s in STATUS_APROVADAS)
+        semanas = list(dados["semanas"].values())
+        resultado_salas.append({
+            "sala_id": id_sala,
+            "sala_nome": nomes.get(id_sala),
+            "reservas_por_status": reservas,
+            "horas_aprovadas": round(minutos_aprovados / 60, 2),
+            "horas_pendentes": round(minutos[StatusReserva.PENDENTE.value] / 60, 2),
+            "media_horas_aprovadas_por_semana": round(minutos_aprovados / 60 / semanas_periodo, 2),
+            "taxa_aprovacao": _taxa(aprovadas, aprovadas + rejeitadas),
+            "taxa_rejeicao": _taxa(rejeitadas, aprovadas + rejeitadas),
+            "taxa_cancelamento": _taxa(reservas[StatusReserva.CANCELADA.value], sum(reservas.values())),
+            "semanas": semanas,
+            "horarios_pico": picos.get(id_sala, []),
+        })
+
+    # Usuários com mais reservas (todas as situações), com o detalhe das aprovadas
+    total_usuario = func.sum(ResumoUsuario.quantidade)
+    aprovadas_usuario = func.sum(case((ResumoUsuario.status.in_(STATUS_APROVADAS), ResumoUsuario.quantidade), else_=0))
+    minutos_aprovados = func.sum(case((ResumoUsuario.status.in_(STATUS_APROVADAS), ResumoUsuario.minutos), else_=0))
+    consulta_usuarios = (
+        select(ResumoUsuario.usuario_id, Usuario.nome, total_usuario.label("reservas"),
+               aprovadas_usuario.label("aprovadas"), minutos_aprovados.label("minutos_aprovados"))
+        .outerjoin(Usuario, Usuario.id == ResumoUsuario.usuario_id)
+        .group_by(ResumoUsuario.usuario_id, Usuario.nome)
+        .having(total_usuario > 0)
+        .order_by(total_usuario.desc(), ResumoUsuario.usuario_id)
+        .limit(limite_usuarios)
+    )
+    top_usuarios = [
+        {
+            "usuario_id": linha.usuario_id,
+            "nome": linha.nome,
+            "reservas": linha.reservas,
+            "aprovadas": linha.aprovadas,
+            "horas_aprovadas": round(linha.minutos_aprovados / 60, 2),
+        }
+        for linha in conn.execute(consulta_usuarios)
+    ]
+
+    return {
+        "periodo": {"data_inicio": data_inicio, "data_fim": data_fim, "semanas": semanas_periodo},
+        "salas": resultado_salas,
+        "top_usuarios": top_usuarios,
+    }
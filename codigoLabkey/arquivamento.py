@@ -0,0 +1,98 @@
+"""
+Arquivamento das reservas antigas: as já encerradas (fora de STATUS_ATIVOS), sem chave
+ainda fora e com data anterior ao horizonte (config.ARQUIVO_HORIZONTE_DIAS) passam da
+tabela 'reserva' para 'reservaarquivada', com o mesmo ID. Assim a tabela usada pelas
+listagens, pela grade de ocupação e pelas verificações de conflito fica do tamanho dos
+últimos meses.
+
+Cada lote é um INSERT ... SELECT seguido de um DELETE na mesma transação curta. O
+agendador (agendador.py) roda o arquivamento periodicamente; este script serve para
+esvaziar de uma vez um histórico acumulado. Os resumos de uso não mudam: a reserva
+arquivada continua contando nas estatísticas. As reservas arquivadas são lidas quando
+pedido explicitamente: na exportação (arquivadas=true) e em reconstruir_resumos.
+
+Uso (a partir de codigoLabkey/):
+    python arquivamento.py [--horizonte-dias 365] [--lote 500]
+"""
+from typing import Optional
+from datetime import date, datetime, timedelta
+import argparse
+import time
+
+from sqlalchemy import delete, func, insert, literal
+from sqlmodel import Session, select
+
+from models.models import Reserva, ReservaArquivada, PosseChave
+from conflitos import STATUS_ATIVOS
+from caches import incrementar_versao_cache, VERSAO_RESERVAS
+from database import engine, create_db, iniciar_escrita
+import config
+
+# Colunas copiadas para o arquivo, na mesma ordem nas duas tabelas
+COLUNAS = ("id", "data", "hora_inicio", "hora_fim", "status", "usuario_id", "sala_id", "versao")
+
+
+def data_limite(agora: datetime, horizonte_dias: Optional[int] = None) -> Optional[date]:
+    """Reservas com data anterior a esta podem ser arquivadas (None = arquivamento desligado)."""
+    horizonte_dias = config.ARQUIVO_HORIZONTE_DIAS if horizonte_dias is None else horizonte_dias
+    return agora.date() - timedelta(days=horizonte_dias) if horizonte_dias > 0 else None
+
+
+def arquivar_lote(session: Session, agora: datetime, lote: int, horizonte_dias: Optional[int] = None) -> int:
+    """Move até 'lote' reservas encerradas e antigas para o arquivo; retorna quantas moveu."""
+    limite = data_limite(agora, horizonte_dias)
+    if limite is None:
+        return 0
+    iniciar_escrita(session)
+    # Reserva com a chave ainda fora fica até a devolução: a posse aponta para ela
+    com_chave = select(PosseChave.reserva_id).where(PosseChave.reserva_id.is_not(None))
+    ids = session.exec(
+        select(Reserva.id)
+        .where(Reserva.data < limite, Reserva.status.not_in(STATUS_ATIVOS), Reserva.id.not_in(com_chave))
+        .order_by(Reserva.data, Reserva.id)
+        .limit(lote)
+    ).all()
+    if not ids:
+        session.commit()
+        return 0
+
+    origem = select(*(getattr(Reserva, c) for c in COLUNAS), literal(agora)).where(Reserva.id.in_(ids))
+    session.execute(insert(ReservaArquivada).from_select([*COLUNAS, "arquivada_em"], origem))
+    session.execute(delete(Reserva).where(Reserva.id.in_(ids)))
+    # Somem das listagens: as ETags baseadas na versão das reservas mudam
+    incrementar_versao_cache(session, VERSAO_RESERVAS)
+    session.commit()
+    return len(ids)
+
+
+def contar(session: Session) -> dict:
+    return {
+        "reserva": session.exec(select(func.count()).select_from(Reserva)).one(),
+        "reservaarquivada": session.exec(select(func.count()).select_from(ReservaArquivada)).one(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--horizonte-dias", type=int, default=config.ARQUIVO_HORIZONTE_DIAS,
+                        help="arquiva as reservas encerradas com data anterior a hoje menos N dias")
+    parser.add_argument("--lote", type=int, default=config.AGENDADOR_LOTE, help="reservas por transação")
+    args = parser.parse_args()
+
+    create_db()
+    agora = datetime.now().replace(microsecond=0)
+    inicio = time.perf_counter()
+    total = 0
+    with Session(engine) as session:
+        print(f"Antes: {contar(session)}")
+        while True:
+            quantidade = arquivar_lote(session, agora, args.lote, args.horizonte_dias)
+            total += quantidade
+            print(f"\r  {total:,} reserva(s) arquivada(s)", end="", flush=True)
+            if quantidade < args.lote:
+                break
+        print(f"\nDepois: {contar(session)} em {time.perf_counter() - inicio:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Scripts de benchmark do LabKey (executar a partir de codigoLabkey/: python -m benchmarks.<script>)
@@ -0,0 +1,90 @@
+"""
+Benchmark das tarefas periódicas (agendador.py): encerrar todas as reservas passadas numa
+transação só contra em lotes de config.AGENDADOR_LOTE, enquanto uma thread faz pequenas
+escritas sem parar (como as rotas de reserva). Mede o tempo total da tarefa e a espera
+dessas escritas pelo lock de escrita.
+
+Uso (a partir de codigoLabkey/):
+    python -m benchmarks.bench_agendador [tamanho1 tamanho2 ...] [--lote 500]
+"""
+import argparse
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from sqlmodel import SQLModel, Session
+
+import agendador
+import config
+from analise import reconstruir_resumos
+from caches import incrementar_versao_cache
+from database import criar_engine, iniciar_escrita
+from benchmarks.bench_conflitos import popular
+from benchmarks.cliente_http import percentil
+
+TAMANHOS_PADRAO = [10_000, 100_000, 300_000]
+
+
+def escritor(engine, parar: threading.Event, latencias: list):
+    """Escritas curtas e contínuas; cada latência inclui a espera pelo lock."""
+    with Session(engine) as session:
+        while not parar.is_set():
+            inicio = time.perf_counter()
+            iniciar_escrita(session)
+            incrementar_versao_cache(session, "bench")
+            session.commit()
+            latencias.append(time.perf_counter() - inicio)
+            time.sleep(0.005)
+
+
+def rodar(engine, lote: int):
+    """Roda as duas tarefas com o tamanho de lote dado; retorna (segundos, alteradas, latências do escritor)."""
+    parar, latencias = threading.Event(), []
+    thread = threading.Thread(target=escritor, args=(engine, parar, latencias))
+    thread.start()
+    time.sleep(0.2)
+    agora = datetime.now().replace(microsecond=0)
+    inicio = time.perf_counter()
+    total = 0
+    with Session(engine) as session:
+        for tarefa in agendador.TAREFAS.values():
+            while True:
+                quantidade = tarefa(session, agora, lote)
+                total += quantidade
+                if quantidade < lote:
+                    break
+                time.sleep(config.AGENDADOR_PAUSA_MS / 1000)
+    duracao = time.perf_counter() - inicio
+    parar.set()
+    thread.join()
+    return duracao, total, latencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("tamanhos", nargs="*", type=int, default=TAMANHOS_PADRAO)
+    parser.add_argument("--lote", type=int, default=config.AGENDADOR_LOTE)
+    args = parser.parse_args()
+
+    print(f"{'reservas':>9} | {'modo':<18} | {'alteradas':>9} | {'tarefa s':>8} | {'escrita p50 ms':>14} | {'p99 ms':>8} | {'máx ms':>8}")
+    for tamanho in args.tamanhos:
+        for nome, lote in (("transação única", tamanho + 1), (f"lotes de {args.lote}", args.lote)):
+            with tempfile.TemporaryDirectory() as pasta:
+                engine = criar_engine(f"sqlite:///{Path(pasta) / 'agendador.db'}")
+                SQLModel.metadata.create_all(engine)
+                random.seed(42)
+                popular(engine, tamanho)
+                with Session(engine) as session:
+                    reconstruir_resumos(session)
+                    session.commit()
+                duracao, total, latencias = rodar(engine, lote)
+                engine.dispose()
+            print(f"{tamanho:>9} | {nome:<18} | {total:>9} | {duracao:>8.2f} | {percentil(latencias, 50) * 1000:>14.2f} | "
+                  f"{percentil(latencias, 99) * 1000:>8.1f} | {max(latencias) * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark do painel de uso (analise.painel) com históricos de vários anos: tempo da carga
+completa dos resumos (reconstruir_resumos) e latência do painel lido das tabelas de resumo,
+comparada com a de ler todas as reservas como objetos para calcular o mesmo em Python.
+
+Uso (a partir de codigoLabkey/):
+    python -m benchmarks.bench_analise [tamanho1 tamanho2 ...]
+"""
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from sqlmodel import SQLModel, Session, select
+
+import analise
+from database import criar_engine
+from models.models import Reserva
+from benchmarks.bench_conflitos import popular
+from benchmarks.cliente_http import percentil
+
+TAMANHOS_PADRAO = [10_000, 100_000, 1_000_000]
+REPETICOES = 50
+# Fim do histórico gerado por bench_conflitos.popular (2020-01-01 + 2000 dias)
+FIM_HISTORICO = date(2025, 6, 1)
+PERIODOS = {"12 semanas": timedelta(weeks=12), "1 ano": timedelta(days=365)}
+
+
+def latencias(session, periodo: timedelta):
+    tempos = []
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        analise.painel(session, FIM_HISTORICO - periodo, FIM_HISTORICO)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos), percentil(tempos, 95)
+
+
+def main():
+    tamanhos = [int(t) for t in sys.argv[1:]] or TAMANHOS_PADRAO
+    colunas = "".join(f" {f'{nome} p50/p95(ms)':>25}" for nome in PERIODOS)
+    print(f"{'reservas':>10} {'reconstrução(s)':>16}{colunas} {'carregar objetos(ms)':>21}")
+    for tamanho in tamanhos:
+        with tempfile.TemporaryDirectory() as pasta:
+            engine = criar_engine(f"sqlite:///{Path(pasta) / 'analise.db'}")
+            SQLModel.metadata.create_all(engine)
+            popular(engine, tamanho)
+
+            with Session(engine) as session:
+                inicio = time.perf_counter()
+                analise.reconstruir_resumos(session)
+                session.commit()
+                reconstrucao = time.perf_counter() - inicio
+
+                medidas = [latencias(session, periodo) for periodo in PERIODOS.values()]
+
+                # Referência: só o custo de trazer todas as reservas para o Python
+                inicio = time.perf_counter()
+                session.exec(select(Reserva)).all()
+                carregar = (time.perf_counter() - inicio) * 1000
+            engine.dispose()
+
+        colunas = "".join(f" {f'{p50:.1f} / {p95:.1f}':>25}" for p50, p95 in medidas)
+        print(f"{tamanho:>10} {reconstrucao:>16.2f}{colunas} {carregar:>21.0f}")
+
+
+if __name__ == "__main__":
+    main()
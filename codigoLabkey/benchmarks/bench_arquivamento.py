@@ -0,0 +1,122 @@
+"""
+Benchmark do arquivamento (arquivamento.py): consultas da tabela de reservas antes e
+depois de mover para o arquivo o histórico além do horizonte, o tempo do próprio
+arquivamento e o da exportação com e sem as reservas arquivadas.
+
+O histórico sintético cobre os últimos ANOS anos; as reservas passadas estão encerradas
+(concluídas, expiradas, rejeitadas ou canceladas) e as das próximas semanas, ativas.
+
+Uso (a partir de codigoLabkey/):
+    python -m benchmarks.bench_arquivamento [tamanho1 tamanho2 ...] [--horizonte-dias 365]
+"""
+import argparse
+import random
+import tempfile
+import time as relogio
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+
+from sqlmodel import SQLModel, Session, insert, select, func
+
+import exportacao
+from arquivamento import arquivar_lote
+from conflitos import buscar_conflito
+from consultas import paginar_reservas
+from database import criar_engine
+from models.models import Usuario, Sala, Reserva, StatusReserva, TipoUsuario, FiltroReservas
+
+TAMANHOS_PADRAO = [100_000, 1_000_000]
+ANOS = 6
+NUM_SALAS = 100
+NUM_USUARIOS = 2_000
+REPETICOES = 200
+ENCERRADAS = [StatusReserva.CONCLUIDA] * 6 + [StatusReserva.EXPIRADA, StatusReserva.REJEITADA, StatusReserva.CANCELADA]
+
+
+def popular(engine, total: int):
+    hoje = date.today()
+    with Session(engine) as session:
+        session.exec(insert(Usuario), params=[
+            {"nome": f"Usuário {i}", "email": f"u{i}@bench.com", "tipo": TipoUsuario.COMUM, "senha_hash": "x"}
+            for i in range(NUM_USUARIOS)
+        ])
+        session.exec(insert(Sala), params=[{"nome": f"Sala {i}", "capacidade": 20} for i in range(1, NUM_SALAS + 1)])
+        lote = []
+        for _ in range(total):
+            dias = random.randint(-30, ANOS * 365)
+            hora = random.randint(7, 21)
+            lote.append({
+                "data": hoje - timedelta(days=dias), "hora_inicio": time(hora), "hora_fim": time(hora, 50),
+                "status": random.choice(ENCERRADAS) if dias > 0 else random.choice([StatusReserva.PENDENTE, StatusReserva.APROVADA]),
+                "usuario_id": random.randint(1, NUM_USUARIOS), "sala_id": random.randint(1, NUM_SALAS),
+            })
+            if len(lote) == 50_000:
+                session.exec(insert(Reserva), params=lote)
+                lote = []
+        if lote:
+            session.exec(insert(Reserva), params=lote)
+        session.commit()
+
+
+def cronometrar(funcao, repeticoes: int = REPETICOES) -> float:
+    """Latência média (ms) de 'funcao'."""
+    inicio = relogio.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (relogio.perf_counter() - inicio) * 1000 / repeticoes
+
+
+def medir(engine) -> dict:
+    hoje = date.today()
+    with Session(engine) as session:
+        sala = lambda: random.randint(1, NUM_SALAS)
+        return {
+            "reservas na tabela": session.exec(select(func.count()).select_from(Reserva)).one(),
+            "listagem (1ª página)": cronometrar(lambda: paginar_reservas(session)),
+            "listagem sala + canceladas": cronometrar(
+                lambda: paginar_reservas(session, FiltroReservas(sala_id=sala(), status=StatusReserva.CANCELADA)), 20),
+            "minhas reservas": cronometrar(
+                lambda: paginar_reservas(session, FiltroReservas(usuario_id=random.randint(1, NUM_USUARIOS)))),
+            "conflito": cronometrar(lambda: buscar_conflito(session, sala(), hoje + timedelta(days=3), time(9), time(10))),
+            "exportação (s)": cronometrar(lambda: sum(1 for _ in exportacao.exportar(engine, None, "csv")), 1) / 1000,
+            "exportação + arquivo (s)": cronometrar(
+                lambda: sum(1 for _ in exportacao.exportar(engine, None, "csv", arquivadas=True)), 1) / 1000,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("tamanhos", nargs="*", type=int, default=TAMANHOS_PADRAO)
+    parser.add_argument("--horizonte-dias", type=int, default=365)
+    parser.add_argument("--lote", type=int, default=5_000)
+    args = parser.parse_args()
+
+    for tamanho in args.tamanhos:
+        with tempfile.TemporaryDirectory() as pasta:
+            engine = criar_engine(f"sqlite:///{Path(pasta) / 'arquivo.db'}")
+            SQLModel.metadata.create_all(engine)
+            random.seed(42)
+            popular(engine, tamanho)
+            antes = medir(engine)
+
+            inicio = relogio.perf_counter()
+            arquivadas = 0
+            with Session(engine) as session:
+                agora = datetime.now().replace(microsecond=0)
+                while (quantidade := arquivar_lote(session, agora, args.lote, args.horizonte_dias)):
+                    arquivadas += quantidade
+            duracao = relogio.perf_counter() - inicio
+
+            depois = medir(engine)
+            engine.dispose()
+
+        print(f"\n{tamanho:,} reservas ({ANOS} anos); {arquivadas:,} arquivadas em {duracao:.1f} s "
+              f"({arquivadas / duracao:,.0f}/s, lotes de {args.lote})")
+        print(f"  {'ms por consulta':<28} | {'antes':>10} | {'depois':>10}")
+        for nome in antes:
+            formatar = (lambda v: f"{v:,}") if isinstance(antes[nome], int) else (lambda v: f"{v:.2f}")
+            print(f"  {nome:<28} | {formatar(antes[nome]):>10} | {formatar(depois[nome]):>10}")
+
+
+if __name__ == "__main__":
+    main()
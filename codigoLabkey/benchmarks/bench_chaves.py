@@ -0,0 +1,130 @@
+"""
+Benchmark do controle de chaves: "quem está com cada chave" e "chaves atrasadas" lidos da
+tabela de posse (chaves.listar_posses) contra a mesma resposta derivada do histórico
+(último evento de cada sala), para históricos de tamanhos diferentes. Mede também o
+custo de uma retirada seguida da devolução (chaves.retirar_chave / devolver_chave).
+
+Uso (a partir de codigoLabkey/):
+    python -m benchmarks.bench_chaves [tamanho1 tamanho2 ...]
+"""
+import random
+import sys
+import tempfile
+import time as relogio
+from datetime import datetime, time, timedelta
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlmodel import SQLModel, Session, insert
+
+import chaves
+from database import criar_engine
+from models.models import (
+    Usuario, Sala, Reserva, StatusReserva, TipoUsuario, EventoChave, PosseChave, TipoEventoChave,
+    RetiradaChaveInput, DevolucaoChaveInput
+)
+
+TAMANHOS_PADRAO = [10_000, 1_000_000, 5_000_000]
+NUM_SALAS = 200
+# Fração das salas com a chave retirada no fim do histórico
+FRACAO_RETIRADAS = 0.2
+REPETICOES = 200
+LOTE = 50_000
+
+# A resposta sem a tabela de posse: o último evento de cada sala, se for uma retirada
+PELO_HISTORICO = text("""
+    SELECT e.sala_id, s.nome, u.nome, e.reserva_id, e.momento
+    FROM eventochave e
+    JOIN (SELECT sala_id, MAX(id) AS ultimo FROM eventochave GROUP BY sala_id) u_e ON u_e.ultimo = e.id
+    JOIN sala s ON s.id = e.sala_id
+    JOIN usuario u ON u.id = e.usuario_id
+    WHERE e.tipo = 'RETIRADA'
+""")
+
+
+def popular(engine, total: int):
+    """'total' eventos alternando retirada/devolução por sala; algumas salas terminam com a chave fora."""
+    with Session(engine) as session:
+        session.exec(insert(Usuario), params=[
+            {"nome": f"Bench {i}", "email": f"bench{i}@labkey.com", "tipo": TipoUsuario.COMUM if i else TipoUsuario.ADMINISTRADOR,
+             "senha_hash": "x"} for i in range(100)
+        ])
+        session.exec(insert(Sala), params=[{"nome": f"Sala {i}", "capacidade": 20} for i in range(1, NUM_SALAS + 1)])
+
+        inicio = datetime(2020, 1, 1, 7)
+        agora = datetime.now().replace(microsecond=0)
+        retiradas = set(random.sample(range(1, NUM_SALAS + 1), int(NUM_SALAS * FRACAO_RETIRADAS)))
+        por_sala = total // NUM_SALAS
+        lote, posses = [], []
+        proximo_id = 1
+        for sala_id in range(1, NUM_SALAS + 1):
+            # Número par de eventos (termina devolvida) ou ímpar (termina retirada)
+            n = por_sala - (por_sala % 2) + (1 if sala_id in retiradas else 0)
+            for k in range(n):
+                momento = inicio + timedelta(hours=k)
+                usuario_id = 1 + (k // 2) % 99
+                lote.append({"id": proximo_id, "tipo": TipoEventoChave.RETIRADA if k % 2 == 0 else TipoEventoChave.DEVOLUCAO,
+                             "sala_id": sala_id, "usuario_id": usuario_id, "registrado_por": 100, "momento": momento})
+                if k == n - 1 and k % 2 == 0:
+                    posses.append({"sala_id": sala_id, "usuario_id": usuario_id, "evento_id": proximo_id, "retirada_em": momento,
+                                   "devolver_ate": agora + timedelta(hours=random.choice([-2, 2]))})
+                proximo_id += 1
+                if len(lote) == LOTE:
+                    session.exec(insert(EventoChave), params=lote)
+                    lote = []
+        if lote:
+            session.exec(insert(EventoChave), params=lote)
+        if posses:
+            session.exec(insert(PosseChave), params=posses)
+
+        # Uma reserva aprovada em andamento por sala livre, para medir retirada e devolução
+        livres = [sala_id for sala_id in range(1, NUM_SALAS + 1) if sala_id not in retiradas]
+        session.exec(insert(Reserva), params=[
+            {"data": agora.date(), "hora_inicio": time(0, 0), "hora_fim": time(23, 59), "status": StatusReserva.APROVADA,
+             "usuario_id": 1, "sala_id": sala_id} for sala_id in livres
+        ])
+        session.commit()
+        session.exec(text("ANALYZE"))
+        return proximo_id - 1, len(posses)
+
+
+def cronometrar(funcao, repeticoes: int = REPETICOES) -> float:
+    """Latência média (ms) de 'funcao'."""
+    t0 = relogio.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (relogio.perf_counter() - t0) * 1000 / repeticoes
+
+
+def medir(engine):
+    with Session(engine) as session:
+        posse = cronometrar(lambda: chaves.listar_posses(session))
+        atrasadas = cronometrar(lambda: chaves.listar_posses(session, somente_atrasadas=True))
+        historico = cronometrar(lambda: session.exec(PELO_HISTORICO).all(), repeticoes=3)
+        assert len(session.exec(PELO_HISTORICO).all()) == len(chaves.listar_posses(session))
+
+        reservas = session.exec(text("SELECT id, sala_id FROM reserva")).all()
+        t0 = relogio.perf_counter()
+        for reserva_id, sala_id in reservas:
+            chaves.retirar_chave(session, RetiradaChaveInput(reserva_id=reserva_id), 100)
+            chaves.devolver_chave(session, DevolucaoChaveInput(sala_id=sala_id), 100)
+        ciclo = (relogio.perf_counter() - t0) * 1000 / len(reservas)
+    return posse, atrasadas, historico, ciclo
+
+
+def main():
+    tamanhos = [int(t) for t in sys.argv[1:]] or TAMANHOS_PADRAO
+    random.seed(42)
+    print(f"{'eventos':>10} | {'com a chave':>11} | {'posse ms':>9} | {'atrasadas ms':>12} | {'pelo histórico ms':>17} | {'retirada+devolução ms':>21}")
+    for total in tamanhos:
+        with tempfile.TemporaryDirectory() as pasta:
+            engine = criar_engine(f"sqlite:///{Path(pasta) / 'chaves.db'}")
+            SQLModel.metadata.create_all(engine)
+            eventos, retiradas = popular(engine, total)
+            posse, atrasadas, historico, ciclo = medir(engine)
+            engine.dispose()
+        print(f"{eventos:>10} | {retiradas:>11} | {posse:>9.3f} | {atrasadas:>12.3f} | {historico:>17.1f} | {ciclo:>21.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Teste de estresse da concorrência otimista: administradores e usuários fazem, ao mesmo
+tempo, leitura-alteração-gravação sobre poucas salas e reservas.
+
+- Salas: cada administrador lê a sala (GET, com a ETag), "pensa" alguns ms e grava a
+  descrição, que guarda um contador, com o valor lido + 1. No fim, o contador de cada sala
+  deve ser igual ao número de gravações confirmadas (200); a diferença são atualizações
+  perdidas.
+- Reservas: usuários editam a própria reserva (hora de término) enquanto administradores
+  aprovam ou rejeitam as mesmas reservas, cada um a partir da versão lida na listagem. Uma
+  gravação confirmada cuja nova versão não é a lida + 1 passou por cima de uma alteração
+  que o autor não viu.
+
+Roda sem If-Match (o último a gravar vence, como antes) e com If-Match: aí o 409 traz o
+estado atual e o cliente refaz a alteração sobre ele. A latência das gravações mostra que
+o controle não acrescenta espera: nenhuma trava é mantida entre a leitura e a gravação.
+
+Uso (a partir de codigoLabkey/):
+    python -m benchmarks.bench_concorrencia [--admins 8] [--usuarios 8] [--duracao 10]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, time as hora
+from pathlib import Path
+
+from benchmarks.carga_modos import popular, SENHA
+from benchmarks.cliente_http import ClienteHTTP, aguardar_servidor, percentil
+
+RAIZ = Path(__file__).resolve().parent.parent
+# Poucas salas e um só dia de reservas: quase toda gravação disputa o registro com outra
+SALAS_DISPUTADAS = 3
+DIA = date(2030, 1, 7)
+# Intervalo (s) entre a leitura e a gravação (o usuário preenchendo o formulário)
+PENSAR = 0.01
+CAMPOS_SALA = ("nome", "capacidade", "descricao", "localizacao", "recursos")
+
+
+def novo_placar() -> dict:
+    return {"latencias": [], "gravadas": Counter(), "conflitos": Counter(), "erros": Counter(),
+            "confirmadas_por_sala": Counter(), "por_cima": Counter()}
+
+
+def versao(cabecalhos: dict) -> int:
+    return int(cabecalhos["etag"].strip('"'))
+
+
+async def gravar(http: ClienteHTTP, placar: dict, tipo: str, caminho: str, corpo: dict, lida: int, usar_if_match: bool):
+    """PUT com (ou sem) If-Match; registra a latência e se a gravação passou por cima de outra."""
+    inicio = time.perf_counter()
+    codigo, cabecalhos, conteudo = await http.requisitar("PUT", caminho, corpo, {"If-Match": f'"{lida}"'} if usar_if_match else None)
+    placar["latencias"].append(time.perf_counter() - inicio)
+    if codigo == 200:
+        placar["gravadas"][tipo] += 1
+        if versao(cabecalhos) != lida + 1:
+            placar["por_cima"][tipo] += 1
+    elif codigo == 409:
+        placar["conflitos"][tipo] += 1
+    else:
+        placar["erros"][codigo] += 1
+    return codigo, json.loads(conteudo) if codigo in (200, 409) else None
+
+
+async def ler(http: ClienteHTTP, placar: dict, caminho: str):
+    """GET; devolve o corpo, ou None se a leitura falhou."""
+    codigo, _, conteudo = await http.requisitar("GET", caminho)
+    if codigo != 200:
+        placar["erros"][codigo] += 1
+        return None
+    return json.loads(conteudo)
+
+
+async def admin_salas(http: ClienteHTTP, fim: float, usar_if_match: bool, placar: dict):
+    """Incrementa o contador guardado na descrição de uma das salas disputadas."""
+    while time.monotonic() < fim:
+        sala_id = random.randint(1, SALAS_DISPUTADAS)
+        if not (sala := await ler(http, placar, f"/api/v1/salas/{sala_id}")):
+            continue
+        lida = sala["versao"]
+        while True:
+            await asyncio.sleep(random.uniform(0, PENSAR))
+            corpo = {**{c: sala[c] for c in CAMPOS_SALA}, "descricao": str(int(sala["descricao"] or 0) + 1)}
+            codigo, resposta = await gravar(http, placar, "sala", f"/api/v1/salas/{sala_id}", corpo, lida, usar_if_match)
+            if codigo == 200:
+                placar["confirmadas_por_sala"][sala_id] += 1
+            if codigo != 409:
+                break
+            # Refaz o incremento sobre o estado atual, que veio no próprio 409
+            sala = resposta["detail"]["atual"]
+            lida = sala["versao"]
+
+
+async def admin_reservas(http: ClienteHTTP, fim: float, usar_if_match: bool, placar: dict):
+    """Aprova ou rejeita reservas do dia disputado a partir da listagem."""
+    while time.monotonic() < fim:
+        if not (pagina := await ler(http, placar, f"/api/v1/admin/reservas?data_inicio={DIA}&data_fim={DIA}&limite=50")):
+            continue
+        reserva = random.choice(pagina["reservas"])
+        while True:
+            await asyncio.sleep(random.uniform(0, PENSAR))
+            novo = "Rejeitada" if reserva["status"] == "Aprovada" else "Aprovada"
+            codigo, resposta = await gravar(http, placar, "reserva (admin)", f"/api/v1/reservas/{reserva['id']}/status",
+                                            {"status": novo}, reserva["versao"], usar_if_match)
+            if codigo != 409:
+                break
+            reserva = resposta["detail"]["atual"]
+
+
+async def usuario(http: ClienteHTTP, fim: float, usar_if_match: bool, placar: dict):
+    """Edita a hora de término da própria reserva (volta para PENDENTE)."""
+    while time.monotonic() < fim:
+        if not (pagina := await ler(http, placar, f"/api/v1/minhas_reservas?data_inicio={DIA}&data_fim={DIA}")):
+            continue
+        reserva = pagina["reservas"][0]
+        while True:
+            await asyncio.sleep(random.uniform(0, PENSAR))
+            inicio = hora.fromisoformat(reserva["hora_inicio"])
+            hora_fim = hora(inicio.hour, 45 if reserva["hora_fim"].startswith(f"{inicio.hour:02d}:30") else 30)
+            codigo, resposta = await gravar(http, placar, "reserva (usuário)", f"/api/v1/reservas/{reserva['id']}",
+                                            {"hora_fim": hora_fim.isoformat()}, reserva["versao"], usar_if_match)
+            if codigo != 409:
+                break
+            reserva = resposta["detail"]["atual"]
+
+
+async def entrar(porta: int, email: str) -> ClienteHTTP:
+    http = ClienteHTTP(porta=porta)
+    codigo, _, _ = await http.requisitar("POST", "/api/v1/login", {"email": email, "senha": SENHA})
+    if codigo != 200:
+        raise RuntimeError(f"Login de {email} falhou ({codigo}).")
+    return http
+
+
+async def rodar(porta: int, opcoes, usar_if_match: bool) -> dict:
+    placar = novo_placar()
+    admins = await asyncio.gather(*(entrar(porta, "u0@carga.com") for _ in range(opcoes.admins)))
+    usuarios = await asyncio.gather(*(entrar(porta, f"u{1 + i}@carga.com") for i in range(opcoes.usuarios)))
+    # Uma reserva por usuário no dia disputado, em horários distintos (sem conflitos de horário)
+    for i, http in enumerate(usuarios):
+        codigo, _, conteudo = await http.requisitar("POST", "/api/v1/reservas", {
+            "sala_id": 1, "data": DIA.isoformat(), "hora_inicio": hora(7 + i).isoformat(), "hora_fim": hora(7 + i, 30).isoformat()})
+        if codigo != 201:
+            raise RuntimeError(f"Reserva inicial recusada ({codigo}): {conteudo!r}")
+
+    fim = time.monotonic() + opcoes.duracao
+    await asyncio.gather(
+        *(admin_salas(http, fim, usar_if_match, placar) for http in admins[:len(admins) // 2]),
+        *(admin_reservas(http, fim, usar_if_match, placar) for http in admins[len(admins) // 2:]),
+        *(usuario(http, fim, usar_if_match, placar) for http in usuarios),
+    )
+
+    # Contador final de cada sala x incrementos confirmados
+    placar["perdidas"] = 0
+    for sala_id in range(1, SALAS_DISPUTADAS + 1):
+        _, _, conteudo = await admins[0].requisitar("GET", f"/api/v1/salas/{sala_id}")
+        placar["perdidas"] += placar["confirmadas_por_sala"][sala_id] - int(json.loads(conteudo)["descricao"] or 0)
+    for http in (*admins, *usuarios):
+        await http.fechar()
+    return placar
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--admins", type=int, default=8, help="metade edita salas, metade muda status de reservas")
+    parser.add_argument("--usuarios", type=int, default=8, help="usuários editando a própria reserva (até 14)")
+    parser.add_argument("--duracao", type=float, default=10.0)
+    parser.add_argument("--modo", choices=["sync", "async"], default="sync")
+    parser.add_argument("--porta", type=int, default=8769)
+    opcoes = parser.parse_args()
+
+    print(f"{opcoes.admins} administradores x {opcoes.usuarios} usuários, {opcoes.duracao:.0f} s (modo {opcoes.modo})\n")
+    print(f"{'configuração':<13} | {'PUT ok/s':>8} | {'p50 ms':>7} | {'p99 ms':>7} | {'409':>5} | {'incrementos perdidos':>20} | "
+          f"gravações sobre versão não vista (de quantas)")
+    for nome, usar_if_match in (("sem If-Match", False), ("com If-Match", True)):
+        with tempfile.TemporaryDirectory() as pasta:
+            url = f"sqlite:///{Path(pasta) / 'concorrencia.db'}"
+            random.seed(11)
+            popular(url)
+            env = {**os.environ, "LABKEY_DB_MODO": opcoes.modo, "LABKEY_DATABASE_URL": url, "LABKEY_LIMITES_ATIVOS": "0",
+                   "LABKEY_CONCORRENCIA_ESCRITAS": "100000",
+                   "LABKEY_CONCORRENCIA_LOGIN": "100000", "LABKEY_AGENDADOR_ATIVO": "0", "LABKEY_METRICAS_LENTA_MS": "100000"}
+            servidor = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--port", str(opcoes.porta), "--log-level", "warning"],
+                cwd=RAIZ, env=env,
+            )
+            try:
+                asyncio.run(aguardar_servidor("127.0.0.1", opcoes.porta))
+                if servidor.poll() is not None:
+                    raise RuntimeError(f"uvicorn terminou ao iniciar (porta {opcoes.porta} ocupada?).")
+                placar = asyncio.run(rodar(opcoes.porta, opcoes, usar_if_match))
+            finally:
+                servidor.terminate()
+                servidor.wait()
+
+        latencias = placar["latencias"]
+        por_cima = ", ".join(f"{tipo}: {placar['por_cima'][tipo]}/{total}" for tipo, total in sorted(placar["gravadas"].items()))
+        print(f"{nome:<13} | {sum(placar['gravadas'].values()) / opcoes.duracao:>8.1f} | {percentil(latencias, 50) * 1000:>7.1f} | "
+              f"{percentil(latencias, 99) * 1000:>7.1f} | {sum(placar['conflitos'].values()):>5} | {placar['perdidas']:>20} | {por_cima}"
+              + (f" | erros: {dict(placar['erros'])}" if placar["erros"] else ""))
+
+
+if __name__ == "__main__":
+    main()
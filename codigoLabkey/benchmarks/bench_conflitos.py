@@ -0,0 +1,77 @@
+"""
+Benchmark da verificação de conflito de horários em função do tamanho da tabela de reservas.
+
+Uso (a partir de codigoLabkey/):
+    python -m benchmarks.bench_conflitos [tamanho1 tamanho2 ...]
+"""
+import random
+import sys
+import tempfile
+import time as relogio
+from datetime import date, time, timedelta
+from pathlib import Path
+
+from sqlmodel import SQLModel, Session, create_engine, insert
+
+from models.models import Usuario, Sala, Reserva, StatusReserva, TipoUsuario
+from conflitos import buscar_conflito
+
+TAMANHOS_PADRAO = [1_000, 10_000, 100_000, 300_000]
+NUM_SALAS = 50
+REPETICOES = 2_000
+
+
+def popular(engine, total: int):
+    """Insere 'total' reservas sintéticas em lotes (executemany)."""
+    with Session(engine) as session:
+        session.exec(insert(Usuario).values(nome="Bench", email="bench@labkey.com", tipo=TipoUsuario.COMUM, senha_hash="x"))
+        session.exec(insert(Sala), params=[{"nome": f"Sala {i}", "capacidade": 20} for i in range(1, NUM_SALAS + 1)])
+
+        inicio = date(2020, 1, 1)
+        lote = []
+        for i in range(total):
+            hora = random.randint(7, 21)
+            lote.append({
+                "data": inicio + timedelta(days=random.randint(0, 2000)),
+                "hora_inicio": time(hora, 0),
+                "hora_fim": time(hora + 1, 0),
+                "status": random.choice(list(StatusReserva)),
+                "usuario_id": 1,
+                "sala_id": random.randint(1, NUM_SALAS),
+            })
+            if len(lote) == 10_000:
+                session.exec(insert(Reserva), params=lote)
+                lote = []
+        if lote:
+            session.exec(insert(Reserva), params=lote)
+        session.commit()
+
+
+def medir(engine) -> float:
+    """Retorna a latência média (ms) de buscar_conflito para consultas aleatórias."""
+    with Session(engine) as session:
+        consultas = [
+            (random.randint(1, NUM_SALAS), date(2020, 1, 1) + timedelta(days=random.randint(0, 2000)), random.randint(7, 21))
+            for _ in range(REPETICOES)
+        ]
+        t0 = relogio.perf_counter()
+        for sala_id, dia, hora in consultas:
+            buscar_conflito(session, sala_id, dia, time(hora, 0), time(hora, 30))
+        return (relogio.perf_counter() - t0) * 1000 / REPETICOES
+
+
+def main():
+    tamanhos = [int(t) for t in sys.argv[1:]] or TAMANHOS_PADRAO
+    random.seed(42)
+    print(f"{'reservas':>10} | {'ms/verificação':>15}")
+    for total in tamanhos:
+        with tempfile.TemporaryDirectory() as pasta:
+            engine = create_engine(f"sqlite:///{Path(pasta) / 'bench.db'}")
+            SQLModel.metadata.create_all(engine)
+            popular(engine, total)
+            print(f"{total:>10} | {medir(engine):>15.4f}")
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
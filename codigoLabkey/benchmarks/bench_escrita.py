@@ -0,0 +1,101 @@
+"""
+Benchmark de contenção de escrita: muitas solicitações de reserva simultâneas,
+com leitores concorrentes, comparando os perfis SQLite de config.SQLITE_PERFIS.
+
+Cada thread chama servicos.criar_reserva (a mesma lógica da rota POST /api/v1/reservas)
+em horários que não conflitam; em paralelo, outras threads paginam a listagem de reservas.
+
+Uso (a partir de codigoLabkey/):
+    python -m benchmarks.bench_escrita [--escritores 32] [--leitores 8] [--reservas 2000]
+"""
+import argparse
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time as hora, timedelta
+from pathlib import Path
+
+from fastapi import HTTPException
+from sqlalchemy.exc import OperationalError
+from sqlmodel import SQLModel, Session, insert
+
+import config
+import servicos
+from database import criar_engine
+from models.models import Usuario, Sala, ReservaInput, TipoUsuario
+from benchmarks.cliente_http import percentil
+
+NUM_SALAS = 20
+
+
+def preparar(engine):
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.exec(insert(Usuario).values(nome="Bench", email="bench@labkey.com", tipo=TipoUsuario.COMUM, senha_hash="x"))
+        session.exec(insert(Sala), params=[{"nome": f"Sala {i}", "capacidade": 20} for i in range(NUM_SALAS)])
+        session.commit()
+
+
+def rodar(perfil: str, escritores: int, leitores: int, total: int):
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = criar_engine(f"sqlite:///{Path(pasta) / 'bench.db'}", perfil=perfil)
+        preparar(engine)
+
+        latencias, bloqueios, leituras = [], [], [0]
+        parar = threading.Event()
+
+        def escrever(i: int):
+            # Cada índice vira um horário único (sala, dia, hora) -> sem conflitos
+            dados = ReservaInput(
+                data=date(2027, 1, 1) + timedelta(days=i // (NUM_SALAS * 14)),
+                hora_inicio=hora(7 + i % 14), hora_fim=hora(8 + i % 14),
+                sala_id=1 + (i // 14) % NUM_SALAS,
+            )
+            t0 = time.perf_counter()
+            try:
+                with Session(engine) as session:
+                    servicos.criar_reserva(session, 1, dados)
+                latencias.append(time.perf_counter() - t0)
+            except OperationalError:
+                bloqueios.append(i)  # "database is locked"
+            except HTTPException:
+                pass
+
+        def ler():
+            while not parar.is_set():
+                with Session(engine) as session:
+                    servicos.buscar_pagina_reservas(session, None, None, 50)
+                leituras[0] += 1
+
+        threads_leitura = [threading.Thread(target=ler) for _ in range(leitores)]
+        for t in threads_leitura:
+            t.start()
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=escritores) as pool:
+            list(pool.map(escrever, range(total)))
+        duracao = time.perf_counter() - inicio
+        parar.set()
+        for t in threads_leitura:
+            t.join()
+        engine.dispose()
+
+    print(f"{perfil:>9} | {len(latencias) / duracao:>10.1f} | {percentil(latencias, 99) * 1000:>9.1f} | "
+          f"{len(bloqueios):>9} | {leituras[0] / duracao:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escritores", type=int, default=32)
+    parser.add_argument("--leitores", type=int, default=8)
+    parser.add_argument("--reservas", type=int, default=2000)
+    parser.add_argument("--perfis", nargs="+", default=list(config.SQLITE_PERFIS))
+    opcoes = parser.parse_args()
+
+    print(f"{'perfil':>9} | {'escritas/s':>10} | {'p99 (ms)':>9} | {'bloqueios':>9} | {'leituras/s':>12}")
+    for perfil in opcoes.perfis:
+        rodar(perfil, opcoes.escritores, opcoes.leitores, opcoes.reservas)
+
+
+if __name__ == "__main__":
+    main()
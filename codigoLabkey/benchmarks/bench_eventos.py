@@ -0,0 +1,157 @@
+"""
+Teste de carga do fluxo em tempo real (GET /api/v1/eventos, Server-Sent Events).
+
+Sobe um uvicorn local com dados sintéticos, abre milhares de conexões SSE ociosas
+(distribuídas entre os usuários, mais algumas de administradores) e mede:
+  - CPU e memória (RSS) do servidor antes e depois das conexões, e o consumo de CPU com
+    todas elas ociosas durante um intervalo;
+  - a latência de entrega: tempo entre o PUT de status de uma reserva e a chegada do
+    evento em todas as conexões do dono da reserva e dos administradores.
+
+Uso (a partir de codigoLabkey/):
+    python -m benchmarks.bench_eventos [--conexoes 5000] [--ocioso 30] [--modo sync]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from benchmarks.carga_modos import popular, RAIZ, SENHA
+from benchmarks.cliente_http import ClienteHTTP, aguardar_servidor, percentil
+
+USUARIOS = 200
+ADMIN_CONEXOES = 5
+PUBLICACOES = 50
+
+
+def uso_processo(pid: int):
+    """(segundos de CPU, RSS em MiB) do processo, lidos de /proc."""
+    campos = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    cpu = (int(campos[11]) + int(campos[12])) / os.sysconf("SC_CLK_TCK")
+    rss = int(campos[21]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    return cpu, rss
+
+
+async def assinar(porta: int, cookies: str, chegadas: dict, prontas: list):
+    """Abre uma conexão SSE e registra o instante em que cada evento chega."""
+    leitor, escritor = await asyncio.open_connection("127.0.0.1", porta)
+    escritor.write(f"GET /api/v1/eventos HTTP/1.1\r\nHost: 127.0.0.1\r\nAccept: text/event-stream\r\nCookie: {cookies}\r\n\r\n".encode())
+    await escritor.drain()
+    status_linha = await leitor.readline()
+    if b" 200 " not in status_linha:
+        raise RuntimeError(f"Assinatura recusada: {status_linha!r}")
+    prontas.append(escritor)
+    while True:
+        linha = await leitor.readline()
+        if not linha:
+            return
+        if linha.startswith(b"data: "):
+            chegadas[json.loads(linha[6:])["reserva_id"]].append(time.perf_counter())
+
+
+async def medir(porta: int, pid: int, conexoes: int, ocioso: float):
+    # Login de todos os usuários (u0 é o administrador)
+    clientes = []
+    for i in range(USUARIOS):
+        http = ClienteHTTP(porta=porta)
+        await http.requisitar("POST", "/api/v1/login", {"email": f"u{i}@carga.com", "senha": SENHA})
+        clientes.append(http)
+    cookie = {i: "; ".join(f"{k}={v}" for k, v in http.cookies.items()) for i, http in enumerate(clientes)}
+
+    cpu0, rss0 = uso_processo(pid)
+    chegadas = defaultdict(list)
+    prontas = []
+    # Conexões comuns distribuídas entre os usuários 1..USUARIOS-1, abertas em blocos
+    donos = [1 + n % (USUARIOS - 1) for n in range(conexoes)] + [0] * ADMIN_CONEXOES
+    por_usuario = defaultdict(int)
+    for dono in donos:
+        por_usuario[dono] += 1
+    tarefas = []
+    for inicio in range(0, len(donos), 250):
+        tarefas += [asyncio.create_task(assinar(porta, cookie[d], chegadas, prontas)) for d in donos[inicio:inicio + 250]]
+        while len(prontas) < len(tarefas):
+            falhas = [t for t in tarefas if t.done() and t.exception()]
+            if falhas:
+                raise falhas[0].exception()
+            await asyncio.sleep(0.05)
+    cpu1, rss1 = uso_processo(pid)
+    print(f"conexões SSE abertas: {len(prontas)} ({conexoes} de usuários + {ADMIN_CONEXOES} de admin)")
+    print(f"RSS do servidor: {rss0:.1f} MiB -> {rss1:.1f} MiB ({(rss1 - rss0) * 1024 / len(prontas):.1f} KiB por conexão)")
+    print(f"CPU para abrir as conexões: {cpu1 - cpu0:.2f} s")
+
+    # Todas ociosas: só os pings periódicos
+    await asyncio.sleep(ocioso)
+    cpu2, _ = uso_processo(pid)
+    print(f"CPU ociosa em {ocioso:.0f} s: {cpu2 - cpu1:.3f} s ({(cpu2 - cpu1) / ocioso * 100:.2f}% de um núcleo)")
+
+    # Latência de entrega: reserva r pertence ao usuário 1 + (r - 1) % USUARIOS (ver popular)
+    admin = clientes[0]
+    reservas = random.sample([r for r in range(1, 20_000) if (r - 1) % USUARIOS != 0], PUBLICACOES)
+    latencias = []
+    for reserva_id in reservas:
+        esperadas = por_usuario[1 + (reserva_id - 1) % USUARIOS] + ADMIN_CONEXOES
+        inicio = time.perf_counter()
+        codigo, _, _ = await admin.requisitar("PUT", f"/api/v1/reservas/{reserva_id}/status", {"status": "Rejeitada"})
+        if codigo != 200:
+            raise RuntimeError(f"PUT de status retornou {codigo}")
+        limite = time.monotonic() + 5
+        while len(chegadas[reserva_id]) < esperadas and time.monotonic() < limite:
+            await asyncio.sleep(0.001)
+        if len(chegadas[reserva_id]) < esperadas:
+            raise RuntimeError(f"Evento da reserva {reserva_id} chegou a {len(chegadas[reserva_id])} de {esperadas} conexões")
+        latencias.append((max(chegadas[reserva_id]) - inicio) * 1000)
+    print(f"entrega ({esperadas} conexões por evento): p50 {percentil(latencias, 50):.1f} ms | p99 {percentil(latencias, 99):.1f} ms")
+
+    for escritor in prontas:
+        escritor.close()
+    for tarefa in tarefas:
+        tarefa.cancel()
+    for http in clientes:
+        await http.fechar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conexoes", type=int, default=5000)
+    parser.add_argument("--ocioso", type=float, default=30.0)
+    parser.add_argument("--porta", type=int, default=8766)
+    parser.add_argument("--modo", choices=["sync", "async"], default="sync")
+    opcoes = parser.parse_args()
+
+    # Cada conexão usa um descritor no cliente e outro no servidor
+    _, maximo = resource.getrlimit(resource.RLIMIT_NOFILE)
+    necessario = opcoes.conexoes + 1000
+    if maximo != resource.RLIM_INFINITY and maximo < necessario:
+        sys.exit(f"Limite de arquivos abertos ({maximo}) insuficiente para {opcoes.conexoes} conexões.")
+    resource.setrlimit(resource.RLIMIT_NOFILE, (necessario, maximo))
+
+    with tempfile.TemporaryDirectory() as pasta:
+        url = f"sqlite:///{Path(pasta) / 'eventos.db'}"
+        random.seed(7)
+        popular(url, usuarios=USUARIOS)
+        env = {**os.environ, "LABKEY_DB_MODO": opcoes.modo, "LABKEY_DATABASE_URL": url, "LABKEY_BCRYPT_ROUNDS": "4"}
+        servidor = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(opcoes.porta), "--log-level", "warning",
+             "--backlog", "4096"],
+            cwd=RAIZ, env=env,
+        )
+        try:
+            asyncio.run(aguardar_servidor("127.0.0.1", opcoes.porta))
+            if servidor.poll() is not None:
+                raise RuntimeError(f"uvicorn terminou ao iniciar (porta {opcoes.porta} ocupada?).")
+            asyncio.run(medir(opcoes.porta, servidor.pid, opcoes.conexoes, opcoes.ocioso))
+        finally:
+            servidor.terminate()
+            servidor.wait()
+
+
+if __name__ == "__main__":
+    main()
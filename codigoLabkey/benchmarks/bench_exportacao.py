@@ -0,0 +1,54 @@
+"""
+Benchmark da exportação em streaming (exportacao.exportar): tempo, volume gerado e pico
+de memória (tracemalloc) para tabelas de reservas de tamanhos diferentes. O pico deve
+ficar praticamente constante, pois só um lote de LOTE_EXPORTACAO linhas fica em memória.
+
+Uso (a partir de codigoLabkey/):
+    python -m benchmarks.bench_exportacao [tamanho1 tamanho2 ...] [--formato csv|ndjson]
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from sqlmodel import SQLModel
+
+import exportacao
+from database import criar_engine
+from benchmarks.bench_conflitos import popular
+
+TAMANHOS_PADRAO = [1_000, 100_000, 1_000_000]
+
+
+def medir(engine, formato: str):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    total_bytes = 0
+    for pedaco in exportacao.exportar(engine, None, formato):
+        total_bytes += len(pedaco.encode())
+    duracao = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duracao, total_bytes, pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("tamanhos", nargs="*", type=int, default=TAMANHOS_PADRAO)
+    parser.add_argument("--formato", choices=list(exportacao.FORMATOS), default="csv")
+    args = parser.parse_args()
+
+    print(f"{'reservas':>10} {'tempo(s)':>9} {'linhas/s':>10} {'MiB gerados':>12} {'pico memória (MiB)':>19}")
+    for tamanho in args.tamanhos:
+        with tempfile.TemporaryDirectory() as pasta:
+            engine = criar_engine(f"sqlite:///{Path(pasta) / 'exportacao.db'}")
+            SQLModel.metadata.create_all(engine)
+            popular(engine, tamanho)
+            duracao, total_bytes, pico = medir(engine, args.formato)
+            engine.dispose()
+        print(f"{tamanho:>10} {duracao:>9.2f} {tamanho / duracao:>10.0f} {total_bytes / 2**20:>12.1f} {pico / 2**20:>19.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Inundação sintética contra o login e as reservas, com e sem limites de taxa e de admissão.
+
+Um "atacante" (um IP, muitas conexões) dispara sem pausa tentativas de login com senha
+errada e solicitações de reserva, enquanto usuários legítimos (cada um com seu IP, via
+X-Forwarded-For) listam as próprias reservas, buscam salas e reservam com pausas curtas.
+Para cada configuração mede a latência e os erros dos legítimos e os códigos de status
+recebidos pelo atacante (0 = conexão derrubada pelo servidor).
+
+Uso (a partir de codigoLabkey/):
+    python -m benchmarks.bench_limites [--atacantes 60] [--legitimos 10] [--duracao 15]
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, time as hora, timedelta
+from pathlib import Path
+
+from benchmarks.carga_modos import popular, SENHA
+from benchmarks.cliente_http import ClienteHTTP, aguardar_servidor, percentil
+
+RAIZ = Path(__file__).resolve().parent.parent
+IP_ATACANTE = "10.66.0.1"
+
+CONFIGURACOES = {
+    # Sem limites, a fila se forma no pool de conexões e no lock de escrita do SQLite
+    "sem limites": {"LABKEY_LIMITES_ATIVOS": "0", "LABKEY_CONCORRENCIA_ESCRITAS": "100000",
+                    "LABKEY_CONCORRENCIA_LOGIN": "100000"},
+    "com limites": {"LABKEY_LIMITES_ATIVOS": "1"},
+}
+
+
+async def tentar(http: ClienteHTTP, requisicao: tuple, ip: dict) -> int:
+    """Status da resposta, ou 0 se o servidor derrubou a conexão (ela é refeita na próxima)."""
+    try:
+        codigo, _, _ = await http.requisitar(*requisicao, ip)
+        return codigo
+    except (ConnectionError, asyncio.IncompleteReadError):
+        await http.fechar()
+        return 0
+
+
+async def atacante(porta: int, indice: int, fim: float, codigos: Counter):
+    """Metade das conexões tenta senhas; a outra metade, logada, pede reservas sem parar."""
+    http = ClienteHTTP(porta=porta)
+    ip = {"X-Forwarded-For": IP_ATACANTE}
+    if indice % 2:
+        await http.requisitar("POST", "/api/v1/login", {"email": "u199@carga.com", "senha": SENHA}, ip)
+    n = 0
+    while time.monotonic() < fim:
+        n += 1
+        if indice % 2 == 0:
+            requisicao = ("POST", "/api/v1/login", {"email": "u1@carga.com", "senha": f"errada{n}"})
+        else:
+            dia = date(2028, 1, 1) + timedelta(days=indice * 1000 + n // 14)
+            requisicao = ("POST", "/api/v1/reservas", {"data": dia.isoformat(), "hora_inicio": hora(7 + n % 14).isoformat(),
+                                                        "hora_fim": hora(7 + n % 14, 30).isoformat(), "sala_id": 1 + indice % 30})
+        codigos[await tentar(http, requisicao, ip)] += 1
+    await http.fechar()
+
+
+async def entrar(porta: int, indice: int) -> ClienteHTTP:
+    http = ClienteHTTP(porta=porta)
+    await http.requisitar("POST", "/api/v1/login", {"email": f"u{indice}@carga.com", "senha": SENHA},
+                          {"X-Forwarded-For": f"10.1.0.{indice}"})
+    return http
+
+
+async def legitimo(http: ClienteHTTP, indice: int, inicio_medicao: float, fim: float, latencias: list, codigos: Counter):
+    ip = {"X-Forwarded-For": f"10.1.0.{indice}"}
+    dia = date(2027, 1, 1) + timedelta(days=indice)
+    n = 0
+    while time.monotonic() < fim:
+        n += 1
+        if n % 5 == 0:
+            requisicao = ("POST", "/api/v1/reservas", {"data": (dia + timedelta(days=40 * (n // 70))).isoformat(),
+                                                        "hora_inicio": hora(7 + (n // 5) % 14).isoformat(),
+                                                        "hora_fim": hora(7 + (n // 5) % 14, 30).isoformat(), "sala_id": 1 + indice % 30})
+        elif n % 2:
+            requisicao = ("GET", "/api/v1/minhas_reservas?limite=20", None)
+        else:
+            requisicao = ("GET", f"/api/v1/salas/disponiveis?data={dia}&hora_inicio=08:00&hora_fim=10:00", None)
+        inicio = time.perf_counter()
+        codigo = await tentar(http, requisicao, ip)
+        if time.monotonic() >= inicio_medicao:
+            latencias.append(time.perf_counter() - inicio)
+            codigos[codigo] += 1
+        await asyncio.sleep(random.uniform(0.05, 0.15))
+    await http.fechar()
+
+
+async def rodar(porta: int, opcoes):
+    latencias, legitimos, ataque = [], Counter(), Counter()
+    # Os legítimos entram antes do ataque; o primeiro segundo de ataque fica fora da medição
+    clientes = await asyncio.gather(*(entrar(porta, 1 + i) for i in range(opcoes.legitimos)))
+    agora = time.monotonic()
+    fim = agora + 1 + opcoes.duracao
+    await asyncio.gather(
+        *(legitimo(http, 1 + i, agora + 1, fim, latencias, legitimos) for i, http in enumerate(clientes)),
+        *(atacante(porta, i, fim, ataque) for i in range(opcoes.atacantes)),
+    )
+    return latencias, legitimos, ataque
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--atacantes", type=int, default=60, help="conexões simultâneas do atacante")
+    parser.add_argument("--legitimos", type=int, default=10)
+    parser.add_argument("--duracao", type=float, default=15.0)
+    parser.add_argument("--rounds", type=int, default=8, help="custo do bcrypt no servidor")
+    parser.add_argument("--modo", choices=["sync", "async"], default="sync")
+    parser.add_argument("--porta", type=int, default=8768)
+    opcoes = parser.parse_args()
+
+    print(f"{opcoes.atacantes} conexões do atacante x {opcoes.legitimos} usuários legítimos, {opcoes.duracao:.0f} s (modo {opcoes.modo})\n")
+    print(f"{'configuração':<12} | {'legít. req/s':>12} | {'p50 ms':>7} | {'p95 ms':>7} | {'p99 ms':>7} | {'legít. erros':<14} | atacante (status: quantidade)")
+    for nome, extras in CONFIGURACOES.items():
+        with tempfile.TemporaryDirectory() as pasta:
+            url = f"sqlite:///{Path(pasta) / 'limites.db'}"
+            random.seed(7)
+            popular(url)
+            env = {**os.environ, **extras, "LABKEY_DB_MODO": opcoes.modo, "LABKEY_DATABASE_URL": url,
+                   "LABKEY_BCRYPT_ROUNDS": str(opcoes.rounds), "LABKEY_LIMITES_PROXY_CONFIAVEL": "1",
+                   "LABKEY_METRICAS_LENTA_MS": "100000"}
+            servidor = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--port", str(opcoes.porta), "--log-level", "warning"],
+                cwd=RAIZ, env=env,
+            )
+            try:
+                asyncio.run(aguardar_servidor("127.0.0.1", opcoes.porta))
+                if servidor.poll() is not None:
+                    raise RuntimeError(f"uvicorn terminou ao iniciar (porta {opcoes.porta} ocupada?).")
+                latencias, legitimos, ataque = asyncio.run(rodar(opcoes.porta, opcoes))
+            finally:
+                servidor.terminate()
+                servidor.wait()
+
+        erros = ", ".join(f"{codigo}: {q}" for codigo, q in sorted(legitimos.items()) if codigo >= 400 or codigo == 0) or "0"
+        print(f"{nome:<12} | {len(latencias) / opcoes.duracao:>12.1f} | {percentil(latencias, 50) * 1000:>7.1f} | "
+              f"{percentil(latencias, 95) * 1000:>7.1f} | {percentil(latencias, 99) * 1000:>7.1f} | {erros:<14} | "
+              + ", ".join(f"{codigo}: {q}" for codigo, q in sorted(ataque.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark da verificação de senha em rajadas de login concorrentes.
+
+Compara a verificação feita direto no event loop (bloqueante) com a feita no pool
+dedicado de senhas.py, medindo logins/s e o maior atraso sofrido por uma tarefa
+que deveria acordar a cada 1 ms (indica quanto o loop ficou travado).
+
+Uso (a partir de codigoLabkey/):
+    LABKEY_BCRYPT_ROUNDS=10 python -m benchmarks.bench_login [logins_concorrentes]
+"""
+import asyncio
+import sys
+import time
+
+import config
+from senhas import gerar_hash_senha, verificar_senha, verificar_senha_async
+
+SENHA = "senha-de-teste"
+
+
+async def monitorar_loop(parar: asyncio.Event, atrasos: list):
+    """Registra o atraso de cada 'tick' de 1 ms do event loop."""
+    while not parar.is_set():
+        inicio = time.perf_counter()
+        await asyncio.sleep(0.001)
+        atrasos.append(time.perf_counter() - inicio - 0.001)
+
+
+async def rodar(modo: str, senha_hash: str, total: int):
+    parar, atrasos = asyncio.Event(), []
+    monitor = asyncio.create_task(monitorar_loop(parar, atrasos))
+    await asyncio.sleep(0.01)
+
+    async def login_bloqueante():
+        return verificar_senha(SENHA, senha_hash)
+
+    inicio = time.perf_counter()
+    if modo == "pool":
+        resultados = await asyncio.gather(*(verificar_senha_async(SENHA, senha_hash) for _ in range(total)))
+    else:
+        resultados = await asyncio.gather(*(login_bloqueante() for _ in range(total)))
+    duracao = time.perf_counter() - inicio
+
+    parar.set()
+    await monitor
+    assert all(ok for ok, _ in resultados)
+    print(f"{modo:>10} | {total / duracao:>9.1f} | {max(atrasos) * 1000:>16.1f}")
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    senha_hash = gerar_hash_senha(SENHA)
+    print(f"bcrypt rounds={config.BCRYPT_ROUNDS}, workers={config.HASH_WORKERS}, logins={total}")
+    print(f"{'modo':>10} | {'logins/s':>9} | {'maior atraso (ms)':>16}")
+    asyncio.run(rodar("bloqueante", senha_hash, total))
+    asyncio.run(rodar("pool", senha_hash, total))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark de reservas semanais: um semestre (~18 ocorrências) por professor, criado
+ocorrência a ocorrência (servicos.criar_reserva, como N POSTs em /api/v1/reservas)
+ou de uma vez (servicos.criar_reservas_recorrentes, POST /api/v1/reservas/recorrentes).
+
+Cada modo roda num banco novo, com o perfil SQLite padrão da aplicação, e o mesmo
+conjunto de séries (salas e horários distintos, sem conflitos).
+
+Uso (a partir de codigoLabkey/):
+    python -m benchmarks.bench_recorrentes [--series 200] [--semanas 18]
+"""
+import argparse
+import tempfile
+import time
+from datetime import date, time as hora, timedelta
+from pathlib import Path
+
+from sqlmodel import SQLModel, Session, insert
+
+import servicos
+from database import criar_engine
+from models.models import Usuario, Sala, TipoUsuario, ReservaInput, ReservaRecorrenteInput
+
+NUM_SALAS = 20
+INICIO_SEMESTRE = date(2027, 2, 1)
+
+
+def preparar(engine):
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.exec(insert(Usuario).values(nome="Bench", email="bench@labkey.com", tipo=TipoUsuario.COMUM, senha_hash="x"))
+        session.exec(insert(Sala), params=[{"nome": f"Sala {i}", "capacidade": 20} for i in range(NUM_SALAS)])
+        session.commit()
+
+
+def series(quantidade: int, semanas: int):
+    """Séries sem conflito entre si: cada uma tem sua combinação de sala, dia da semana e horário."""
+    for i in range(quantidade):
+        sala_id = i % NUM_SALAS + 1
+        dia_semana = (i // NUM_SALAS) % 5
+        inicio = 7 + (i // (NUM_SALAS * 5)) % 14
+        yield ReservaRecorrenteInput(
+            sala_id=sala_id,
+            data_inicio=INICIO_SEMESTRE,
+            data_fim=INICIO_SEMESTRE + timedelta(weeks=semanas) - timedelta(days=1),
+            dias_semana=[dia_semana],
+            hora_inicio=hora(inicio),
+            hora_fim=hora(inicio + 1),
+        )
+
+
+def uma_a_uma(engine, serie: ReservaRecorrenteInput) -> int:
+    datas = servicos.expandir_recorrencia(serie.data_inicio, serie.data_fim, serie.dias_semana)
+    for data in datas:
+        # Uma sessão por ocorrência, como uma requisição por ocorrência
+        with Session(engine) as session:
+            servicos.criar_reserva(session, 1, ReservaInput(
+                data=data, hora_inicio=serie.hora_inicio, hora_fim=serie.hora_fim, sala_id=serie.sala_id))
+    return len(datas)
+
+
+def em_lote(engine, serie: ReservaRecorrenteInput) -> int:
+    with Session(engine) as session:
+        return servicos.criar_reservas_recorrentes(session, 1, serie)["criadas"]
+
+
+def rodar(nome: str, funcao, quantidade: int, semanas: int):
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = criar_engine(f"sqlite:///{Path(pasta) / 'recorrentes.db'}")
+        preparar(engine)
+        inicio = time.perf_counter()
+        total = sum(funcao(engine, serie) for serie in series(quantidade, semanas))
+        duracao = time.perf_counter() - inicio
+        engine.dispose()
+    print(f"{nome:<12} {quantidade:>7} {total:>12} {duracao:>9.2f} {total / duracao:>14.0f} {duracao / quantidade * 1000:>12.2f}")
+    return duracao
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--series", type=int, default=200)
+    parser.add_argument("--semanas", type=int, default=18)
+    args = parser.parse_args()
+
+    print(f"{'modo':<12} {'séries':>7} {'ocorrências':>12} {'tempo(s)':>9} {'ocorrências/s':>14} {'ms/série':>12}")
+    lento = rodar("uma a uma", uma_a_uma, args.series, args.semanas)
+    rapido = rodar("em lote", em_lote, args.series, args.semanas)
+    print(f"\nGanho do modo em lote: {lento / rapido:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
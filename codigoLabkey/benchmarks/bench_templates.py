@@ -0,0 +1,104 @@
+"""
+Micro-benchmark do custo de renderização por rota HTML.
+
+  - Inicialização: tempo para carregar todos os templates num processo novo, compilando do
+    fonte (sem cache) e lendo do cache de bytecode em disco já preenchido.
+  - Por requisição: renderização Jinja2 de cada página versus a resposta servida da memória
+    (paginas.PaginasEstaticas) nas páginas públicas. /salas e /reservas usam dados reais de
+    um banco sintético (30 salas, página padrão de reservas).
+
+Uso (a partir de codigoLabkey/):
+    python -m benchmarks.bench_templates [--repeticoes 2000]
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from sqlmodel import Session, create_engine
+from starlette.requests import Request
+
+from models.models import FiltroReservas
+from consultas import LIMITE_PADRAO
+from caches import CatalogoSalas
+from paginas import PaginasEstaticas, PAGINAS_ESTATICAS, precompilar
+import servicos
+from main import templates
+from benchmarks.carga_modos import popular
+
+
+def carga_inicial(pasta_cache: str = None) -> float:
+    """ms para carregar todos os templates num Environment novo (como num processo novo)."""
+    env = Environment(loader=FileSystemLoader(templates.env.loader.searchpath), autoescape=templates.env.autoescape)
+    env.globals.update(templates.env.globals)
+    env.filters.update(templates.env.filters)
+    if pasta_cache:
+        env.bytecode_cache = FileSystemBytecodeCache(pasta_cache)
+    inicio = time.perf_counter()
+    precompilar(env)
+    return (time.perf_counter() - inicio) * 1000
+
+
+def cronometrar(funcao, repeticoes: int) -> float:
+    """Mediana em µs de 'funcao()' (blocos de 10 chamadas)."""
+    tempos = []
+    for _ in range(max(1, repeticoes // 10)):
+        inicio = time.perf_counter()
+        for _ in range(10):
+            funcao()
+        tempos.append((time.perf_counter() - inicio) / 10 * 1e6)
+    return statistics.median(tempos)
+
+
+def requisicao() -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/", "query_string": b"",
+                    "headers": [(b"accept-encoding", b"gzip")]})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=2000)
+    opcoes = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        sem_cache = statistics.median(carga_inicial() for _ in range(5))
+        carga_inicial(pasta)  # preenche o cache de bytecode
+        com_cache = statistics.median(carga_inicial(pasta) for _ in range(5))
+    print(f"carga de todos os templates: {sem_cache:.1f} ms compilando | {com_cache:.1f} ms do cache de bytecode\n")
+
+    env = templates.env
+    paginas = PaginasEstaticas()
+    paginas.preparar(env)
+    print(f"{'rota':<12} {'render Jinja2 (µs)':>19} {'pré-renderizada (µs)':>21}")
+    for rota, nome in zip(("/", "/login", "/cadastro", "/equipe"), PAGINAS_ESTATICAS):
+        template = env.get_template(nome)
+        render = cronometrar(lambda: template.render(request=None), opcoes.repeticoes)
+        pronta = cronometrar(lambda: paginas.responder(requisicao(), env, nome), opcoes.repeticoes)
+        print(f"{rota:<12} {render:>19.1f} {pronta:>21.1f}")
+
+    with tempfile.TemporaryDirectory() as pasta:
+        url = f"sqlite:///{Path(pasta) / 'templates.db'}"
+        popular(url, reservas=2000)
+        engine = create_engine(url)
+        with Session(engine) as session:
+            salas = CatalogoSalas().listar(session)
+            reservas, _ = servicos.buscar_pagina_reservas(session, FiltroReservas(), None, LIMITE_PADRAO)
+        engine.dispose()
+
+    base = {"request": None, "nome": "Usuário Teste", "tipo_usuario": "ADMINISTRADOR"}
+    contextos = {
+        "/dashboard": ("dashboard.html", base),
+        "/salas": ("salas.html", {**base, "salas": salas}),
+        "/reservas": ("reservas.html", {**base, "todas_as_reservas": reservas, "salas_disponiveis": salas,
+                                         "filtros": FiltroReservas(), "proxima_pagina": None, "primeira_pagina": None}),
+    }
+    for rota, (nome, contexto) in contextos.items():
+        template = env.get_template(nome)
+        render = cronometrar(lambda: template.render(contexto), opcoes.repeticoes)
+        print(f"{rota:<12} {render:>19.1f} {'-':>21}")
+
+
+if __name__ == "__main__":
+    main()
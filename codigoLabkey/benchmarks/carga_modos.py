@@ -0,0 +1,119 @@
+"""
+Teste de carga comparando os modos de acesso ao banco "sync" e "async".
+
+Cria um banco SQLite temporário com dados sintéticos, sobe um uvicorn local para cada modo
+(LABKEY_DB_MODO) e dispara clientes concorrentes contra as rotas de listagem, busca de salas
+livres e solicitação de reservas. Ao final imprime req/s, p50 e p99 de cada modo.
+
+Uso (a partir de codigoLabkey/):
+    python -m benchmarks.carga_modos [--clientes 50] [--duracao 10]
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, time as hora, timedelta
+from pathlib import Path
+
+from sqlmodel import SQLModel, Session, create_engine, insert
+
+from models.models import Usuario, Sala, Reserva, StatusReserva, TipoUsuario
+from senhas import gerar_hash_senha
+from benchmarks.cliente_http import ClienteHTTP, aguardar_servidor, percentil
+
+RAIZ = Path(__file__).resolve().parent.parent
+SENHA = "carga123"
+
+
+def popular(url: str, usuarios: int = 200, salas: int = 30, reservas: int = 20_000):
+    """Cria as tabelas e insere os dados sintéticos em lotes."""
+    engine = create_engine(url)
+    SQLModel.metadata.create_all(engine)
+    senha_hash = gerar_hash_senha(SENHA, rounds=4)
+    with Session(engine) as session:
+        session.exec(insert(Usuario), params=[
+            {"nome": f"Usuário {i}", "email": f"u{i}@carga.com", "senha_hash": senha_hash,
+             "tipo": TipoUsuario.ADMINISTRADOR if i == 0 else TipoUsuario.COMUM}
+            for i in range(usuarios)
+        ])
+        session.exec(insert(Sala), params=[{"nome": f"Sala {i}", "capacidade": 10 + i} for i in range(salas)])
+        session.exec(insert(Reserva), params=[
+            {"data": date(2024, 1, 1) + timedelta(days=i % 700), "hora_inicio": hora(7 + i % 14), "hora_fim": hora(8 + i % 14),
+             "status": random.choice(list(StatusReserva)), "usuario_id": 1 + i % usuarios, "sala_id": 1 + (i // 14) % salas}
+            for i in range(reservas)
+        ])
+        session.commit()
+    engine.dispose()
+
+
+async def cliente(porta: int, indice: int, fim: float, latencias: list, erros: list):
+    """Um usuário simulado: faz login e alterna entre listagens, buscas e reservas."""
+    http = ClienteHTTP(porta=porta)
+    await http.requisitar("POST", "/api/v1/login", {"email": f"u{indice}@carga.com", "senha": SENHA})
+    dia = date(2027, 1, 1) + timedelta(days=indice)
+    n = 0
+    while time.monotonic() < fim:
+        n += 1
+        if n % 10 == 0:
+            # Reservas em horários distintos por cliente, para não gerar conflitos
+            inicio = hora(7 + (n // 10) % 14)
+            req = ("POST", "/api/v1/reservas", {"data": (dia + timedelta(days=n // 140)).isoformat(), "hora_inicio": inicio.isoformat(),
+                                                "hora_fim": hora(inicio.hour, 30).isoformat(), "sala_id": 1 + indice % 30})
+        elif n % 2 == 0:
+            req = ("GET", f"/api/v1/salas/disponiveis?data={dia}&data_fim={dia + timedelta(days=6)}&hora_inicio=08:00&hora_fim=10:00", None)
+        else:
+            req = ("GET", "/api/v1/minhas_reservas?limite=50", None)
+        t0 = time.perf_counter()
+        codigo, _, _ = await http.requisitar(*req)
+        latencias.append(time.perf_counter() - t0)
+        if codigo >= 400:
+            erros.append(codigo)
+    await http.fechar()
+
+
+async def medir(porta: int, clientes: int, duracao: float):
+    latencias, erros = [], []
+    fim = time.monotonic() + duracao
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente(porta, 1 + i, fim, latencias, erros) for i in range(clientes)))
+    total = time.perf_counter() - inicio
+    return len(latencias) / total, percentil(latencias, 50) * 1000, percentil(latencias, 99) * 1000, len(erros)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clientes", type=int, default=50)
+    parser.add_argument("--duracao", type=float, default=10.0)
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--modos", nargs="+", default=["sync", "async"])
+    opcoes = parser.parse_args()
+
+    print(f"{'modo':>6} | {'req/s':>8} | {'p50 (ms)':>9} | {'p99 (ms)':>9} | {'erros':>5}")
+    for modo in opcoes.modos:
+        with tempfile.TemporaryDirectory() as pasta:
+            url = f"sqlite:///{Path(pasta) / 'carga.db'}"
+            random.seed(7)
+            popular(url)
+            # Todos os clientes vêm do mesmo IP: sem limites de taxa (ver bench_limites)
+            env = {"LABKEY_LIMITES_ATIVOS": "0", **os.environ, "LABKEY_DB_MODO": modo, "LABKEY_DATABASE_URL": url, "LABKEY_BCRYPT_ROUNDS": "4"}
+            servidor = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--port", str(opcoes.porta), "--log-level", "warning"],
+                cwd=RAIZ, env=env,
+            )
+            try:
+                asyncio.run(aguardar_servidor("127.0.0.1", opcoes.porta))
+                if servidor.poll() is not None:
+                    raise RuntimeError(f"uvicorn terminou ao iniciar (porta {opcoes.porta} ocupada?).")
+                rps, p50, p99, erros = asyncio.run(medir(opcoes.porta, opcoes.clientes, opcoes.duracao))
+                print(f"{modo:>6} | {rps:>8.1f} | {p50:>9.1f} | {p99:>9.1f} | {erros:>5}")
+            finally:
+                servidor.terminate()
+                servidor.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Cliente HTTP/1.1 mínimo, em asyncio puro, usado pelos testes de carga.
+
+Mantém a conexão aberta (keep-alive) e guarda os cookies recebidos, o que basta para
+autenticar via SessionMiddleware e repetir requisições contra um uvicorn local.
+"""
+import asyncio
+import json
+import time
+from typing import Dict, Optional, Tuple
+
+
+class ClienteHTTP:
+    def __init__(self, host: str = "127.0.0.1", porta: int = 8000):
+        self.host = host
+        self.porta = porta
+        self.cookies: Dict[str, str] = {}
+        self._leitor: Optional[asyncio.StreamReader] = None
+        self._escritor: Optional[asyncio.StreamWriter] = None
+
+    async def _conectar(self):
+        if self._escritor is None or self._escritor.is_closing():
+            self._leitor, self._escritor = await asyncio.open_connection(self.host, self.porta)
+
+    async def fechar(self):
+        if self._escritor is not None:
+            self._escritor.close()
+            self._escritor = None
+
+    async def requisitar(self, metodo: str, caminho: str, corpo=None, cabecalhos: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+        """Envia a requisição e retorna (status, cabeçalhos, corpo)."""
+        await self._conectar()
+        dados = json.dumps(corpo).encode() if corpo is not None else b""
+        linhas = [f"{metodo} {caminho} HTTP/1.1", f"Host: {self.host}:{self.porta}", f"Content-Length: {len(dados)}"]
+        if corpo is not None:
+            linhas.append("Content-Type: application/json")
+        if self.cookies:
+            linhas.append("Cookie: " + "; ".join(f"{k}={v}" for k, v in self.cookies.items()))
+        for nome, valor in (cabecalhos or {}).items():
+            linhas.append(f"{nome}: {valor}")
+        self._escritor.write(("\r\n".join(linhas) + "\r\n\r\n").encode() + dados)
+        await self._escritor.drain()
+
+        status_linha = await self._leitor.readline()
+        if not status_linha:
+            # Servidor fechou a conexão ociosa: reconecta e tenta de novo
+            await self.fechar()
+            return await self.requisitar(metodo, caminho, corpo, cabecalhos)
+        codigo = int(status_linha.split()[1])
+
+        resposta_cabecalhos: Dict[str, str] = {}
+        while True:
+            linha = (await self._leitor.readline()).decode("latin-1").strip()
+            if not linha:
+                break
+            nome, _, valor = linha.partition(":")
+            nome, valor = nome.strip().lower(), valor.strip()
+            if nome == "set-cookie":
+                chave, _, resto = valor.partition("=")
+                self.cookies[chave] = resto.split(";")[0]
+            resposta_cabecalhos[nome] = valor
+
+        if resposta_cabecalhos.get("transfer-encoding") == "chunked":
+            partes = []
+            while True:
+                tamanho = int((await self._leitor.readline()).strip(), 16)
+                if tamanho == 0:
+                    await self._leitor.readline()
+                    break
+                partes.append(await self._leitor.readexactly(tamanho))
+                await self._leitor.readline()
+            conteudo = b"".join(partes)
+        else:
+            conteudo = await self._leitor.readexactly(int(resposta_cabecalhos.get("content-length", 0)))
+
+        if resposta_cabecalhos.get("connection") == "close":
+            await self.fechar()
+        return codigo, resposta_cabecalhos, conteudo
+
+
+async def aguardar_servidor(host: str, porta: int, timeout: float = 20.0):
+    """Espera até o servidor aceitar conexões (ou estoura o timeout)."""
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            _, escritor = await asyncio.open_connection(host, porta)
+            escritor.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise TimeoutError(f"Servidor {host}:{porta} não respondeu em {timeout}s.")
+
+
+def percentil(valores, p: float) -> float:
+    """Percentil p (0-100) de uma lista de valores, por interpolação do vizinho mais próximo."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
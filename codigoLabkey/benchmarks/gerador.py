@@ -0,0 +1,151 @@
+"""
+Gerador de dados sintéticos em volume (usuários, salas e reservas) para benchmarks.
+
+Cria o schema completo (tabelas + migrações) e insere em lotes com executemany, sem
+consultas por linha. Os índices de Reserva são removidos durante a carga e recriados no
+fim (bem mais rápido que mantê-los linha a linha), e os resumos de uso são recalculados.
+
+As reservas ocupam horários distintos de (sala, dia, hora), então não há conflitos, e
+terminam em FIM_HORIZONTE dias a partir de hoje: o histórico cresce para o passado.
+Passado: maioria aprovada; futuro: pendentes e aprovadas. Senha de todos: carga123
+(e-mails u0@carga.com, u1@carga.com, ...; os primeiros são administradores).
+
+Uso (a partir de codigoLabkey/):
+    python -m benchmarks.gerador banco.db [--usuarios 10000] [--salas 500] [--reservas 5000000]
+"""
+import argparse
+import random
+import time
+from datetime import date, time as hora, timedelta
+from pathlib import Path
+
+from sqlmodel import SQLModel, insert, func, select
+
+from analise import reconstruir_resumos
+from database import criar_engine
+from migracoes import aplicar_migracoes
+from models.models import Usuario, Sala, Reserva, StatusReserva, TipoUsuario
+from senhas import gerar_hash_senha
+
+SENHA = "carga123"
+LOTE = 20_000
+# Horários por sala e dia (07h às 21h, uma hora cada)
+HORARIOS = list(range(7, 21))
+# Dias após hoje cobertos pelas reservas futuras
+FIM_HORIZONTE = 90
+
+STATUS_PASSADO = ([StatusReserva.APROVADA, StatusReserva.CANCELADA, StatusReserva.REJEITADA, StatusReserva.PENDENTE], [70, 15, 10, 5])
+STATUS_FUTURO = ([StatusReserva.PENDENTE, StatusReserva.APROVADA, StatusReserva.CANCELADA], [40, 50, 10])
+
+
+def _progresso(rotulo: str, feito: int, total: int, inicio: float):
+    decorrido = time.perf_counter() - inicio
+    taxa = feito / decorrido if decorrido else 0
+    print(f"\r  {rotulo}: {feito:,}/{total:,} ({taxa:,.0f}/s)", end="" if feito < total else "\n", flush=True)
+
+
+def _inserir_em_lotes(conn, tabela, linhas, total: int, rotulo: str):
+    """Insere as linhas (um gerador) em lotes de LOTE, com commit e progresso a cada lote."""
+    inicio, feito, lote = time.perf_counter(), 0, []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) == LOTE:
+            conn.execute(insert(tabela), lote)
+            conn.commit()
+            feito += len(lote)
+            lote = []
+            _progresso(rotulo, feito, total, inicio)
+    if lote:
+        conn.execute(insert(tabela), lote)
+        conn.commit()
+        feito += len(lote)
+        _progresso(rotulo, feito, total, inicio)
+
+
+def linhas_usuarios(quantidade: int, admins: int, senha_hash: str):
+    for i in range(quantidade):
+        yield {
+            "nome": f"Usuário {i}", "email": f"u{i}@carga.com", "senha_hash": senha_hash, "ativo": True,
+            "tipo": TipoUsuario.ADMINISTRADOR if i < admins else TipoUsuario.COMUM,
+        }
+
+
+def linhas_salas(quantidade: int):
+    for i in range(quantidade):
+        yield {"nome": f"Sala {i}", "capacidade": 10 + i % 60, "localizacao": f"Bloco {chr(65 + i % 8)}",
+               "recursos": "Projetor" if i % 3 else "Projetor, Computadores"}
+
+
+def linhas_reservas(quantidade: int, usuarios: int, salas: int, ocupacao: float, hoje: date):
+    """Reservas em ordem cronológica, uma por (sala, dia, hora) ocupada."""
+    por_dia = max(1, int(salas * len(HORARIOS) * ocupacao))
+    dias = -(-quantidade // por_dia)
+    inicio = hoje + timedelta(days=FIM_HORIZONTE - dias)
+    gerado = 0
+    for d in range(dias):
+        dia = inicio + timedelta(days=d)
+        status, pesos = STATUS_PASSADO if dia < hoje else STATUS_FUTURO
+        vagas = random.sample(range(salas * len(HORARIOS)), min(por_dia, quantidade - gerado))
+        sorteados = random.choices(status, pesos, k=len(vagas))
+        for vaga, situacao in zip(sorted(vagas), sorteados):
+            h = HORARIOS[vaga % len(HORARIOS)]
+            yield {
+                "data": dia, "hora_inicio": hora(h), "hora_fim": hora(h + 1), "status": situacao,
+                "sala_id": 1 + vaga // len(HORARIOS), "usuario_id": 1 + random.randrange(usuarios),
+            }
+        gerado += len(vagas)
+
+
+def gerar(url: str, usuarios: int = 10_000, salas: int = 500, reservas: int = 5_000_000,
+          admins: int = 5, ocupacao: float = 0.6, rounds: int = 4, semente: int = 7):
+    """Cria o banco em 'url' e o popula. Retorna o último dia com reservas."""
+    random.seed(semente)
+    engine = criar_engine(url)
+    SQLModel.metadata.create_all(engine)
+    aplicar_migracoes(engine)
+
+    indices = list(Reserva.__table__.indexes)
+    with engine.connect() as conn:
+        for indice in indices:
+            indice.drop(conn)
+        conn.commit()
+
+        _inserir_em_lotes(conn, Usuario, linhas_usuarios(usuarios, admins, gerar_hash_senha(SENHA, rounds=rounds)), usuarios, "usuários")
+        _inserir_em_lotes(conn, Sala, linhas_salas(salas), salas, "salas")
+        _inserir_em_lotes(conn, Reserva, linhas_reservas(reservas, usuarios, salas, ocupacao, date.today()), reservas, "reservas")
+
+        inicio = time.perf_counter()
+        for indice in indices:
+            indice.create(conn)
+        conn.commit()
+        print(f"  índices recriados em {time.perf_counter() - inicio:.1f} s")
+
+        inicio = time.perf_counter()
+        reconstruir_resumos(conn)
+        conn.commit()
+        print(f"  resumos de uso recalculados em {time.perf_counter() - inicio:.1f} s")
+        ultimo_dia = conn.execute(select(func.max(Reserva.data))).scalar()
+    engine.dispose()
+    return ultimo_dia
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("banco", help="arquivo SQLite a criar (ou URL completa, ex.: postgresql://...)")
+    parser.add_argument("--usuarios", type=int, default=10_000)
+    parser.add_argument("--salas", type=int, default=500)
+    parser.add_argument("--reservas", type=int, default=5_000_000)
+    parser.add_argument("--admins", type=int, default=5)
+    parser.add_argument("--ocupacao", type=float, default=0.6, help="fração dos horários ocupados por dia")
+    parser.add_argument("--rounds", type=int, default=4, help="custo do bcrypt das senhas geradas")
+    parser.add_argument("--semente", type=int, default=7)
+    args = parser.parse_args()
+
+    url = args.banco if "://" in args.banco else f"sqlite:///{Path(args.banco).resolve()}"
+    inicio = time.perf_counter()
+    gerar(url, args.usuarios, args.salas, args.reservas, args.admins, args.ocupacao, args.rounds, args.semente)
+    print(f"Banco gerado em {time.perf_counter() - inicio:.1f} s: {url}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Teste de carga roteirizado contra um uvicorn local, com relatório comparável entre commits.
+
+Usuários comuns repetem um roteiro fixo (a cada 20 passos: 1 login, 4 reservas, 8
+listagens de "minhas reservas" e 7 buscas de salas livres) e administradores aprovam as
+reservas pendentes (listagem filtrada + PUT de status). Cada operação tem sua vazão e
+latências (p50/p95/p99); os primeiros segundos (aquecimento) ficam de fora.
+
+O banco é criado por benchmarks.gerador (num diretório temporário, ou em --banco, que é
+reaproveitado nas execuções seguintes). O relatório pode ser salvo em JSON (--saida) e
+comparado com o de outro commit (--comparar).
+
+Uso (a partir de codigoLabkey/):
+    python -m benchmarks.teste_carga [--clientes 50] [--admins 2] [--duracao 30]
+        [--usuarios 10000 --salas 500 --reservas 200000] [--banco carga.db]
+        [--saida relatorio.json] [--comparar relatorio_anterior.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from sqlmodel import create_engine, func, select
+
+from models.models import Reserva
+from benchmarks.cliente_http import ClienteHTTP, aguardar_servidor, percentil
+from benchmarks.gerador import gerar, SENHA, HORARIOS
+
+RAIZ = Path(__file__).resolve().parent.parent
+OPERACOES = ["login", "reservar", "listar", "buscar", "admin_listar", "aprovar"]
+
+
+class Registro:
+    """Latências e erros por operação, ignorando o que termina antes do fim do aquecimento."""
+
+    def __init__(self, inicio_medicao: float):
+        self.inicio_medicao = inicio_medicao
+        self.latencias = defaultdict(list)
+        self.erros = defaultdict(int)
+
+    async def medir(self, operacao: str, http: ClienteHTTP, *requisicao, esperados=(200, 201)):
+        inicio = time.perf_counter()
+        codigo, _, corpo = await http.requisitar(*requisicao)
+        if time.monotonic() >= self.inicio_medicao:
+            self.latencias[operacao].append(time.perf_counter() - inicio)
+            if codigo not in esperados:
+                self.erros[operacao] += 1
+        return codigo, corpo
+
+
+async def comum(porta: int, indice: int, usuario: int, salas: int, dia_livre: date, fim: float, registro: Registro):
+    """Um usuário comum: reservas em (sala, dia, hora) exclusivos deste cliente, sem conflitos."""
+    http = ClienteHTTP(porta=porta)
+    login = ("POST", "/api/v1/login", {"email": f"u{usuario}@carga.com", "senha": SENHA})
+    await http.requisitar(*login)
+    sala = 1 + indice % salas
+    dia_base = dia_livre + timedelta(days=(indice // salas) * 1000)
+    busca_dia = dia_livre - timedelta(days=1 + indice % 60)
+    passo = reservas = 0
+    while time.monotonic() < fim:
+        etapa = passo % 20
+        if etapa == 0:
+            await registro.medir("login", http, *login)
+        elif etapa <= 4:
+            h = HORARIOS[reservas % len(HORARIOS)]
+            dia = dia_base + timedelta(days=reservas // len(HORARIOS))
+            await registro.medir("reservar", http, "POST", "/api/v1/reservas", {
+                "data": dia.isoformat(), "hora_inicio": f"{h:02d}:00", "hora_fim": f"{h:02d}:45", "sala_id": sala})
+            reservas += 1
+        elif etapa <= 12:
+            await registro.medir("listar", http, "GET", "/api/v1/minhas_reservas?limite=50")
+        else:
+            await registro.medir("buscar", http, "GET",
+                                 f"/api/v1/salas/disponiveis?data={busca_dia}&hora_inicio=08:00&hora_fim=10:00")
+        passo += 1
+    await http.fechar()
+
+
+async def administrador(porta: int, usuario: int, fim: float, registro: Registro):
+    """Um administrador: lista as pendentes e aprova algumas de cada página."""
+    http = ClienteHTTP(porta=porta)
+    await http.requisitar("POST", "/api/v1/login", {"email": f"u{usuario}@carga.com", "senha": SENHA})
+    while time.monotonic() < fim:
+        codigo, corpo = await registro.medir("admin_listar", http, "GET", "/api/v1/admin/reservas?status=Pendente&limite=20")
+        pendentes = json.loads(corpo)["reservas"][:5] if codigo == 200 else []
+        if not pendentes:
+            await asyncio.sleep(0.05)
+        for reserva in pendentes:
+            # 409: outra reserva ocupou o horário nesse meio-tempo (não conta como erro)
+            await registro.medir("aprovar", http, "PUT", f"/api/v1/reservas/{reserva['id']}/status", {"status": "Aprovada"},
+                                 esperados=(200, 409))
+    await http.fechar()
+
+
+async def executar_carga(porta: int, opcoes, dia_livre: date) -> Registro:
+    agora = time.monotonic()
+    registro = Registro(agora + opcoes.aquecimento)
+    fim = agora + opcoes.aquecimento + opcoes.duracao
+    tarefas = [administrador(porta, i, fim, registro) for i in range(opcoes.admins)]
+    # Usuários comuns espalhados pela base (os primeiros são os administradores)
+    comuns = range(opcoes.admins_gerados, opcoes.usuarios)
+    passo = max(1, len(comuns) // max(1, opcoes.clientes))
+    tarefas += [
+        comum(porta, i, comuns[(i * passo) % len(comuns)], opcoes.salas, dia_livre, fim, registro)
+        for i in range(opcoes.clientes)
+    ]
+    await asyncio.gather(*tarefas)
+    return registro
+
+
+def montar_relatorio(registro: Registro, opcoes) -> dict:
+    operacoes = {}
+    for operacao in OPERACOES:
+        latencias = registro.latencias.get(operacao)
+        if not latencias:
+            continue
+        operacoes[operacao] = {
+            "requisicoes": len(latencias),
+            "req_s": round(len(latencias) / opcoes.duracao, 1),
+            "p50_ms": round(percentil(latencias, 50) * 1000, 1),
+            "p95_ms": round(percentil(latencias, 95) * 1000, 1),
+            "p99_ms": round(percentil(latencias, 99) * 1000, 1),
+            "erros": registro.erros.get(operacao, 0),
+        }
+    todas = [l for lista in registro.latencias.values() for l in lista]
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit,
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "parametros": {chave: valor for chave, valor in vars(opcoes).items() if chave not in ("saida", "comparar", "banco")},
+        "total": {
+            "requisicoes": len(todas),
+            "req_s": round(len(todas) / opcoes.duracao, 1),
+            "p50_ms": round(percentil(todas, 50) * 1000, 1) if todas else None,
+            "p95_ms": round(percentil(todas, 95) * 1000, 1) if todas else None,
+            "p99_ms": round(percentil(todas, 99) * 1000, 1) if todas else None,
+            "erros": sum(registro.erros.values()),
+        },
+        "operacoes": operacoes,
+    }
+
+
+def imprimir(relatorio: dict, anterior: dict = None):
+    def variacao(atual, antes):
+        if not antes or atual is None:
+            return ""
+        return f"{(atual - antes) / antes * 100:+.0f}%"
+
+    print(f"\ncommit {relatorio['commit'] or '?'} | {relatorio['data']}"
+          + (f" | comparado com {anterior['commit'] or '?'} ({anterior['data']})" if anterior else ""))
+    cabecalho = f"{'operação':<13} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'erros':>6}"
+    if anterior:
+        cabecalho += f" {'Δ req/s':>8} {'Δ p95':>7}"
+    print(cabecalho)
+    linhas = list(relatorio["operacoes"].items()) + [("TOTAL", relatorio["total"])]
+    for nome, medidas in linhas:
+        linha = f"{nome:<13} {medidas['req_s']:>8} {medidas['p50_ms']:>8} {medidas['p95_ms']:>8} {medidas['p99_ms']:>8} {medidas['erros']:>6}"
+        if anterior:
+            base = anterior["total"] if nome == "TOTAL" else anterior["operacoes"].get(nome, {})
+            linha += f" {variacao(medidas['req_s'], base.get('req_s')):>8} {variacao(medidas['p95_ms'], base.get('p95_ms')):>7}"
+        print(linha)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clientes", type=int, default=50, help="usuários comuns simultâneos")
+    parser.add_argument("--admins", type=int, default=2, help="administradores simultâneos")
+    parser.add_argument("--duracao", type=float, default=30.0, help="segundos medidos")
+    parser.add_argument("--aquecimento", type=float, default=3.0, help="segundos iniciais descartados")
+    parser.add_argument("--usuarios", type=int, default=10_000)
+    parser.add_argument("--salas", type=int, default=500)
+    parser.add_argument("--reservas", type=int, default=200_000)
+    parser.add_argument("--admins-gerados", type=int, default=5, help="administradores criados pelo gerador")
+    parser.add_argument("--modo", choices=["sync", "async"], default="sync")
+    parser.add_argument("--porta", type=int, default=8767)
+    parser.add_argument("--banco", help="arquivo SQLite reaproveitado entre execuções (gerado se não existir)")
+    parser.add_argument("--saida", help="grava o relatório em JSON neste arquivo")
+    parser.add_argument("--comparar", help="relatório JSON anterior para comparar")
+    opcoes = parser.parse_args()
+    if opcoes.admins > opcoes.admins_gerados:
+        parser.error("--admins não pode passar de --admins-gerados")
+
+    with tempfile.TemporaryDirectory() as pasta:
+        arquivo = Path(opcoes.banco).resolve() if opcoes.banco else Path(pasta) / "carga.db"
+        url = f"sqlite:///{arquivo}"
+        if not arquivo.exists():
+            print(f"Gerando banco ({opcoes.usuarios} usuários, {opcoes.salas} salas, {opcoes.reservas} reservas)...")
+            gerar(url, opcoes.usuarios, opcoes.salas, opcoes.reservas, opcoes.admins_gerados)
+        engine = create_engine(url)
+        with engine.connect() as conn:
+            # Reservas da carga começam depois de tudo o que já existe (inclusive execuções anteriores)
+            dia_livre = conn.execute(select(func.max(Reserva.data))).scalar() + timedelta(days=1)
+        engine.dispose()
+
+        # Sob carga quase toda requisição passaria do limite padrão do log de lentidão, e
+        # os limites de taxa por IP barrariam os clientes (todos vêm de 127.0.0.1)
+        env = {"LABKEY_METRICAS_LENTA_MS": "5000", "LABKEY_LIMITES_ATIVOS": "0", **os.environ,
+               "LABKEY_DB_MODO": opcoes.modo, "LABKEY_DATABASE_URL": url, "LABKEY_BCRYPT_ROUNDS": "4"}
+        servidor = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(opcoes.porta), "--log-level", "warning"],
+            cwd=RAIZ, env=env,
+        )
+        try:
+            asyncio.run(aguardar_servidor("127.0.0.1", opcoes.porta, timeout=60))
+            if servidor.poll() is not None:
+                raise RuntimeError(f"uvicorn terminou ao iniciar (porta {opcoes.porta} ocupada?).")
+            print(f"Carga: {opcoes.clientes} usuários + {opcoes.admins} admins, {opcoes.duracao:.0f} s (modo {opcoes.modo})")
+            registro = asyncio.run(executar_carga(opcoes.porta, opcoes, dia_livre))
+        finally:
+            servidor.terminate()
+            servidor.wait()
+
+    relatorio = montar_relatorio(registro, opcoes)
+    anterior = json.loads(Path(opcoes.comparar).read_text()) if opcoes.comparar else None
+    imprimir(relatorio, anterior)
+    if opcoes.saida:
+        Path(opcoes.saida).write_text(json.dumps(relatorio, indent=2, ensure_ascii=False))
+        print(f"\nRelatório salvo em {opcoes.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+"""
+Verificação dos planos de consulta pela linha de comando: roda tests/test_indices.py,
+que executa as consultas "quentes" num banco com dados sintéticos e confere, via
+EXPLAIN QUERY PLAN, que nenhuma delas faz varredura completa de tabela.
+
+Uso (a partir de codigoLabkey/; argumentos extras vão para o pytest):
+    python -m benchmarks.verificar_indices [-v]
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+TESTES = Path(__file__).resolve().parent.parent / "tests" / "test_indices.py"
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main(["-q", "-p", "no:cacheprovider", str(TESTES), *sys.argv[1:]]))
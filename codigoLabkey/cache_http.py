@@ -0,0 +1,163 @@
+from typing import Dict, Optional, Tuple
+from pathlib import Path
+import hashlib
+import os
+import threading
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.staticfiles import StaticFiles
+from starlette.middleware.gzip import GZipMiddleware
+
+# Cache HTTP: ETags, Cache-Control, Compressão e Arquivos Estáticos Versionados
+#
+# As ETags das páginas e listagens são calculadas a partir das versões dos dados (tabela
+# VersaoCache: "salas", "reservas") e do que mais muda a resposta (usuário, filtros), e
+# não do corpo pronto: um 304 é respondido sem consultar as reservas nem renderizar nada.
+
+RAIZ = Path(__file__).resolve().parent
+PASTA_ESTATICOS = RAIZ / "static"
+PASTA_TEMPLATES = RAIZ / "templates"
+
+# Respostas que dependem do usuário logado: o navegador guarda, mas revalida sempre
+PRIVADO = "private, no-cache"
+# Páginas iguais para todos (ex.: "/" e "/equipe"), revalidadas a cada acesso
+PUBLICO = "public, no-cache"
+# Arquivos estáticos pedidos pela URL versionada: o conteúdo daquela URL nunca muda
+IMUTAVEL = "public, max-age=31536000, immutable"
+
+# Tamanho mínimo (bytes) para comprimir uma resposta
+COMPRESSAO_MINIMO = 1000
+
+
+def etag_de(*partes) -> str:
+    """ETag fraca (o corpo pode ser comprimido) a partir do que determina a resposta."""
+    return 'W/"' + hashlib.blake2b(repr(partes).encode(), digest_size=12).hexdigest() + '"'
+
+
+def cliente_tem(request: Request, etag: str) -> bool:
+    """Compara o If-None-Match da requisição com a ETag atual (comparação fraca)."""
+    cabecalho = request.headers.get("if-none-match")
+    if not cabecalho:
+        return False
+    atual = etag.removeprefix("W/")
+    return any(valor.strip() == "*" or valor.strip().removeprefix("W/") == atual for valor in cabecalho.split(","))
+
+
+def nao_modificado(request: Request, etag: str, cache_control: str = PRIVADO) -> Optional[Response]:
+    """Resposta 304 se o cliente já tem a versão 'etag'; None para seguir com a resposta completa."""
+    if cliente_tem(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+    return None
+
+
+def marcar(resposta: Response, etag: str, cache_control: str = PRIVADO) -> Response:
+    """Grava ETag e Cache-Control na resposta (ou no Response injetado pelo FastAPI)."""
+    resposta.headers["ETag"] = etag
+    resposta.headers["Cache-Control"] = cache_control
+    return resposta
+
+
+# Concorrência Otimista (If-Match)
+#
+# Salas e reservas têm uma coluna 'versao', incrementada a cada alteração. As rotas de
+# alteração respondem com a ETag forte '"<versao>"'; o cliente a devolve em If-Match e a
+# alteração só é gravada se o registro ainda estiver nessa versão (senão, 409 com o estado
+# atual, ver servicos.gravar_versionado).
+
+def etag_versao(versao: int) -> str:
+    return f'"{versao}"'
+
+
+def versao_if_match(request: Request) -> Optional[int]:
+    """
+    Dependência: versão exigida pelo If-Match da requisição. None se o cabeçalho estiver
+    ausente ou for '*' (vale a versão atual, como antes); 400 se não trouxer uma versão.
+    """
+    cabecalho = (request.headers.get("if-match") or "").strip()
+    if not cabecalho or cabecalho == "*":
+        return None
+    valor = cabecalho.removeprefix("W/").strip('"')
+    if not valor.isdigit():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='If-Match deve trazer a versão do registro, ex.: "3".')
+    return int(valor)
+
+
+# Versão da implantação: muda quando algum template ou arquivo estático muda, e é a mesma
+# em todos os workers. Entra na ETag das páginas HTML.
+
+def _versao_implantacao() -> str:
+    resumo = hashlib.blake2b(digest_size=8)
+    for pasta in (PASTA_TEMPLATES, PASTA_ESTATICOS):
+        for arquivo in sorted(pasta.rglob("*")):
+            if arquivo.is_file():
+                info = arquivo.stat()
+                resumo.update(f"{arquivo.relative_to(RAIZ)}:{info.st_size}:{info.st_mtime_ns};".encode())
+    return resumo.hexdigest()
+
+
+VERSAO_IMPLANTACAO = _versao_implantacao()
+
+
+# Arquivos Estáticos Versionados
+
+class ImpressoesDigitais:
+    """Hash do conteúdo de cada arquivo estático, recalculado só quando o arquivo muda."""
+
+    def __init__(self, pasta: Path = PASTA_ESTATICOS):
+        self._pasta = pasta
+        self._lock = threading.Lock()
+        self._hashes: Dict[str, Tuple[int, int, str]] = {}
+
+    def de(self, caminho_completo: str) -> Optional[str]:
+        try:
+            info = os.stat(caminho_completo)
+        except OSError:
+            return None
+        with self._lock:
+            conhecido = self._hashes.get(caminho_completo)
+        if conhecido and conhecido[:2] == (info.st_mtime_ns, info.st_size):
+            return conhecido[2]
+        with open(caminho_completo, "rb") as arquivo:
+            impressao = hashlib.blake2b(arquivo.read(), digest_size=5).hexdigest()
+        with self._lock:
+            self._hashes[caminho_completo] = (info.st_mtime_ns, info.st_size, impressao)
+        return impressao
+
+    def url(self, caminho: str) -> str:
+        """URL de 'static/<caminho>' com a impressão digital do conteúdo (?v=...)."""
+        impressao = self.de(str(self._pasta / caminho))
+        if impressao is None:
+            return f"/static/{caminho}"
+        return f"/static/{caminho}?v={impressao}"
+
+
+impressoes = ImpressoesDigitais()
+
+
+class ArquivosEstaticos(StaticFiles):
+    """
+    StaticFiles com Cache-Control: cache longo e imutável quando a URL traz a impressão
+    digital atual do arquivo (gerada por impressoes.url / 'estatico' nos templates);
+    revalidação (ETag/Last-Modified do próprio StaticFiles) nos demais casos.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        resposta = super().file_response(full_path, stat_result, scope, status_code)
+        versao = dict(
+            parte.split("=", 1) for parte in scope.get("query_string", b"").decode("latin-1").split("&") if "=" in parte
+        ).get("v")
+        versionado = versao is not None and versao == impressoes.de(str(full_path))
+        resposta.headers["Cache-Control"] = IMUTAVEL if versionado else "no-cache"
+        return resposta
+
+
+# Compressão
+
+class CompressaoMiddleware(GZipMiddleware):
+    """GZip para HTML/JSON/CSS; imagens já vêm comprimidas e passam direto."""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith("/static/images/"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
@@ -0,0 +1,253 @@
+from typing import List, NamedTuple, Optional
+from collections import OrderedDict
+from sqlalchemy.dialects import sqlite, postgresql
+from sqlmodel import Session, select
+import threading
+import time
+
+from models.models import Sala, Usuario, TipoUsuario, VersaoCache
+import config
+
+
+# Versões dos Caches (invalidação entre processos)
+
+def versao_cache(session: Session, nome: str) -> int:
+    """Versão atual do cache 'nome' gravada no banco (0 se nunca foi incrementada)."""
+    return session.exec(select(VersaoCache.versao).where(VersaoCache.nome == nome)).first() or 0
+
+
+def incrementar_versao_cache(session: Session, nome: str) -> int:
+    """
+    Incrementa a versão do cache 'nome' na transação corrente (sem commit), para que a
+    invalidação seja gravada junto com a alteração que a causou. Retorna a nova versão.
+    """
+    # Upsert atômico: dois processos criando o mesmo nome ao mesmo tempo não colidem na chave
+    insert_dialeto = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}[session.get_bind().dialect.name]
+    comando = (
+        insert_dialeto(VersaoCache).values(nome=nome, versao=1)
+        .on_conflict_do_update(index_elements=["nome"], set_={"versao": VersaoCache.versao + 1})
+        .returning(VersaoCache.versao)
+    )
+    return session.exec(comando).scalar_one()
+
+
+def versoes_cache(session: Session, *nomes: str) -> tuple:
+    """Versões de vários caches numa só consulta, na ordem pedida (usadas nas ETags HTTP)."""
+    versoes = dict(session.exec(select(VersaoCache.nome, VersaoCache.versao).where(VersaoCache.nome.in_(nomes))).all())
+    return tuple(versoes.get(nome, 0) for nome in nomes)
+
+
+# Versão das reservas: incrementada junto com toda escrita em Reserva
+VERSAO_RESERVAS = "reservas"
+
+
+# Catálogo de Salas em Memória
+
+class CatalogoSalas:
+    """
+    Cópia em memória da lista de salas, usada pelas páginas e pela busca de salas livres.
+
+    Dentro do processo, as rotas de escrita de salas chamam invalidar() após o commit.
+    Alterações feitas por outros processos são percebidas pela versão 'salas' da tabela
+    VersaoCache, consultada no máximo a cada config.CACHE_SALAS_VERIFICACAO_MS.
+    """
+
+    NOME = "salas"
+
+    def __init__(self, intervalo_verificacao_ms: int = config.CACHE_SALAS_VERIFICACAO_MS):
+        self._lock = threading.Lock()
+        self._intervalo = intervalo_verificacao_ms / 1000
+        self._salas: Optional[tuple] = None
+        self._versao: Optional[int] = None
+        self._verificado_em = 0.0
+        # Incrementada a cada invalidação local; uma carga iniciada antes dela é descartada
+        self._geracao = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+
+    def listar(self, session: Session) -> List[Sala]:
+        """Retorna as salas, do cache quando possível."""
+        agora = time.monotonic()
+        with self._lock:
+            salas, geracao = self._salas, self._geracao
+            if salas is not None and agora - self._verificado_em < self._intervalo:
+                self.acertos += 1
+                return list(salas)
+
+        # Confere a versão no banco (fora do lock: no modo async a leitura cede o event loop)
+        versao = versao_cache(session, self.NOME)
+        if salas is not None and versao == self._versao:
+            with self._lock:
+                if self._geracao == geracao:
+                    self._verificado_em = agora
+                    self.acertos += 1
+                    return list(salas)
+
+        # Cópias desligadas da sessão, compartilhadas entre as requisições
+        carregadas = tuple(Sala(**s.model_dump()) for s in session.exec(select(Sala).order_by(Sala.id)).all())
+        with self._lock:
+            self.falhas += 1
+            if self._geracao == geracao:
+                self._salas, self._versao, self._verificado_em = carregadas, versao, agora
+        return list(carregadas)
+
+    def invalidar(self):
+        """Descarta a lista em memória; a próxima leitura recarrega do banco."""
+        with self._lock:
+            self._salas = None
+            self._versao = None
+            self._geracao += 1
+            self.invalidacoes += 1
+
+    def estatisticas(self) -> dict:
+        """Contadores de uso do cache."""
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": round(self.acertos / total, 4) if total else None,
+                "invalidacoes": self.invalidacoes,
+                "versao": self._versao,
+                "salas_em_cache": len(self._salas) if self._salas is not None else 0,
+            }
+
+
+# Cache de Autorização
+
+class PerfilUsuario(NamedTuple):
+    """Dados de um usuário que decidem o que ele pode fazer."""
+    tipo: TipoUsuario
+    ativo: bool
+
+
+class CacheAutorizacao:
+    """
+    Cache TTL/LRU do perfil (tipo e situação) dos usuários, por usuario_id.
+
+    Evita reler o usuário no banco a cada requisição sem confiar no tipo gravado no
+    cookie de sessão: a alteração de um usuário invalida a sua entrada neste processo
+    e incrementa a versão 'usuarios' da tabela VersaoCache, que os demais processos
+    conferem no máximo a cada config.CACHE_USUARIOS_VERIFICACAO_MS (e então esvaziam o cache).
+    O TTL limita por quanto tempo uma entrada é usada mesmo sem nenhuma invalidação.
+    """
+
+    NOME = "usuarios"
+
+    def __init__(
+        self,
+        ttl_s: int = config.CACHE_USUARIOS_TTL_S,
+        max_entradas: int = config.CACHE_USUARIOS_MAX,
+        intervalo_verificacao_ms: int = config.CACHE_USUARIOS_VERIFICACAO_MS,
+    ):
+        self._lock = threading.Lock()
+        self._ttl = ttl_s
+        self._max = max_entradas
+        self._intervalo = intervalo_verificacao_ms / 1000
+        # usuario_id -> (perfil ou None se o usuário não existe, instante de expiração)
+        self._entradas: "OrderedDict[int, tuple]" = OrderedDict()
+        self._versao: Optional[int] = None
+        self._verificado_em = 0.0
+        self._geracao = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.expiradas = 0
+        self.descartadas = 0
+        self.invalidacoes = 0
+
+    def _conferir_versao(self, session: Session, agora: float):
+        """Esvazia o cache se outro processo alterou algum usuário desde a última conferência."""
+        if agora - self._verificado_em < self._intervalo:
+            return
+        versao = versao_cache(session, self.NOME)
+        with self._lock:
+            if self._versao is not None and versao != self._versao:
+                self._entradas.clear()
+                self._geracao += 1
+                self.invalidacoes += 1
+            self._versao, self._verificado_em = versao, agora
+
+    def em_cache(self, usuario_id: int):
+        """
+        Consulta só a memória: (True, perfil) se há entrada válida e a versão não precisa
+        ser conferida agora; senão (False, None) e o chamador deve usar obter().
+        """
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(usuario_id)
+            if entrada is None or agora >= entrada[1] or agora - self._verificado_em >= self._intervalo:
+                return False, None
+            self._entradas.move_to_end(usuario_id)
+            self.acertos += 1
+            return True, entrada[0]
+
+    def obter(self, session: Session, usuario_id: int) -> Optional[PerfilUsuario]:
+        """Perfil atual do usuário (None se ele não existir), do cache quando possível."""
+        agora = time.monotonic()
+        self._conferir_versao(session, agora)
+        with self._lock:
+            entrada = self._entradas.get(usuario_id)
+            if entrada is not None:
+                perfil, expira_em = entrada
+                if agora < expira_em:
+                    self._entradas.move_to_end(usuario_id)
+                    self.acertos += 1
+                    return perfil
+                del self._entradas[usuario_id]
+                self.expiradas += 1
+            geracao = self._geracao
+
+        # Leitura fora do lock (no modo async ela cede o event loop)
+        linha = session.exec(select(Usuario.tipo, Usuario.ativo).where(Usuario.id == usuario_id)).first()
+        perfil = PerfilUsuario(linha.tipo, linha.ativo) if linha else None
+
+        with self._lock:
+            self.falhas += 1
+            # Uma invalidação durante a leitura torna o resultado suspeito: não guarda
+            if self._geracao == geracao:
+                self._guardar(usuario_id, perfil, agora)
+        return perfil
+
+    def _guardar(self, usuario_id: int, perfil: Optional[PerfilUsuario], agora: float):
+        self._entradas[usuario_id] = (perfil, agora + self._ttl)
+        self._entradas.move_to_end(usuario_id)
+        while len(self._entradas) > self._max:
+            self._entradas.popitem(last=False)
+            self.descartadas += 1
+
+    def registrar(self, usuario: Usuario):
+        """Guarda o perfil de um usuário recém-lido do banco (ex.: no login)."""
+        with self._lock:
+            self._guardar(usuario.id, PerfilUsuario(usuario.tipo, usuario.ativo), time.monotonic())
+
+    def invalidar(self, usuario_id: Optional[int] = None):
+        """Descarta a entrada do usuário (ou todas, sem usuario_id)."""
+        with self._lock:
+            if usuario_id is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(usuario_id, None)
+            self._geracao += 1
+            self.invalidacoes += 1
+
+    def estatisticas(self) -> dict:
+        """Contadores de uso do cache."""
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": round(self.acertos / total, 4) if total else None,
+                "expiradas": self.expiradas,
+                "descartadas_lru": self.descartadas,
+                "invalidacoes": self.invalidacoes,
+                "entradas": len(self._entradas),
+                "max_entradas": self._max,
+                "ttl_s": self._ttl,
+            }
+
+
+# Instâncias únicas usadas pela aplicação
+catalogo_salas = CatalogoSalas()
+cache_autorizacao = CacheAutorizacao()
@@ -0,0 +1,184 @@
+from typing import List, Optional, Tuple
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException, status
+from sqlmodel import Session, select
+from sqlalchemy.orm import aliased
+
+from models.models import (
+    Usuario, Sala, Reserva, StatusReserva, EventoChave, PosseChave, TipoEventoChave,
+    RetiradaChaveInput, DevolucaoChaveInput
+)
+from consultas import LIMITE_PADRAO, LIMITE_MAXIMO
+from database import iniciar_escrita
+from eventos import hub_eventos
+import config
+
+# Controle Físico das Chaves
+#
+# Cada retirada e devolução vira uma linha de EventoChave, que nunca é alterada nem
+# apagada. Na mesma transação, PosseChave guarda quem está com cada chave agora (uma
+# linha por chave fora do claviculário). "Quem está com a chave da sala X" e "quais
+# chaves estão atrasadas" leem só essa tabela, que nunca passa do número de salas, por
+# maior que fique o histórico. As funções recebem a Session síncrona primeiro, como em
+# servicos.py, e rodam via database.executar.
+
+
+def _agora() -> datetime:
+    return datetime.now().replace(microsecond=0)
+
+
+def _posse_em_conflito(session: Session, posse: PosseChave):
+    usuario = session.get(Usuario, posse.usuario_id)
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=(
+            f"A chave desta sala já está com {usuario.nome if usuario else 'outro usuário'} desde "
+            f"{posse.retirada_em:%d/%m/%Y %H:%M} (reserva {posse.reserva_id})."
+        ),
+    )
+
+
+def _publicar(evento: EventoChave, sala: Sala):
+    hub_eventos.publicar(evento.usuario_id, "chave", {
+        "acao": evento.tipo.value,
+        "sala_id": evento.sala_id,
+        "sala_nome": sala.nome,
+        "reserva_id": evento.reserva_id,
+        "momento": evento.momento.isoformat(),
+    })
+
+
+# Retirada e Devolução
+
+def retirar_chave(session: Session, dados: RetiradaChaveInput, registrado_por: int) -> dict:
+    """
+    Entrega a chave da sala ao dono de uma reserva APROVADA, a partir de
+    config.CHAVES_ANTECEDENCIA_MIN minutos antes do início e até o fim da reserva.
+    """
+    iniciar_escrita(session)
+    reserva = session.get(Reserva, dados.reserva_id)
+    if not reserva:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Reserva não encontrada.")
+    if reserva.status != StatusReserva.APROVADA:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Só reservas aprovadas dão direito à chave (esta está {reserva.status.value.upper()}).",
+        )
+
+    agora = _agora()
+    inicio = datetime.combine(reserva.data, reserva.hora_inicio)
+    fim = datetime.combine(reserva.data, reserva.hora_fim)
+    if not inicio - timedelta(minutes=config.CHAVES_ANTECEDENCIA_MIN) <= agora < fim:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=(
+                f"Fora do horário da reserva: a chave pode ser retirada de "
+                f"{inicio - timedelta(minutes=config.CHAVES_ANTECEDENCIA_MIN):%d/%m/%Y %H:%M} até {fim:%H:%M}."
+            ),
+        )
+
+    posse = session.get(PosseChave, reserva.sala_id)
+    if posse:
+        _posse_em_conflito(session, posse)
+
+    evento = EventoChave(
+        tipo=TipoEventoChave.RETIRADA, sala_id=reserva.sala_id, reserva_id=reserva.id, usuario_id=reserva.usuario_id,
+        registrado_por=registrado_por, momento=agora, observacao=dados.observacao,
+    )
+    session.add(evento)
+    # O ID do evento entra na posse, gravada na mesma transação
+    session.flush()
+    session.add(PosseChave(
+        sala_id=reserva.sala_id, usuario_id=reserva.usuario_id, reserva_id=reserva.id, evento_id=evento.id,
+        retirada_em=agora, devolver_ate=fim,
+    ))
+    session.commit()
+    sala = session.get(Sala, reserva.sala_id)
+    _publicar(evento, sala)
+
+    return {"evento_id": evento.id, "sala_id": evento.sala_id, "sala_nome": sala.nome, "usuario_id": evento.usuario_id,
+            "reserva_id": evento.reserva_id, "retirada_em": agora, "devolver_ate": fim}
+
+
+def devolver_chave(session: Session, dados: DevolucaoChaveInput, registrado_por: int) -> dict:
+    """Recebe de volta a chave da sala e encerra a posse; informa o atraso, se houver."""
+    iniciar_escrita(session)
+    sala = session.get(Sala, dados.sala_id)
+    if not sala:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sala não encontrada.")
+    posse = session.get(PosseChave, dados.sala_id)
+    if not posse:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A chave desta sala não está retirada.")
+
+    agora = _agora()
+    evento = EventoChave(
+        tipo=TipoEventoChave.DEVOLUCAO, sala_id=posse.sala_id, reserva_id=posse.reserva_id, usuario_id=posse.usuario_id,
+        registrado_por=registrado_por, momento=agora, observacao=dados.observacao,
+    )
+    atraso = max(0, int((agora - posse.devolver_ate).total_seconds() // 60))
+    session.add(evento)
+    session.delete(posse)
+    session.commit()
+    _publicar(evento, sala)
+
+    return {"evento_id": evento.id, "sala_id": sala.id, "sala_nome": sala.nome, "usuario_id": evento.usuario_id,
+            "reserva_id": evento.reserva_id, "devolvida_em": agora, "atraso_minutos": atraso}
+
+
+# Consultas
+
+def listar_posses(session: Session, somente_atrasadas: bool = False) -> List[dict]:
+    """
+    Chaves fora do claviculário agora, com quem está com cada uma. As atrasadas (prazo
+    vencido) vêm de uma faixa do índice de devolver_ate.
+    """
+    agora = _agora()
+    consulta = (
+        select(PosseChave, Sala.nome, Usuario.nome)
+        .join(Sala, Sala.id == PosseChave.sala_id)
+        .join(Usuario, Usuario.id == PosseChave.usuario_id)
+        .order_by(PosseChave.devolver_ate)
+    )
+    if somente_atrasadas:
+        consulta = consulta.where(PosseChave.devolver_ate < agora)
+
+    return [
+        {
+            "sala_id": posse.sala_id, "sala_nome": sala_nome, "usuario_id": posse.usuario_id, "usuario_nome": usuario_nome,
+            "reserva_id": posse.reserva_id, "retirada_em": posse.retirada_em, "devolver_ate": posse.devolver_ate,
+            "atrasada": posse.devolver_ate < agora,
+            "atraso_minutos": max(0, int((agora - posse.devolver_ate).total_seconds() // 60)),
+        }
+        for posse, sala_nome, usuario_nome in session.exec(consulta).all()
+    ]
+
+
+def historico_sala(session: Session, sala_id: int, antes_de: Optional[int] = None,
+                   limite: int = LIMITE_PADRAO) -> Tuple[List[dict], Optional[int]]:
+    """
+    Movimentos da chave de uma sala, do mais recente ao mais antigo, paginados pelo ID do
+    evento (keyset em (sala_id, id)). Retorna a página e o 'antes_de' da próxima.
+    """
+    limite = max(1, min(limite, LIMITE_MAXIMO))
+    registrador = aliased(Usuario)
+    consulta = (
+        select(EventoChave, Usuario.nome, registrador.nome)
+        .join(Usuario, Usuario.id == EventoChave.usuario_id)
+        .join(registrador, registrador.id == EventoChave.registrado_por)
+        .where(EventoChave.sala_id == sala_id)
+    )
+    if antes_de is not None:
+        consulta = consulta.where(EventoChave.id < antes_de)
+    linhas = session.exec(consulta.order_by(EventoChave.id.desc()).limit(limite + 1)).all()
+
+    proximo = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        proximo = linhas[-1][0].id
+    return [
+        {"id": evento.id, "tipo": evento.tipo.value, "reserva_id": evento.reserva_id, "usuario_id": evento.usuario_id,
+         "usuario_nome": usuario_nome, "registrado_por": registrado_nome, "momento": evento.momento,
+         "observacao": evento.observacao}
+        for evento, usuario_nome, registrado_nome in linhas
+    ], proximo
@@ -0,0 +1,154 @@
+import os
+import tempfile
+from pathlib import Path
+
+# Configurações da aplicação, lidas de variáveis de ambiente com valores padrão
+
+
+def _env_int(nome: str, padrao: int) -> int:
+    """Lê uma variável de ambiente inteira, usando o padrão se ausente ou vazia."""
+    valor = os.getenv(nome)
+    return int(valor) if valor else padrao
+
+
+# Senhas
+
+# Custo do bcrypt (log2 do número de iterações). Cada +1 dobra o tempo de hash.
+BCRYPT_ROUNDS = _env_int("LABKEY_BCRYPT_ROUNDS", 12)
+# Número máximo de threads dedicadas ao cálculo de hashes de senha
+HASH_WORKERS = _env_int("LABKEY_HASH_WORKERS", min(4, os.cpu_count() or 1))
+
+
+# Banco de Dados
+
+BASE_DIR = Path(__file__).parent
+# String de conexão (SQLite local por padrão; aceita também postgresql://...)
+DATABASE_URL = os.getenv("LABKEY_DATABASE_URL") or f"sqlite:///{BASE_DIR / 'labkey.db'}"
+# Modo de acesso ao banco nas rotas de reserva/sala: "sync" (threadpool) ou "async" (asyncio)
+DB_MODO = os.getenv("LABKEY_DB_MODO", "sync").lower()
+
+# Pool de conexões: leitores simultâneos + o escritor (no SQLite só há um escritor por vez)
+DB_POOL_SIZE = _env_int("LABKEY_DB_POOL_SIZE", 8)
+DB_MAX_OVERFLOW = _env_int("LABKEY_DB_MAX_OVERFLOW", 4)
+# Segundos que uma requisição espera por uma conexão livre do pool
+DB_POOL_TIMEOUT = _env_int("LABKEY_DB_POOL_TIMEOUT", 30)
+
+# Perfis de PRAGMAs aplicados a cada nova conexão SQLite
+SQLITE_PERFIS = {
+    # Comportamento padrão do SQLite (journal de rollback), apenas com espera por lock
+    "padrao": {
+        "busy_timeout": 5000,
+    },
+    # WAL: leitores não bloqueiam o escritor; synchronous=NORMAL é seguro com WAL
+    "producao": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -65536,       # 64 MiB (valor negativo = KiB)
+        "mmap_size": 268435456,     # 256 MiB
+        "temp_store": "MEMORY",
+    },
+}
+SQLITE_PERFIL = os.getenv("LABKEY_SQLITE_PERFIL", "producao").lower()
+# Ajustes pontuais sobre o perfil, no formato "pragma=valor,pragma=valor"
+SQLITE_PRAGMAS_EXTRAS = os.getenv("LABKEY_SQLITE_PRAGMAS", "")
+
+
+# Caches em Memória
+
+# Intervalo mínimo (ms) entre consultas à versão do catálogo de salas no banco, usada para
+# perceber alterações feitas por outros processos. 0 = consulta a cada acesso.
+CACHE_SALAS_VERIFICACAO_MS = _env_int("LABKEY_CACHE_SALAS_VERIFICACAO_MS", 1000)
+
+# Cache de autorização (tipo e situação de cada usuário logado)
+CACHE_USUARIOS_TTL_S = _env_int("LABKEY_CACHE_USUARIOS_TTL_S", 60)
+CACHE_USUARIOS_MAX = _env_int("LABKEY_CACHE_USUARIOS_MAX", 10000)
+CACHE_USUARIOS_VERIFICACAO_MS = _env_int("LABKEY_CACHE_USUARIOS_VERIFICACAO_MS", 1000)
+
+# Dias mantidos na grade de ocupação (disponibilidade.py); os usados há mais tempo saem primeiro
+GRADE_MAX_DIAS = _env_int("LABKEY_GRADE_MAX_DIAS", 400)
+
+
+# Métricas
+
+# Requisições acima de qualquer um destes limites são registradas no log de lentidão
+METRICAS_LENTA_MS = _env_int("LABKEY_METRICAS_LENTA_MS", 500)
+METRICAS_LENTA_CONSULTAS = _env_int("LABKEY_METRICAS_LENTA_CONSULTAS", 50)
+# Comandos SQL individuais acima deste tempo também vão para o log
+METRICAS_SQL_LENTA_MS = _env_int("LABKEY_METRICAS_SQL_LENTA_MS", 200)
+
+
+# Templates
+
+# Pasta do cache de bytecode do Jinja2 (templates já compilados); vazio desliga o cache
+JINJA_CACHE_DIR = os.getenv("LABKEY_JINJA_CACHE_DIR", str(Path(tempfile.gettempdir()) / "labkey-jinja"))
+
+
+# Chaves
+
+# Minutos antes do início da reserva a partir dos quais a chave já pode ser retirada
+CHAVES_ANTECEDENCIA_MIN = _env_int("LABKEY_CHAVES_ANTECEDENCIA_MIN", 30)
+
+
+# Tarefas Periódicas
+
+# 0 desliga o agendador (expiração de pendentes e conclusão de reservas passadas)
+AGENDADOR_ATIVO = _env_int("LABKEY_AGENDADOR_ATIVO", 1) != 0
+# Segundos entre execuções de cada tarefa (somando todos os workers)
+AGENDADOR_INTERVALO_S = _env_int("LABKEY_AGENDADOR_INTERVALO_S", 300)
+# Reservas alteradas por transação, e pausa (ms) entre transações para os demais escritores
+AGENDADOR_LOTE = _env_int("LABKEY_AGENDADOR_LOTE", 500)
+AGENDADOR_PAUSA_MS = _env_int("LABKEY_AGENDADOR_PAUSA_MS", 20)
+# Validade (s) da trava de uma tarefa; cada execução para na metade desse tempo
+AGENDADOR_TRAVA_S = _env_int("LABKEY_AGENDADOR_TRAVA_S", 120)
+
+# Reservas encerradas há mais que estes dias vão para a tabela de arquivo; 0 desliga
+ARQUIVO_HORIZONTE_DIAS = _env_int("LABKEY_ARQUIVO_HORIZONTE_DIAS", 365)
+
+
+# Limites de Taxa e Concorrência
+
+# 0 desliga os limites de taxa (ex.: testes de carga vindos de um só IP)
+LIMITES_ATIVOS = _env_int("LABKEY_LIMITES_ATIVOS", 1) != 0
+# Baldes de tokens: nome -> (rajada, requisições por minuto). Um campus atrás de NAT
+# compartilha o IP, então os limites por IP são bem mais folgados que os por usuário.
+LIMITES_TAXA = {
+    "login_ip": (30, 30),
+    "reservas_usuario": (20, 60),
+    "reservas_ip": (300, 900),
+}
+# Ajustes pontuais, no formato "nome=rajada/por_minuto,nome=rajada/por_minuto"
+LIMITES_TAXA_EXTRAS = os.getenv("LABKEY_LIMITES_TAXA", "")
+# Arquivo SQLite com os baldes compartilhado entre os workers; vazio = estado só em memória
+LIMITES_SQLITE = os.getenv("LABKEY_LIMITES_SQLITE", "")
+# Usa o primeiro endereço do X-Forwarded-For como IP do cliente (só atrás de um proxy confiável)
+LIMITES_PROXY_CONFIAVEL = _env_int("LABKEY_LIMITES_PROXY_CONFIAVEL", 0) != 0
+
+# Controle de admissão por processo: requisições simultâneas em cada grupo de rotas,
+# quantas podem esperar na fila e por quanto tempo (ms) antes de receberem 503
+CONCORRENCIA_ESCRITAS = _env_int("LABKEY_CONCORRENCIA_ESCRITAS", 8)
+CONCORRENCIA_LOGIN = _env_int("LABKEY_CONCORRENCIA_LOGIN", 2 * HASH_WORKERS)
+CONCORRENCIA_FILA = _env_int("LABKEY_CONCORRENCIA_FILA", 32)
+CONCORRENCIA_ESPERA_MS = _env_int("LABKEY_CONCORRENCIA_ESPERA_MS", 2000)
+
+
+def limites_taxa() -> dict:
+    """Retorna os limites de taxa configurados, com os ajustes extras aplicados por cima."""
+    limites = dict(LIMITES_TAXA)
+    for item in filter(None, (p.strip() for p in LIMITES_TAXA_EXTRAS.split(","))):
+        nome, _, valor = item.partition("=")
+        rajada, _, por_minuto = valor.partition("/")
+        limites[nome.strip()] = (int(rajada), int(por_minuto))
+    return limites
+
+
+def pragmas_sqlite(perfil: str = None) -> dict:
+    """Retorna os PRAGMAs do perfil escolhido, com os ajustes extras aplicados por cima."""
+    perfil = perfil or SQLITE_PERFIL
+    if perfil not in SQLITE_PERFIS:
+        raise ValueError(f"Perfil SQLite desconhecido: '{perfil}'. Opções: {', '.join(SQLITE_PERFIS)}.")
+    pragmas = dict(SQLITE_PERFIS[perfil])
+    for item in filter(None, (p.strip() for p in SQLITE_PRAGMAS_EXTRAS.split(","))):
+        nome, _, valor = item.partition("=")
+        pragmas[nome.strip()] = valor.strip()
+    return pragmas
@@ -0,0 +1,89 @@
+from typing import Dict, List, Optional
+from sqlmodel import Session, select
+from datetime import date, time
+
+from models.models import Reserva, StatusReserva
+
+# Status que ocupam a sala e, portanto, participam da verificação de conflito
+STATUS_ATIVOS = [StatusReserva.PENDENTE, StatusReserva.APROVADA]
+
+
+# Detecção de Conflitos de Horário
+
+def buscar_conflito(
+    session: Session,
+    sala_id: int,
+    data: date,
+    hora_inicio: time,
+    hora_fim: time,
+    ignorar_id: Optional[int] = None,
+) -> Optional[Reserva]:
+    """
+    Retorna uma reserva ativa da mesma sala e dia cujo intervalo se sobrepõe a [hora_inicio, hora_fim).
+    A consulta percorre apenas o índice (sala_id, data, hora_inicio), então o custo não cresce
+    com o histórico de reservas. Intervalos que apenas se encostam não são conflito.
+    """
+    consulta = (
+        select(Reserva)
+        .where(Reserva.sala_id == sala_id)
+        .where(Reserva.data == data)
+        .where(Reserva.hora_inicio < hora_fim)
+        .where(Reserva.hora_fim > hora_inicio)
+        .where(Reserva.status.in_(STATUS_ATIVOS))
+    )
+    # Na edição, a própria reserva não conta como conflito
+    if ignorar_id is not None:
+        consulta = consulta.where(Reserva.id != ignorar_id)
+
+    return session.exec(consulta.limit(1)).first()
+
+
+def buscar_conflitos_em_lote(
+    session: Session,
+    sala_id: int,
+    datas: List[date],
+    hora_inicio: time,
+    hora_fim: time,
+) -> Dict[date, Reserva]:
+    """
+    Versão em lote de buscar_conflito para uma série de datas com o mesmo horário:
+    uma única consulta (data IN ...) pelo mesmo índice, retornando a primeira reserva
+    ativa conflitante de cada data que tiver conflito.
+    """
+    conflitos = {}
+    if not datas:
+        return conflitos
+    linhas = session.exec(
+        select(Reserva)
+        .where(Reserva.sala_id == sala_id)
+        .where(Reserva.data.in_(datas))
+        .where(Reserva.hora_inicio < hora_fim)
+        .where(Reserva.hora_fim > hora_inicio)
+        .where(Reserva.status.in_(STATUS_ATIVOS))
+        .order_by(Reserva.data, Reserva.hora_inicio)
+    ).all()
+    for reserva in linhas:
+        conflitos.setdefault(reserva.data, reserva)
+    return conflitos
+
+
+def buscar_ativas_por_sala_e_dia(session: Session, pares) -> Dict[tuple, List[tuple]]:
+    """
+    Intervalos (hora_inicio, hora_fim, id) das reservas ativas de cada par (sala_id, data)
+    informado, numa única consulta pelo índice (sala_id, data, hora_inicio).
+    """
+    pares = set(pares)
+    ocupacao = {par: [] for par in pares}
+    if not pares:
+        return ocupacao
+    linhas = session.exec(
+        select(Reserva.id, Reserva.sala_id, Reserva.data, Reserva.hora_inicio, Reserva.hora_fim)
+        .where(Reserva.sala_id.in_({sala_id for sala_id, _ in pares}))
+        .where(Reserva.data.in_({data for _, data in pares}))
+        .where(Reserva.status.in_(STATUS_ATIVOS))
+    ).all()
+    for linha in linhas:
+        intervalos = ocupacao.get((linha.sala_id, linha.data))
+        if intervalos is not None:
+            intervalos.append((linha.hora_inicio, linha.hora_fim, linha.id))
+    return ocupacao
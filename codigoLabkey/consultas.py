@@ -0,0 +1,118 @@
+from typing import Optional
+from sqlmodel import Session, select
+from sqlalchemy import tuple_, union_all
+from datetime import date
+import base64
+
+# Importa os modelos usados nas consultas de listagem
+from models.models import Usuario, Sala, Reserva, ReservaArquivada, FiltroReservas
+
+# Limites de tamanho de página para as listagens
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 200
+
+
+# Consultas de Listagem de Reservas
+
+def select_reservas_detalhadas(tabela=Reserva):
+    """
+    Monta a consulta que traz a reserva junto com o nome da sala e do usuário.
+    Os JOINs substituem os carregamentos preguiçosos de 'reserva.sala' e
+    'reserva.usuario', mantendo a listagem em uma única ida ao banco.
+    'tabela' pode ser ReservaArquivada, que tem as mesmas colunas.
+    """
+    return (
+        select(
+            tabela.id,
+            tabela.data,
+            tabela.hora_inicio,
+            tabela.hora_fim,
+            tabela.status,
+            tabela.sala_id,
+            tabela.usuario_id,
+            tabela.versao,
+            Sala.nome.label("sala_nome"),
+            Usuario.nome.label("usuario_nome"),
+        )
+        .join(Sala, Sala.id == tabela.sala_id)
+        .join(Usuario, Usuario.id == tabela.usuario_id)
+    )
+
+
+def aplicar_filtros(consulta, filtros: Optional[FiltroReservas], tabela=Reserva):
+    """Aplica à consulta os filtros de período, sala, usuário e status informados."""
+    if filtros is None:
+        return consulta
+    if filtros.data_inicio is not None:
+        consulta = consulta.where(tabela.data >= filtros.data_inicio)
+    if filtros.data_fim is not None:
+        consulta = consulta.where(tabela.data <= filtros.data_fim)
+    if filtros.sala_id is not None:
+        consulta = consulta.where(tabela.sala_id == filtros.sala_id)
+    if filtros.usuario_id is not None:
+        consulta = consulta.where(tabela.usuario_id == filtros.usuario_id)
+    if filtros.status is not None:
+        consulta = consulta.where(tabela.status == filtros.status)
+    return consulta
+
+
+def select_reservas_com_arquivo(filtros: Optional[FiltroReservas] = None):
+    """
+    Reservas detalhadas das duas tabelas (ativa e arquivo), com os mesmos filtros, em ordem
+    cronológica. Cada lado é lido pelo seu índice (data, id) e o banco intercala os dois.
+    """
+    uniao = union_all(
+        aplicar_filtros(select_reservas_detalhadas(ReservaArquivada), filtros, ReservaArquivada),
+        aplicar_filtros(select_reservas_detalhadas(), filtros),
+    ).subquery()
+    return select(uniao).order_by(uniao.c.data, uniao.c.id)
+
+
+# Paginação por Cursor (Keyset)
+
+def codificar_cursor(data: date, reserva_id: int) -> str:
+    """Gera o cursor opaco a partir da chave (data, id) da última linha da página."""
+    bruto = f"{data.isoformat()}|{reserva_id}"
+    return base64.urlsafe_b64encode(bruto.encode()).decode()
+
+
+def decodificar_cursor(cursor: str):
+    """Converte o cursor de volta para a tupla (data, id). Levanta ValueError se for inválido."""
+    try:
+        bruto = base64.urlsafe_b64decode(cursor.encode()).decode()
+        data_str, id_str = bruto.split("|")
+        return date.fromisoformat(data_str), int(id_str)
+    except Exception:
+        raise ValueError("Cursor inválido.")
+
+
+def paginar_reservas(
+    session: Session,
+    filtros: Optional[FiltroReservas] = None,
+    cursor: Optional[str] = None,
+    limite: int = LIMITE_PADRAO,
+):
+    """
+    Retorna uma página de reservas ordenada por (data, id) decrescente e o cursor da próxima página.
+    A página seguinte começa logo após a chave do cursor (WHERE (data, id) < cursor), então
+    páginas profundas custam o mesmo que a primeira, sem OFFSET.
+    """
+    limite = max(1, min(limite, LIMITE_MAXIMO))
+    consulta = aplicar_filtros(select_reservas_detalhadas(), filtros)
+
+    if cursor:
+        cursor_data, cursor_id = decodificar_cursor(cursor)
+        consulta = consulta.where(tuple_(Reserva.data, Reserva.id) < tuple_(cursor_data, cursor_id))
+
+    # Busca uma linha extra apenas para saber se existe próxima página
+    linhas = session.exec(
+        consulta.order_by(Reserva.data.desc(), Reserva.id.desc()).limit(limite + 1)
+    ).all()
+
+    proximo_cursor = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        ultima = linhas[-1]
+        proximo_cursor = codificar_cursor(ultima.data, ultima.id)
+
+    return linhas, proximo_cursor
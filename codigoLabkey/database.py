@@ -0,0 +1,186 @@
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy import event
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+
+import threading
+
+import config
+from migracoes import aplicar_migracoes
+
+# Configuração do Banco de Dados
+
+url = make_url(config.DATABASE_URL)
+
+# Drivers assíncronos equivalentes aos síncronos
+DRIVERS_ASYNC = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def url_async(url_sync):
+    """Converte a URL síncrona para o driver assíncrono do mesmo banco."""
+    backend = url_sync.get_backend_name()
+    if backend not in DRIVERS_ASYNC:
+        raise ValueError(f"Banco '{backend}' sem driver assíncrono configurado.")
+    return url_sync.set(drivername=f"{backend}+{DRIVERS_ASYNC[backend]}")
+
+
+def configurar_sqlite(engine_sync, pragmas: dict, trava_escrita=None):
+    """
+    Registra no engine os eventos que aplicam o perfil de PRAGMAs a cada nova conexão
+    e assumem o controle do BEGIN: transações começam com BEGIN (DEFERRED) e as de
+    escrita (ver iniciar_escrita) com BEGIN IMMEDIATE, que reserva o lock de escrita
+    logo no início. Assim o escritor espera pelo busy_timeout em vez de falhar com
+    "database is locked" ao tentar promover uma leitura a escrita.
+
+    Com 'trava_escrita' (engine síncrono), os escritores do processo fazem fila nessa
+    trava antes do BEGIN IMMEDIATE, em vez de disputarem o lock do arquivo pelo busy
+    handler do SQLite, que faz polling e pode deixar um escritor esperando demais.
+    """
+    @event.listens_for(engine_sync, "connect")
+    def aplicar_pragmas(dbapi_connection, connection_record):
+        # Desliga o BEGIN automático do driver; o evento "begin" abaixo o emite
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for nome, valor in pragmas.items():
+            cursor.execute(f"PRAGMA {nome}={valor}")
+        cursor.close()
+
+    @event.listens_for(engine_sync, "begin")
+    def iniciar_transacao(conn):
+        escrita = conn.get_execution_options().get("escrita", False)
+        if escrita and trava_escrita is not None:
+            trava_escrita.acquire()
+            conn.info["trava_escrita"] = True
+        try:
+            conn.exec_driver_sql("BEGIN IMMEDIATE" if escrita else "BEGIN DEFERRED")
+        except Exception:
+            liberar_trava(conn)
+            raise
+
+    @event.listens_for(engine_sync, "commit")
+    @event.listens_for(engine_sync, "rollback")
+    def liberar_trava(conn):
+        if conn.info.pop("trava_escrita", False):
+            trava_escrita.release()
+
+
+def criar_engine(url_banco, perfil: str = None, assincrono: bool = False):
+    """
+    Cria o engine (síncrono ou assíncrono) com o pool dimensionado pela configuração
+    e, no SQLite, com o perfil de PRAGMAs escolhido.
+    """
+    url_banco = make_url(url_banco)
+    sqlite = url_banco.get_backend_name() == "sqlite"
+    opcoes = {
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+    }
+    # Argumentos específicos para SQLite no FastAPI
+    if sqlite:
+        opcoes["connect_args"] = {"check_same_thread": False}
+
+    if assincrono:
+        novo = create_async_engine(url_async(url_banco), **opcoes)
+        engine_sync = novo.sync_engine
+    else:
+        novo = engine_sync = create_engine(url_banco, **opcoes)
+
+    if sqlite:
+        # A trava só é usada no engine síncrono: no assíncrono ela bloquearia o event loop
+        configurar_sqlite(engine_sync, config.pragmas_sqlite(perfil), None if assincrono else threading.Lock())
+    return novo
+
+
+# Engine síncrono: usado pelas páginas HTML, scripts e criação das tabelas
+engine = criar_engine(url)
+
+# Engine assíncrono: criado apenas no modo "async"
+engine_async = criar_engine(url, assincrono=True) if config.DB_MODO == "async" else None
+
+
+def create_db():
+    """Cria as tabelas que ainda não existem e aplica as migrações pendentes."""
+    SQLModel.metadata.create_all(engine)
+    # create_all não altera tabelas existentes: as migrações completam o schema
+    aplicar_migracoes(engine)
+
+
+def iniciar_escrita(session: Session):
+    """
+    Marca a transação da sessão como de escrita (BEGIN IMMEDIATE no SQLite).
+    Se a sessão já estiver numa transação só de leitura (ex.: a autenticação consultou o
+    usuário na mesma sessão), ela é encerrada antes: promover uma leitura a escrita no
+    SQLite falha com "database is locked" quando outro escritor confirmou nesse meio-tempo.
+    """
+    if session.in_transaction():
+        if session.connection().get_execution_options().get("escrita") or session.new or session.dirty or session.deleted:
+            return
+        session.commit()
+    session.connection(execution_options={"escrita": True})
+
+
+def salvar(session: Session, objeto):
+    """Adiciona (ou atualiza) o objeto, confirma a transação e o recarrega do banco."""
+    iniciar_escrita(session)
+    session.add(objeto)
+    session.commit()
+    session.refresh(objeto)
+    return objeto
+
+
+# Dependências
+
+def get_session():
+    """
+    Dependência que fornece uma sessão de banco de dados do SQLModel.
+    Garante que a sessão seja fechada após o uso.
+    """
+    with Session(engine) as session:
+        yield session
+
+
+async def obter_sessao():
+    """
+    Dependência das rotas 'async def' de reservas e salas, conforme o modo configurado:
+    AsyncSession no modo "async"; Session síncrona (usada via threadpool) no modo "sync".
+
+    No modo "async" a sessão é aberta aqui mesmo: se a rota levantar uma exceção, ela
+    chega a este gerador, que desfaz a transação e fecha a sessão na hora, liberando o
+    lock de escrita (BEGIN IMMEDIATE) em vez de deixá-lo preso à conexão.
+    expire_on_commit=False evita recarregamentos implícitos (que exigiriam await) após o commit.
+    """
+    if config.DB_MODO == "async":
+        async with AsyncSession(engine_async, expire_on_commit=False) as session:
+            try:
+                yield session
+            except Exception:
+                await session.rollback()
+                raise
+            finally:
+                await session.close()
+    else:
+        session = Session(engine)
+        try:
+            yield session
+        finally:
+            await run_in_threadpool(session.close)
+
+
+# obter_sessao() fora do sistema de dependências, para rotas que só precisam do banco por
+# um instante (ex.: o fluxo SSE, que não deve prender uma conexão enquanto fica aberto)
+sessao_avulsa = asynccontextmanager(obter_sessao)
+
+
+async def executar(session, funcao, *args, **kwargs):
+    """
+    Executa 'funcao(session_sincrona, *args, **kwargs)' sem bloquear o event loop.
+    No modo "async" usa AsyncSession.run_sync; no modo "sync" roda a função no threadpool.
+    Assim a mesma lógica de acesso ao banco atende aos dois modos.
+    """
+    if isinstance(session, AsyncSession):
+        return await session.run_sync(funcao, *args, **kwargs)
+    return await run_in_threadpool(funcao, session, *args, **kwargs)
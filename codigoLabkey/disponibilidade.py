@@ -0,0 +1,236 @@
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+from sqlmodel import Session, select
+from datetime import date, time, timedelta
+import threading
+
+from models.models import Sala, Reserva
+from conflitos import STATUS_ATIVOS
+from caches import versao_cache, VERSAO_RESERVAS
+import config
+
+# Granularidade da grade: 15 minutos -> 96 slots por dia
+MINUTOS_POR_SLOT = 15
+SLOTS_POR_DIA = 24 * 60 // MINUTOS_POR_SLOT
+# Maior intervalo aceito numa única busca de disponibilidade
+MAX_DIAS_BUSCA = 31
+
+
+def slot_inicio(hora: time) -> int:
+    """Slot que contém o horário de início (arredonda para baixo)."""
+    return (hora.hour * 60 + hora.minute) // MINUTOS_POR_SLOT
+
+
+def slot_fim(hora: time) -> int:
+    """Primeiro slot após o horário de término (arredonda para cima)."""
+    minutos = hora.hour * 60 + hora.minute + (1 if hora.second or hora.microsecond else 0)
+    return min(SLOTS_POR_DIA, -(-minutos // MINUTOS_POR_SLOT))
+
+
+# Grade de Ocupação em Memória
+
+class GradeOcupacao:
+    """
+    Índice em memória da ocupação das salas: para cada dia, um bytearray de 96 posições
+    (slots de 15 min) por sala, onde cada posição conta as reservas ativas que cobrem aquele slot.
+
+    Os dias são carregados do banco sob demanda, na primeira consulta, e depois mantidos
+    de forma incremental pelos endpoints que criam, editam ou mudam o status de reservas.
+    Cada processo mantém a sua própria grade. Alterações que não passam por registrar()
+    (outros processos, scripts, arquivamento) são percebidas pela versão 'reservas' da
+    tabela VersaoCache, conferida antes de cada busca: se a grade não conhece a versão
+    atual, os dias carregados são descartados. Só os 'max_dias' dias usados mais
+    recentemente ficam em memória.
+    """
+
+    def __init__(self, max_dias: int = config.GRADE_MAX_DIAS):
+        self._lock = threading.Lock()
+        self._max_dias = max_dias
+        # Dias carregados -> {sala_id: slots}, do usado há mais tempo para o mais recente (LRU)
+        self._dias: "OrderedDict[date, Dict[int, bytearray]]" = OrderedDict()
+        # O que cada reserva marcou na grade, para que as atualizações sejam idempotentes
+        self._marcacoes: Dict[int, Tuple[int, date, int, int]] = {}
+        self._reservas_do_dia: Dict[date, set] = {}
+        # Dias com leitura do banco em andamento -> alterações recebidas durante a leitura
+        self._carregando: Dict[date, list] = {}
+        # Versão 'reservas' refletida pela grade; cada descarte inicia uma nova geração
+        self._versao: Optional[int] = None
+        self._geracao = 0
+
+    def _marcar(self, reserva_id: int, sala_id: int, dia: date, inicio: int, fim: int):
+        slots = self._dias[dia].setdefault(sala_id, bytearray(SLOTS_POR_DIA))
+        for i in range(inicio, fim):
+            slots[i] = min(255, slots[i] + 1)
+        self._marcacoes[reserva_id] = (sala_id, dia, inicio, fim)
+        self._reservas_do_dia.setdefault(dia, set()).add(reserva_id)
+
+    def _desmarcar(self, reserva_id: int):
+        marcacao = self._marcacoes.pop(reserva_id, None)
+        if marcacao is None:
+            return
+        sala_id, dia, inicio, fim = marcacao
+        self._reservas_do_dia[dia].discard(reserva_id)
+        slots = self._dias[dia][sala_id]
+        for i in range(inicio, fim):
+            slots[i] = max(0, slots[i] - 1)
+
+    def _descartar_dia(self, dia: date):
+        del self._dias[dia]
+        for reserva_id in self._reservas_do_dia.pop(dia, ()):
+            del self._marcacoes[reserva_id]
+
+    def _esvaziar(self):
+        """Descarta todos os dias; leituras em andamento deixam de valer (nova geração)."""
+        self._dias.clear()
+        self._marcacoes.clear()
+        self._reservas_do_dia.clear()
+        self._carregando.clear()
+        self._geracao += 1
+
+    def registrar(self, reserva: Reserva, versao: Optional[int] = None):
+        """
+        Atualiza a grade com o estado atual (já salvo) de uma reserva. 'versao' é a versão
+        'reservas' gravada junto com a alteração (ver incrementar_versao_cache): se for a
+        seguinte à conhecida, a grade passa a refleti-la; se for anterior, a grade já foi
+        recarregada com um estado mais novo e a alteração é ignorada.
+        """
+        ativa = reserva.status in STATUS_ATIVOS
+        marcacao = (reserva.id, reserva.sala_id, reserva.data,
+                    slot_inicio(reserva.hora_inicio), slot_fim(reserva.hora_fim))
+        with self._lock:
+            if versao is not None and self._versao is not None:
+                if versao < self._versao:
+                    return
+                if versao == self._versao + 1:
+                    self._versao = versao
+            self._desmarcar(reserva.id)
+            # Dia sendo lido do banco agora: aplica a alteração quando a leitura terminar
+            if reserva.data in self._carregando:
+                self._carregando[reserva.data].append((ativa, marcacao))
+                return
+            # Dias ainda não carregados serão lidos do banco quando consultados
+            if reserva.data not in self._dias:
+                return
+            if ativa:
+                self._marcar(*marcacao)
+
+    def _conferir_versao(self, session: Session):
+        """Descarta a grade se o banco tem alterações de reservas que ela não recebeu."""
+        versao = versao_cache(session, VERSAO_RESERVAS)
+        with self._lock:
+            if versao != self._versao:
+                self._esvaziar()
+                self._versao = versao
+
+    def _ler_dias(self, session: Session, dias: List[date]) -> Dict[date, list]:
+        """Reservas ativas dos dias, numa única consulta: {dia: [(id, sala_id, inicio, fim)]}."""
+        linhas = session.exec(
+            select(Reserva.id, Reserva.sala_id, Reserva.data, Reserva.hora_inicio, Reserva.hora_fim)
+            .where(Reserva.data.in_(dias))
+            .where(Reserva.status.in_(STATUS_ATIVOS))
+        ).all()
+        por_dia = {dia: [] for dia in dias}
+        for linha in linhas:
+            por_dia[linha.data].append((linha.id, linha.sala_id, slot_inicio(linha.hora_inicio), slot_fim(linha.hora_fim)))
+        return por_dia
+
+    def _carregar_dias(self, session: Session, dias: List[date]) -> Dict[date, list]:
+        """
+        Lê do banco os dias ainda não carregados e os coloca na grade; retorna o que foi lido.
+        A leitura acontece fora do lock (no modo async ela cede o event loop); alterações
+        registradas durante a leitura ficam pendentes e são aplicadas logo depois dela.
+        """
+        with self._lock:
+            faltando = [d for d in dias if d not in self._dias]
+            if not faltando:
+                return {}
+            for dia in faltando:
+                self._carregando.setdefault(dia, [])
+            geracao = self._geracao
+
+        lidos = self._ler_dias(session, faltando)
+
+        with self._lock:
+            # Grade descartada durante a leitura: o que foi lido só serve a esta consulta
+            if self._geracao != geracao:
+                return lidos
+            # Outra requisição pode ter concluído a carga de algum desses dias antes
+            for dia in (d for d in faltando if d not in self._dias):
+                self._dias[dia] = {}
+                for reserva_id, sala_id, inicio, fim in lidos[dia]:
+                    self._marcar(reserva_id, sala_id, dia, inicio, fim)
+                for ativa, marcacao in self._carregando.pop(dia, []):
+                    self._desmarcar(marcacao[0])
+                    if ativa:
+                        self._marcar(*marcacao)
+            while len(self._dias) > self._max_dias:
+                self._descartar_dia(next(iter(self._dias)))
+        return lidos
+
+    def salas_livres(
+        self,
+        session: Session,
+        salas: List[Sala],
+        dias: List[date],
+        hora_inicio: time,
+        hora_fim: time,
+    ) -> Dict[date, List[Sala]]:
+        """Para cada dia, retorna as salas (dentre as informadas) sem ocupação no intervalo."""
+        self._conferir_versao(session)
+        lidos = self._carregar_dias(session, dias)
+        inicio, fim = slot_inicio(hora_inicio), slot_fim(hora_fim)
+
+        while True:
+            with self._lock:
+                # Um dia descartado depois de carregado (nova versão ou LRU) é relido abaixo
+                faltando = [d for d in dias if d not in self._dias and d not in lidos]
+                if not faltando:
+                    return {dia: self._livres_no_dia(salas, dia, lidos, inicio, fim) for dia in dias}
+            lidos.update(self._ler_dias(session, faltando))
+
+    def _livres_no_dia(self, salas: List[Sala], dia: date, lidos: Dict[date, list], inicio: int, fim: int) -> List[Sala]:
+        """Salas livres no dia, pela grade ou pelas reservas lidas nesta consulta."""
+        if dia in self._dias:
+            self._dias.move_to_end(dia)
+            grade = self._dias[dia]
+            return [s for s in salas if s.id not in grade or not any(grade[s.id][inicio:fim])]
+        ocupadas = {sala_id for _, sala_id, a, b in lidos[dia] if a < fim and b > inicio}
+        return [s for s in salas if s.id not in ocupadas]
+
+    def invalidar(self):
+        """Descarta todos os dias; a próxima busca os relê do banco."""
+        with self._lock:
+            self._esvaziar()
+            self._versao = None
+
+    def estatisticas(self) -> dict:
+        """Tamanho da grade e versão conhecida."""
+        with self._lock:
+            return {"dias": len(self._dias), "max_dias": self._max_dias,
+                    "reservas": len(self._marcacoes), "versao": self._versao}
+
+
+# Instância única usada pela aplicação
+grade_ocupacao = GradeOcupacao()
+
+
+def filtrar_salas(salas: List[Sala], capacidade: Optional[int] = None, recursos: Optional[str] = None) -> List[Sala]:
+    """
+    Filtra as salas pela capacidade mínima e pelos recursos pedidos (lista separada por vírgulas).
+    Cada recurso pedido deve aparecer no campo 'recursos' da sala, sem diferenciar maiúsculas.
+    """
+    pedidos = [r.strip().lower() for r in (recursos or "").split(",") if r.strip()]
+    filtradas = []
+    for sala in salas:
+        if capacidade is not None and sala.capacidade < capacidade:
+            continue
+        recursos_sala = (sala.recursos or "").lower()
+        if all(pedido in recursos_sala for pedido in pedidos):
+            filtradas.append(sala)
+    return filtradas
+
+
+def intervalo_de_dias(data_inicio: date, data_fim: Optional[date] = None) -> List[date]:
+    """Lista os dias entre data_inicio e data_fim (inclusive)."""
+    data_fim = data_fim or data_inicio
+    return [data_inicio + timedelta(days=i) for i in range((data_fim - data_inicio).days + 1)]
@@ -0,0 +1,144 @@
+from typing import Dict, Set, Optional, AsyncIterator, Tuple
+from collections import defaultdict
+import asyncio
+import itertools
+import json
+import threading
+
+from models.models import Reserva
+
+# Eventos em Tempo Real (Server-Sent Events)
+#
+# Hub de difusão em memória, por processo: cada conexão SSE aberta é uma assinatura com
+# uma fila própria, indexada pelo usuário dono; administradores recebem tudo. Assinantes
+# ociosos não custam nada além da fila e de um "ping" periódico para manter a conexão viva.
+#
+# publicar() pode ser chamada de qualquer thread (as funções de servicos.py rodam no
+# threadpool no modo "sync" e dentro de run_sync no modo "async"): a entrega às filas é
+# sempre agendada no event loop em que as assinaturas foram criadas.
+
+# Eventos aguardando envio por conexão; um cliente lento perde os mais antigos
+TAMANHO_FILA = 100
+# Intervalo (s) entre comentários de keep-alive enviados às conexões ociosas
+INTERVALO_PING = 25
+# Espera sugerida (ms) ao navegador antes de reconectar
+RETRY_MS = 5000
+
+Evento = Tuple[int, str, dict]
+
+
+class Assinatura:
+    __slots__ = ("usuario_id", "admin", "fila")
+
+    def __init__(self, usuario_id: int, admin: bool):
+        self.usuario_id = usuario_id
+        self.admin = admin
+        self.fila: "asyncio.Queue[Evento]" = asyncio.Queue(maxsize=TAMANHO_FILA)
+
+
+class HubEventos:
+    def __init__(self):
+        self._por_usuario: Dict[int, Set[Assinatura]] = defaultdict(set)
+        self._admins: Set[Assinatura] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sequencia = itertools.count(1)
+        self._trava = threading.Lock()
+        self.publicados = 0
+        self.entregues = 0
+        self.descartados = 0
+
+    def inscrever(self, usuario_id: int, admin: bool) -> Assinatura:
+        """Cria a assinatura de uma conexão (chamar dentro do event loop)."""
+        self._loop = asyncio.get_running_loop()
+        assinatura = Assinatura(usuario_id, admin)
+        self._por_usuario[usuario_id].add(assinatura)
+        if admin:
+            self._admins.add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura: Assinatura):
+        assinaturas = self._por_usuario.get(assinatura.usuario_id)
+        if assinaturas is not None:
+            assinaturas.discard(assinatura)
+            if not assinaturas:
+                del self._por_usuario[assinatura.usuario_id]
+        self._admins.discard(assinatura)
+
+    def publicar(self, usuario_id: int, tipo: str, dados: dict):
+        """Envia o evento ao usuário afetado e aos administradores conectados (thread-safe)."""
+        loop = self._loop
+        if loop is None:
+            return
+        with self._trava:
+            evento = (next(self._sequencia), tipo, dados)
+            self.publicados += 1
+        try:
+            no_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            no_loop = False
+        if no_loop:
+            self._distribuir(usuario_id, evento)
+        else:
+            try:
+                loop.call_soon_threadsafe(self._distribuir, usuario_id, evento)
+            except RuntimeError:
+                # Loop já encerrado: não há mais conexões para entregar
+                pass
+
+    def _distribuir(self, usuario_id: int, evento: Evento):
+        destinos = self._admins.union(self._por_usuario.get(usuario_id, ()))
+        for assinatura in destinos:
+            fila = assinatura.fila
+            if fila.full():
+                fila.get_nowait()
+                self.descartados += 1
+            fila.put_nowait(evento)
+        self.entregues += len(destinos)
+
+    def estatisticas(self) -> dict:
+        return {
+            "conexoes": sum(len(a) for a in self._por_usuario.values()),
+            "usuarios": len(self._por_usuario),
+            "admins": len(self._admins),
+            "publicados": self.publicados,
+            "entregues": self.entregues,
+            "descartados": self.descartados,
+        }
+
+
+def formatar_evento(evento: Evento) -> str:
+    """Serializa no formato text/event-stream."""
+    sequencia, tipo, dados = evento
+    return f"id: {sequencia}\nevent: {tipo}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+
+async def transmitir(hub: "HubEventos", usuario_id: int, admin: bool) -> AsyncIterator[str]:
+    """Corpo da resposta SSE: a assinatura dura enquanto o cliente estiver conectado."""
+    assinatura = hub.inscrever(usuario_id, admin)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            try:
+                evento = await asyncio.wait_for(assinatura.fila.get(), timeout=INTERVALO_PING)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            yield formatar_evento(evento)
+    finally:
+        hub.cancelar(assinatura)
+
+
+def publicar_reserva(reserva: Reserva, acao: str):
+    """Publica a situação atual de uma reserva após uma alteração já confirmada no banco."""
+    hub_eventos.publicar(reserva.usuario_id, "reserva", {
+        "acao": acao,
+        "reserva_id": reserva.id,
+        "status": reserva.status.value,
+        "sala_id": reserva.sala_id,
+        "data": reserva.data.isoformat(),
+        "hora_inicio": reserva.hora_inicio.strftime("%H:%M"),
+        "hora_fim": reserva.hora_fim.strftime("%H:%M"),
+    })
+
+
+hub_eventos = HubEventos()
@@ -0,0 +1,89 @@
+from typing import Iterable, Iterator, AsyncIterator, Optional
+import csv
+import io
+import json
+
+from models.models import Reserva, FiltroReservas
+from consultas import select_reservas_detalhadas, select_reservas_com_arquivo, aplicar_filtros
+
+# Exportação em Streaming do Histórico de Reservas
+#
+# As linhas são lidas do banco em lotes (yield_per, com cursor do lado do servidor) e cada
+# lote é convertido e enviado antes do próximo ser lido: o uso de memória depende só do
+# tamanho do lote, não do total de reservas exportadas. Com 'arquivadas', entram também as
+# reservas da tabela de arquivo (ver arquivamento.py), intercaladas em ordem cronológica.
+
+# Linhas lidas do banco (e enviadas ao cliente) por vez
+LOTE_EXPORTACAO = 2000
+
+FORMATOS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+COLUNAS = ["id", "data", "hora_inicio", "hora_fim", "status", "sala_id", "sala_nome", "usuario_id", "usuario_nome"]
+
+
+def consulta_exportacao(filtros: Optional[FiltroReservas] = None, arquivadas: bool = False):
+    """Reservas com nome da sala e do usuário, em ordem cronológica (índice (data, id))."""
+    if arquivadas:
+        return select_reservas_com_arquivo(filtros).execution_options(yield_per=LOTE_EXPORTACAO)
+    consulta = aplicar_filtros(select_reservas_detalhadas(), filtros)
+    return consulta.order_by(Reserva.data, Reserva.id).execution_options(yield_per=LOTE_EXPORTACAO)
+
+
+def _valores(linha) -> list:
+    return [
+        linha.id,
+        linha.data.isoformat(),
+        linha.hora_inicio.strftime("%H:%M"),
+        linha.hora_fim.strftime("%H:%M"),
+        linha.status.value,
+        linha.sala_id,
+        linha.sala_nome,
+        linha.usuario_id,
+        linha.usuario_nome,
+    ]
+
+
+def formatar_lote(linhas: Iterable, formato: str, cabecalho: bool = False) -> str:
+    """Converte um lote de linhas em texto CSV ou NDJSON (um objeto JSON por linha)."""
+    buffer = io.StringIO()
+    if formato == "csv":
+        escritor = csv.writer(buffer, lineterminator="\n")
+        if cabecalho:
+            escritor.writerow(COLUNAS)
+        escritor.writerows(_valores(linha) for linha in linhas)
+    else:
+        for linha in linhas:
+            buffer.write(json.dumps(dict(zip(COLUNAS, _valores(linha))), ensure_ascii=False))
+            buffer.write("\n")
+    return buffer.getvalue()
+
+
+def exportar(engine, filtros: Optional[FiltroReservas], formato: str, arquivadas: bool = False) -> Iterator[str]:
+    """
+    Gerador síncrono da exportação (o Starlette o consome no threadpool).
+    Abre a própria conexão: ela vive enquanto a resposta é transmitida.
+    """
+    with engine.connect() as conn:
+        resultado = conn.execute(consulta_exportacao(filtros, arquivadas))
+        primeiro = True
+        for lote in resultado.partitions():
+            yield formatar_lote(lote, formato, cabecalho=primeiro)
+            primeiro = False
+        if primeiro:
+            yield formatar_lote([], formato, cabecalho=True)
+
+
+async def exportar_async(engine_async, filtros: Optional[FiltroReservas], formato: str,
+                         arquivadas: bool = False) -> AsyncIterator[str]:
+    """Versão assíncrona de exportar(), com AsyncConnection.stream (modo "async")."""
+    async with engine_async.connect() as conn:
+        resultado = await conn.stream(consulta_exportacao(filtros, arquivadas))
+        primeiro = True
+        async for lote in resultado.partitions():
+            yield formatar_lote(lote, formato, cabecalho=primeiro)
+            primeiro = False
+        if primeiro:
+            yield formatar_lote([], formato, cabecalho=True)
@@ -0,0 +1,307 @@
+"""
+Importação em massa de salas e usuários a partir de CSV ou JSON (ex.: planilha da secretaria).
+
+A entrada é lida em fluxo e gravada em lotes com INSERT ... ON CONFLICT (Sala.nome,
+Usuario.email): linhas novas são inseridas e as existentes atualizadas, então reimportar
+o mesmo arquivo não duplica nada. Por lote há uma única consulta (quais chaves já
+existem), um executemany de INSERT para as novas e um de UPDATE para as existentes. Os
+hashes das senhas dos usuários novos são calculados num pool de threads (o bcrypt libera
+o GIL), fora da transação de escrita. Usuários já cadastrados mantêm a senha.
+
+Colunas aceitas:
+    salas:    nome, capacidade, descricao, localizacao, recursos
+    usuarios: nome, email, senha (obrigatória para usuários novos), tipo, ativo
+
+Formatos: .csv (cabeçalho na primeira linha), .json (lista de objetos) e .jsonl/.ndjson
+(um objeto por linha).
+
+Uso (a partir de codigoLabkey/):
+    python importacao.py salas salas.csv
+    python importacao.py usuarios alunos.csv [--rounds 10] [--workers 4] [--sem-atualizar]
+
+Com --rounds menor que LABKEY_BCRYPT_ROUNDS a importação fica muito mais rápida; o hash
+de cada usuário é refeito com o custo configurado no seu primeiro login.
+"""
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from pydantic import ValidationError
+from sqlalchemy import bindparam, update
+from sqlalchemy.dialects import sqlite, postgresql
+from sqlmodel import Session, select
+
+from models.models import Usuario, Sala, SalaBase, TipoUsuario
+from database import engine, create_db, iniciar_escrita
+from caches import catalogo_salas, cache_autorizacao, incrementar_versao_cache
+from senhas import gerar_hash_senha
+
+LOTE = 1000
+VERDADEIROS = {"1", "true", "sim", "s", "yes", "y", "ativo"}
+FALSOS = {"0", "false", "nao", "não", "n", "no", "inativo"}
+
+
+class LinhaInvalida(ValueError):
+    pass
+
+
+class Resultado:
+    def __init__(self):
+        self.inseridos = 0
+        self.atualizados = 0
+        self.ignorados = 0
+        self.erros: List[Tuple[int, str]] = []
+
+    @property
+    def processados(self) -> int:
+        return self.inseridos + self.atualizados + self.ignorados + len(self.erros)
+
+    def __str__(self):
+        return (f"{self.inseridos} inserido(s), {self.atualizados} atualizado(s), "
+                f"{self.ignorados} ignorado(s), {len(self.erros)} com erro")
+
+
+# Leitura da Entrada
+
+def ler_registros(caminho: Path) -> Iterator[Tuple[int, dict]]:
+    """(número da linha/posição, registro) de um arquivo CSV, JSON ou JSON Lines."""
+    sufixo = caminho.suffix.lower()
+    with open(caminho, encoding="utf-8-sig", newline="") as arquivo:
+        if sufixo == ".csv":
+            leitor = csv.DictReader(arquivo)
+            for registro in leitor:
+                yield leitor.line_num, registro
+        elif sufixo in (".jsonl", ".ndjson"):
+            for numero, linha in enumerate(arquivo, start=1):
+                if linha.strip():
+                    yield numero, json.loads(linha)
+        elif sufixo == ".json":
+            # Uma lista JSON não tem como ser lida aos pedaços sem bibliotecas extras
+            for numero, registro in enumerate(json.load(arquivo), start=1):
+                yield numero, registro
+        else:
+            raise ValueError(f"Formato não suportado: '{sufixo}' (use .csv, .json, .jsonl ou .ndjson).")
+
+
+def _texto(registro: dict, campo: str) -> Optional[str]:
+    valor = registro.get(campo)
+    if valor is None:
+        return None
+    valor = str(valor).strip()
+    return valor or None
+
+
+def _booleano(valor) -> bool:
+    if isinstance(valor, bool):
+        return valor
+    texto = str(valor).strip().lower()
+    if texto in VERDADEIROS:
+        return True
+    if texto in FALSOS:
+        return False
+    raise LinhaInvalida(f"valor de 'ativo' inválido: {valor!r}")
+
+
+def _tipo(valor: str) -> TipoUsuario:
+    """Aceita o nome (ADMINISTRADOR) ou o valor do enum, sem diferenciar maiúsculas."""
+    try:
+        return TipoUsuario[valor.upper()]
+    except KeyError:
+        raise LinhaInvalida(f"tipo de usuário inválido: {valor!r}")
+
+
+def linha_sala(registro: dict) -> dict:
+    dados = {campo: _texto(registro, campo) for campo in SalaBase.model_fields if _texto(registro, campo) is not None}
+    try:
+        return SalaBase.model_validate(dados).model_dump(include=set(dados))
+    except ValidationError as e:
+        raise LinhaInvalida("; ".join(f"{'.'.join(map(str, erro['loc']))}: {erro['msg']}" for erro in e.errors()))
+
+
+def linha_usuario(registro: dict) -> dict:
+    nome, email = _texto(registro, "nome"), _texto(registro, "email")
+    if not nome or not email or "@" not in email:
+        raise LinhaInvalida("'nome' e um 'email' válido são obrigatórios")
+    linha = {"nome": nome, "email": email}
+    if tipo := _texto(registro, "tipo"):
+        linha["tipo"] = _tipo(tipo)
+    if (ativo := _texto(registro, "ativo")) is not None:
+        linha["ativo"] = _booleano(ativo)
+    if senha := _texto(registro, "senha"):
+        linha["senha"] = senha
+    return linha
+
+
+# Gravação
+
+def _inserir(session: Session, modelo, chave: str, linhas: List[dict], atualizar: bool):
+    """
+    INSERT ... ON CONFLICT (chave) DO UPDATE (ou DO NOTHING) em executemany, para as chaves
+    novas. Se outro processo inseriu a mesma chave nesse meio-tempo, vira atualização.
+    """
+    tabela = modelo.__table__
+    insert_dialeto = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}[session.get_bind().dialect.name]
+    comando = insert_dialeto(tabela)
+    # Só as colunas presentes na entrada são atualizadas (a senha nunca é)
+    colunas = [c for c in linhas[0] if c not in (chave, "senha_hash")]
+    if atualizar and colunas:
+        valores = {c: comando.excluded[c] for c in colunas}
+        if "versao" in tabela.c:
+            valores["versao"] = tabela.c.versao + 1
+        comando = comando.on_conflict_do_update(index_elements=[chave], set_=valores)
+    else:
+        comando = comando.on_conflict_do_nothing(index_elements=[chave])
+    session.execute(comando, linhas)
+
+
+def _atualizar(session: Session, modelo, chave: str, linhas: List[dict]):
+    """
+    UPDATE ... WHERE chave = ? em executemany, para as chaves que já existem. (Um INSERT ...
+    ON CONFLICT exigiria todas as colunas NOT NULL, como o hash da senha, que não é refeito.)
+    """
+    tabela = modelo.__table__
+    colunas = [c for c in linhas[0] if c != chave]
+    if not colunas:
+        return
+    valores = {c: bindparam(c) for c in colunas}
+    if "versao" in tabela.c:
+        # Salas: quem leu a versão anterior recebe 409 ao tentar gravar por cima
+        valores["versao"] = tabela.c.versao + 1
+    comando = (
+        update(tabela)
+        .where(tabela.c[chave] == bindparam("chave_"))
+        .values(valores)
+    )
+    session.execute(comando, [{**linha, "chave_": linha[chave]} for linha in linhas])
+
+
+def _agrupar_por_colunas(linhas: Iterable[dict]) -> Dict[tuple, List[dict]]:
+    """O executemany exige as mesmas colunas em todas as linhas: agrupa pelas colunas informadas."""
+    grupos: Dict[tuple, List[dict]] = {}
+    for linha in linhas:
+        grupos.setdefault(tuple(sorted(linha)), []).append(linha)
+    return grupos
+
+
+def gravar_lote(session: Session, tipo: str, lote: Dict[str, Tuple[int, dict]], resultado: Resultado,
+                atualizar: bool, pool: ThreadPoolExecutor, rounds: Optional[int]):
+    """Grava um lote (chave -> (linha de origem, dados)) numa transação de escrita."""
+    modelo, chave = (Sala, "nome") if tipo == "salas" else (Usuario, "email")
+    existentes = set(session.exec(select(getattr(modelo, chave)).where(getattr(modelo, chave).in_(list(lote)))).all())
+
+    novas, alteradas = [], []
+    for valor, (numero, linha) in lote.items():
+        if valor in existentes:
+            linha.pop("senha", None)
+            if atualizar:
+                alteradas.append(linha)
+                resultado.atualizados += 1
+            else:
+                resultado.ignorados += 1
+        elif tipo == "usuarios" and "senha" not in linha:
+            resultado.erros.append((numero, "'senha' é obrigatória para usuários novos"))
+        else:
+            novas.append(linha)
+            resultado.inseridos += 1
+
+    if tipo == "usuarios":
+        # Hashes dos usuários novos em paralelo no pool
+        senhas = [linha.pop("senha") for linha in novas]
+        for linha, senha_hash in zip(novas, pool.map(lambda s: gerar_hash_senha(s, rounds=rounds), senhas)):
+            linha["senha_hash"] = senha_hash
+
+    if not novas and not alteradas:
+        session.commit()
+        return
+
+    # Só agora a transação de escrita: o lock não fica preso durante os hashes
+    iniciar_escrita(session)
+    for grupo in _agrupar_por_colunas(novas).values():
+        _inserir(session, modelo, chave, grupo, atualizar)
+    for grupo in _agrupar_por_colunas(alteradas).values():
+        _atualizar(session, modelo, chave, grupo)
+    # Os caches dos processos do servidor percebem a alteração pela versão
+    incrementar_versao_cache(session, catalogo_salas.NOME if tipo == "salas" else cache_autorizacao.NOME)
+    session.commit()
+
+
+def importar(tipo: str, registros: Iterable[Tuple[int, dict]], atualizar: bool = True, lote: int = LOTE,
+             workers: Optional[int] = None, rounds: Optional[int] = None, progresso=None) -> Resultado:
+    """
+    Importa 'registros' ((linha de origem, dict) em fluxo) para a tabela 'tipo' ("salas" ou
+    "usuarios"). Cada lote é uma transação; 'progresso(resultado)' é chamado após cada lote.
+    """
+    converter, chave = (linha_sala, "nome") if tipo == "salas" else (linha_usuario, "email")
+    resultado = Resultado()
+    pendentes: Dict[str, Tuple[int, dict]] = {}
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1, thread_name_prefix="labkey-importacao") as pool, \
+            Session(engine) as session:
+        def descarregar():
+            gravar_lote(session, tipo, pendentes, resultado, atualizar, pool, rounds)
+            pendentes.clear()
+            if progresso:
+                progresso(resultado)
+
+        for numero, registro in registros:
+            try:
+                linha = converter(registro)
+            except LinhaInvalida as e:
+                resultado.erros.append((numero, str(e)))
+                continue
+            # Chave repetida na entrada: vale a última ocorrência (um ON CONFLICT não pode
+            # atingir a mesma linha duas vezes no mesmo comando)
+            if linha[chave] in pendentes:
+                resultado.ignorados += 1
+            pendentes[linha[chave]] = (numero, linha)
+            if len(pendentes) >= lote:
+                descarregar()
+        if pendentes:
+            descarregar()
+
+    if tipo == "salas":
+        catalogo_salas.invalidar()
+    else:
+        cache_autorizacao.invalidar()
+    return resultado
+
+
+# Linha de Comando
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("tipo", choices=["salas", "usuarios"])
+    parser.add_argument("arquivo", type=Path)
+    parser.add_argument("--lote", type=int, default=LOTE, help="linhas por transação")
+    parser.add_argument("--workers", type=int, help="threads para os hashes de senha (padrão: número de CPUs)")
+    parser.add_argument("--rounds", type=int, help="custo do bcrypt das senhas importadas (padrão: LABKEY_BCRYPT_ROUNDS)")
+    parser.add_argument("--sem-atualizar", action="store_true", help="não altera registros que já existem")
+    args = parser.parse_args()
+
+    create_db()
+    inicio = time.perf_counter()
+
+    def progresso(resultado: Resultado):
+        decorrido = time.perf_counter() - inicio
+        print(f"\r  {resultado.processados:,} linha(s) ({resultado.processados / decorrido:,.0f}/s)", end="", flush=True)
+
+    try:
+        resultado = importar(args.tipo, ler_registros(args.arquivo), atualizar=not args.sem_atualizar, lote=args.lote,
+                             workers=args.workers, rounds=args.rounds, progresso=progresso)
+    except (OSError, ValueError) as e:
+        sys.exit(f"\nErro ao ler '{args.arquivo}': {e}")
+    print(f"\n{args.tipo}: {resultado} em {time.perf_counter() - inicio:.1f} s")
+    for numero, erro in resultado.erros[:20]:
+        print(f"  linha {numero}: {erro}")
+    if len(resultado.erros) > 20:
+        print(f"  ... e mais {len(resultado.erros) - 20} erro(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+from typing import Dict, Optional
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import asyncio
+import itertools
+import logging
+import math
+import sqlite3
+import threading
+import time
+
+from fastapi import HTTPException, Request, status
+
+import config
+from metricas import Contador, Histograma, LIMITES_SEGUNDOS
+
+# Limites de Taxa e Controle de Admissão
+#
+# Limites de taxa: baldes de tokens por chave (IP ou usuario_id). Cada balde guarda até
+# 'rajada' tokens e recebe 'por_minuto' tokens por minuto; cada requisição gasta um, e sem
+# token a resposta é 429 com Retry-After. O estado fica na memória do processo ou, com
+# config.LIMITES_SQLITE, num arquivo SQLite próprio compartilhado pelos workers (fora do
+# banco da aplicação, para não disputar o lock de escrita que os limites protegem).
+#
+# Controle de admissão: cada grupo de rotas tem um número máximo de requisições em
+# andamento por processo e uma fila curta; com a fila cheia, ou após esperar demais na
+# fila, a resposta é 503. Assim uma rajada é recusada logo na entrada, antes de ocupar o
+# threadpool e formar fila no lock de escrita do SQLite.
+
+log = logging.getLogger("labkey.limites")
+
+# Chaves em memória por limite (as menos usadas são descartadas, com o balde cheio)
+MAX_CHAVES = 100_000
+# A cada quantas consultas o estado compartilhado apaga os baldes parados há mais de 1 h
+LIMPEZA_A_CADA = 10_000
+
+# Thread dedicada às consultas ao estado compartilhado: fora do event loop e fora do
+# threadpool das rotas, que está saturado justamente nas rajadas que os limites recusam.
+# Uma só basta: o UPSERT é uma escrita e o SQLite as serializa de qualquer forma.
+_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="labkey-limites")
+
+rejeitadas = Contador("labkey_limite_rejeitadas_total", "Requisições recusadas pelos limites de taxa e de concorrência",
+                      ("limite", "motivo"))
+falhas_estado = Contador("labkey_limite_falhas_estado_total", "Consultas ao estado compartilhado que falharam (requisição liberada)")
+espera_fila = Histograma("labkey_concorrencia_espera_segundos", "Tempo na fila do controle de admissão", ("grupo",), LIMITES_SEGUNDOS)
+
+
+# Baldes de Tokens
+
+class EstadoCompartilhado:
+    """Baldes de tokens num arquivo SQLite, atualizados atomicamente por um único UPSERT."""
+
+    CONSUMIR = """
+        INSERT INTO balde (chave, tokens, atualizado) VALUES (:chave, :rajada - 1, :agora)
+        ON CONFLICT (chave) DO UPDATE SET
+            tokens = MIN(:rajada, tokens + (:agora - atualizado) * :taxa) - 1,
+            atualizado = :agora
+        WHERE MIN(:rajada, tokens + (:agora - atualizado) * :taxa) >= 1
+        RETURNING tokens
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._local = threading.local()
+        self._consultas = itertools.count(1)
+        with self._conexao() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS balde (chave TEXT PRIMARY KEY, tokens REAL, atualizado REAL)")
+
+    def _conexao(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Espera curta: a requisição aguarda esta consulta e, se ela falhar, passa
+            conn = sqlite3.connect(self.caminho, timeout=0.05, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def consumir(self, chave: str, rajada: int, taxa: float) -> float:
+        """0 se havia token (e ele foi gasto); senão, segundos até o próximo token."""
+        agora = time.time()
+        conn = self._conexao()
+        linha = conn.execute(self.CONSUMIR, {"chave": chave, "rajada": rajada, "taxa": taxa, "agora": agora}).fetchone()
+        if next(self._consultas) % LIMPEZA_A_CADA == 0:
+            conn.execute("DELETE FROM balde WHERE atualizado < ?", (agora - 3600,))
+        if linha is not None:
+            return 0.0
+        tokens, atualizado = conn.execute("SELECT tokens, atualizado FROM balde WHERE chave = ?", (chave,)).fetchone()
+        return (1 - min(rajada, tokens + (agora - atualizado) * taxa)) / taxa
+
+
+class LimitadorTaxa:
+    def __init__(self, nome: str, rajada: int, por_minuto: int, estado: Optional[EstadoCompartilhado] = None):
+        self.nome = nome
+        self.rajada = rajada
+        self.taxa = por_minuto / 60
+        self._estado = estado
+        self._lock = threading.Lock()
+        # chave -> [tokens, instante da última atualização]
+        self._baldes: "OrderedDict[str, list]" = OrderedDict()
+
+    def _consumir_local(self, chave: str) -> float:
+        agora = time.monotonic()
+        with self._lock:
+            balde = self._baldes.get(chave)
+            if balde is None:
+                balde = self._baldes[chave] = [self.rajada, agora]
+                if len(self._baldes) > MAX_CHAVES:
+                    self._baldes.popitem(last=False)
+            else:
+                self._baldes.move_to_end(chave)
+                balde[0] = min(self.rajada, balde[0] + (agora - balde[1]) * self.taxa)
+                balde[1] = agora
+            if balde[0] >= 1:
+                balde[0] -= 1
+                return 0.0
+            return (1 - balde[0]) / self.taxa
+
+    def consumir(self, chave) -> float:
+        """Gasta um token do balde de 'chave': 0 se liberado, senão os segundos até haver token."""
+        if self._estado is None:
+            return self._consumir_local(str(chave))
+        try:
+            return self._estado.consumir(f"{self.nome}:{chave}", self.rajada, self.taxa)
+        except sqlite3.Error as e:
+            falhas_estado.incrementar()
+            log.warning("Estado compartilhado dos limites indisponível (%s); requisição liberada.", e)
+            return 0.0
+
+    async def verificar(self, chave):
+        """Levanta HTTPException 429 (com Retry-After) se o balde de 'chave' estiver vazio."""
+        if self._estado is None:
+            espera = self.consumir(chave)
+        else:
+            espera = await asyncio.get_running_loop().run_in_executor(_pool, self.consumir, chave)
+        if espera > 0:
+            rejeitadas.incrementar((self.nome, "taxa"))
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Muitas requisições. Tente novamente em instantes.",
+                headers={"Retry-After": str(math.ceil(espera))},
+            )
+
+
+# Controle de Admissão
+
+class LimitadorConcorrencia:
+    """
+    Semáforo com fila limitada, para o event loop do processo. As vagas são repassadas em
+    ordem de chegada; quem não consegue vaga em 'espera_ms' (ou encontra a fila cheia)
+    recebe 503.
+    """
+
+    def __init__(self, nome: str, maximo: int, fila: int = config.CONCORRENCIA_FILA,
+                 espera_ms: int = config.CONCORRENCIA_ESPERA_MS):
+        self.nome = nome
+        self.maximo = maximo
+        self.tamanho_fila = fila
+        self.espera = espera_ms / 1000
+        self.em_andamento = 0
+        self._fila: deque = deque()
+        self.admitidas = 0
+
+    def _recusar(self, motivo: str):
+        rejeitadas.incrementar((self.nome, motivo))
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor sobrecarregado. Tente novamente em instantes.",
+            headers={"Retry-After": "1"},
+        )
+
+    async def _entrar(self):
+        if self.em_andamento < self.maximo and not self._fila:
+            self.em_andamento += 1
+            return
+        if len(self._fila) >= self.tamanho_fila:
+            self._recusar("fila_cheia")
+
+        vaga = asyncio.get_running_loop().create_future()
+        self._fila.append(vaga)
+        inicio = time.perf_counter()
+        try:
+            await asyncio.wait_for(vaga, self.espera)
+        except BaseException as e:
+            if vaga.done() and not vaga.cancelled():
+                # A vaga chegou junto com o cancelamento: repassa para o próximo
+                self._sair()
+            else:
+                try:
+                    self._fila.remove(vaga)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.TimeoutError):
+                self._recusar("espera")
+            raise
+        finally:
+            espera_fila.observar((self.nome,), time.perf_counter() - inicio)
+
+    def _sair(self):
+        # A vaga passa direto para o primeiro da fila (em_andamento não muda)
+        while self._fila:
+            vaga = self._fila.popleft()
+            if not vaga.done():
+                vaga.set_result(None)
+                return
+        self.em_andamento -= 1
+
+    @asynccontextmanager
+    async def admitir(self):
+        await self._entrar()
+        self.admitidas += 1
+        try:
+            yield
+        finally:
+            self._sair()
+
+    def estatisticas(self) -> dict:
+        return {"maximo": self.maximo, "em_andamento": self.em_andamento, "na_fila": len(self._fila), "admitidas": self.admitidas}
+
+
+# Instâncias da Aplicação
+
+def ip_do_cliente(request: Request) -> str:
+    if config.LIMITES_PROXY_CONFIAVEL:
+        encaminhado = request.headers.get("x-forwarded-for")
+        if encaminhado:
+            return encaminhado.split(",")[0].strip()
+    return request.client.host if request.client else "desconhecido"
+
+
+def criar_limitadores() -> Dict[str, LimitadorTaxa]:
+    estado = EstadoCompartilhado(config.LIMITES_SQLITE) if config.LIMITES_SQLITE else None
+    return {
+        nome: LimitadorTaxa(nome, rajada, por_minuto, estado)
+        for nome, (rajada, por_minuto) in config.limites_taxa().items()
+    }
+
+
+limites_taxa = criar_limitadores()
+admissao_login = LimitadorConcorrencia("login", config.CONCORRENCIA_LOGIN)
+admissao_escritas = LimitadorConcorrencia("escritas", config.CONCORRENCIA_ESCRITAS)
+
+
+async def verificar_taxa(nome: str, chave):
+    """Aplica o limite de taxa 'nome' à chave (nada faz com os limites desligados)."""
+    if config.LIMITES_ATIVOS:
+        await limites_taxa[nome].verificar(chave)
+
+
+def estatisticas() -> Dict[str, dict]:
+    return {limitador.nome: limitador.estatisticas() for limitador in (admissao_login, admissao_escritas)}
+
+
+def medidores() -> list:
+    """Medidores para metricas.registrar_coletor: ocupação e fila de cada grupo."""
+    grupos = estatisticas()
+    return [
+        ("labkey_concorrencia_em_andamento", "Requisições em andamento por grupo de admissão",
+         {(nome,): valores["em_andamento"] for nome, valores in grupos.items()}, ("grupo",)),
+        ("labkey_concorrencia_fila", "Requisições esperando vaga por grupo de admissão",
+         {(nome,): valores["na_fila"] for nome, valores in grupos.items()}, ("grupo",)),
+    ]
@@ -1,48 +1,78 @@
-from sqlmodel import SQLModel, Session, create_engine, select
+from sqlmodel import Session
 # Importa o essencial para construir a API: App, dependências, exceções e respostas
-from fastapi import FastAPI, Depends, HTTPException, Request, status
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, Depends, HTTPException, Request, Response, status
+from fastapi.responses import HTMLResponse, StreamingResponse
 # Middleware para gerenciar requisições CORS
 from fastapi.middleware.cors import CORSMiddleware
-# Para servir arquivos estáticos (CSS, JS, Imagens)
-from fastapi.staticfiles import StaticFiles
 # Para renderizar páginas HTML usando Jinja2
 from fastapi.templating import Jinja2Templates
-from starlette.responses import RedirectResponse, JSONResponse
+from starlette.responses import RedirectResponse, JSONResponse, PlainTextResponse
 # Middleware para gerenciar sessões do usuário
 from starlette.middleware.sessions import SessionMiddleware
+from typing import Optional
+from urllib.parse import urlencode
 from contextlib import asynccontextmanager
-import hashlib
-from pathlib import Path
-from datetime import datetime, date
+from datetime import datetime, date, time
 
 # Importa os schemas (modelos de dados) definidos
 from models.models import (
-    TipoUsuario, Usuario, CadastroInput, LoginInput,
-    Sala, SalaBase, Reserva, ReservaInput, ReservaUpdate, StatusReserva
+    TipoUsuario, Usuario, UsuarioAdminUpdate, CadastroInput, LoginInput,
+    SalaBase, ReservaInput, ReservaRecorrenteInput, ReservaUpdate, StatusReserva, StatusLoteInput, FiltroReservas,
+    RetiradaChaveInput, DevolucaoChaveInput
 )
-
-# Configuração do Banco de Dados
-
-DATABASE_FILE = "labkey.db"
-BASE_DIR = Path(__file__).parent
-DB_PATH = BASE_DIR / DATABASE_FILE
-# String de conexão SQLite
-url = f"sqlite:///{DB_PATH}"
-
-# Argumentos específicos para SQLite no FastAPI
-args = {"check_same_thread": False}
-engine = create_engine(url, connect_args=args)
-
-def create_db():
-    """Cria as tabelas no banco de dados se ainda não existirem."""
-    SQLModel.metadata.create_all(engine)
+# Tamanho padrão das páginas nas listagens paginadas por cursor
+from consultas import LIMITE_PADRAO
+# Dias da busca de salas livres (grade de ocupação em memória)
+from disponibilidade import intervalo_de_dias, grade_ocupacao, MAX_DIAS_BUSCA
+# Regras de negócio e acesso ao banco das rotas de salas e reservas
+import servicos
+# Catálogo de salas e cache de autorização em memória, invalidados pelas rotas de escrita
+from caches import catalogo_salas, cache_autorizacao, PerfilUsuario, versoes_cache, VERSAO_RESERVAS
+# ETags/Cache-Control, compressão e arquivos estáticos versionados
+from cache_http import (
+    ArquivosEstaticos, CompressaoMiddleware, COMPRESSAO_MINIMO, VERSAO_IMPLANTACAO,
+    impressoes, etag_de, nao_modificado, marcar, etag_versao, versao_if_match
+)
+# Páginas públicas pré-renderizadas e templates pré-compilados na inicialização
+from paginas import paginas_estaticas, configurar_bytecode, precompilar
+# Métricas de latência, SQL e templates por rota (formato Prometheus)
+import metricas
+# Limites de taxa e controle de admissão do login e das escritas de reservas
+import limites
+# Exportação do histórico de reservas em streaming (CSV/NDJSON)
+import exportacao
+# Retirada e devolução das chaves físicas das salas
+import chaves
+# Painel de uso das salas, lido das tabelas de resumo
+import analise
+# Tarefas periódicas: expiração de pendentes e conclusão de reservas passadas
+from agendador import agendador, listar_tarefas
+# Hub de eventos em tempo real (SSE) das mudanças de reservas
+from eventos import hub_eventos, transmitir
+# Hash de senhas (bcrypt) calculado fora do event loop
+from senhas import gerar_hash_senha_async, verificar_senha_async
+
+# Configuração do Banco de Dados (engines síncrono/assíncrono e sessões)
+# 'engine' também continua exportado aqui para os scripts (popular_banco.py, verificar_usuarios.py)
+from database import engine, engine_async, create_db, get_session, obter_sessao, sessao_avulsa, executar, salvar
+
+# Comandos SQL contados e cronometrados por requisição (as páginas usam o engine síncrono)
+metricas.instrumentar_engine(engine)
+if engine_async is not None:
+    metricas.instrumentar_engine(engine_async.sync_engine)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Função de ciclo de vida: executa antes do início e no encerramento do app."""
     create_db()
+    precompilar(templates.env)
+    paginas_estaticas.preparar(templates.env)
+    agendador.iniciar()
     yield
+    await agendador.parar()
+    # Libera as conexões do engine assíncrono, se estiver em uso
+    if engine_async is not None:
+        await engine_async.dispose()
 
 # Inicialização do Aplicativo
 
@@ -59,11 +89,21 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Comprime HTML/JSON com gzip (o fluxo SSE e as imagens ficam de fora)
+app.add_middleware(CompressaoMiddleware, minimum_size=COMPRESSAO_MINIMO, compresslevel=6)
+# Mede cada requisição (adicionado por último: envolve todos os demais middlewares)
+app.add_middleware(metricas.MetricasMiddleware)
 
-# Monta o diretório 'static' para servir arquivos estáticos
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Monta o diretório 'static' para servir arquivos estáticos (cache longo nas URLs versionadas)
+app.mount("/static", ArquivosEstaticos(directory="static"), name="static")
 # Configura o motor de templates Jinja2
 templates = Jinja2Templates(directory="templates")
+# Templates cronometrados (métrica labkey_template_render_segundos)
+templates.env.template_class = metricas.TemplateMedido
+# Nos templates, estatico('css/style.css') gera a URL com a impressão digital do arquivo
+templates.env.globals["estatico"] = impressoes.url
+# Templates compilados ficam em disco e são reaproveitados pelos próximos processos
+configurar_bytecode(templates.env)
 
 
 # Funções Auxiliares e Filtros de Template
@@ -88,104 +128,187 @@ templates.env.filters["date_format"] = date_format
 
 # Dependências
 
-def get_session():
+def aplicar_perfil(request: Request, perfil: Optional[PerfilUsuario]) -> Optional[PerfilUsuario]:
+    """
+    Confere o perfil atual do usuário logado: encerra a sessão se ele não existir mais ou
+    estiver desativado, e mantém o tipo gravado no cookie (usado só para exibição) em dia.
+    """
+    if perfil is None or not perfil.ativo:
+        request.session.clear()
+        return None
+    request.session["tipo_usuario"] = perfil.tipo.value
+    return perfil
+
+
+def perfil_da_sessao(request: Request, session: Session) -> Optional[PerfilUsuario]:
+    """Perfil do usuário logado nas páginas HTML (Session síncrona), via cache de autorização."""
+    usuario_id = request.session.get("usuario_id")
+    if usuario_id is None:
+        return None
+    return aplicar_perfil(request, cache_autorizacao.obter(session, usuario_id))
+
+
+async def perfil_atual(request: Request, session) -> Optional[PerfilUsuario]:
+    """Perfil do usuário logado nas rotas da API; só acessa o banco se faltar no cache."""
+    usuario_id = request.session.get("usuario_id")
+    if usuario_id is None:
+        return None
+    encontrado, perfil = cache_autorizacao.em_cache(usuario_id)
+    if not encontrado:
+        perfil = await executar(session, cache_autorizacao.obter, usuario_id)
+    return aplicar_perfil(request, perfil)
+
+
+async def usuario_autenticado(request: Request, session = Depends(obter_sessao)) -> int:
     """
-    Dependência que fornece uma sessão de banco de dados do SQLModel.
-    Garante que a sessão seja fechada após o uso.
+    Dependência que exige um usuário logado e ativo e retorna o seu ID.
+    Levanta HTTPException 401 caso contrário.
     """
-    with Session(engine) as session:
-        yield session
+    if await perfil_atual(request, session) is None:
+        raise HTTPException(status_code=401, detail="Usuário não autenticado.")
+    return request.session["usuario_id"]
+
 
-def verificar_admin(request: Request):
+async def verificar_admin(request: Request, session = Depends(obter_sessao)):
     """
     Dependência para verificar se o usuário logado possui o tipo ADMINISTRADOR.
-    Levanta HTTPException se não estiver logado ou não for admin.
+    O tipo vem do cache de autorização, e não do cookie: um admin rebaixado perde o acesso
+    sem precisar sair. Levanta HTTPException se não estiver logado ou não for admin.
     """
-    if "usuario_id" not in request.session:
+    perfil = await perfil_atual(request, session)
+    if perfil is None:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Não autenticado.")
-    tipo_usuario = request.session.get("tipo_usuario")
-    if tipo_usuario != TipoUsuario.ADMINISTRADOR.value:
+    if perfil.tipo != TipoUsuario.ADMINISTRADOR:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acesso negado: Requer privilégio de Administrador.")
     return True
 
 
+async def limitar_login(request: Request):
+    """
+    Dependência do login: limite de tentativas por IP (429) e de logins simultâneos no
+    processo (503), para que uma rajada não ocupe o pool de hashes de senha.
+    """
+    await limites.verificar_taxa("login_ip", limites.ip_do_cliente(request))
+    async with limites.admissao_login.admitir():
+        yield
+
+
+async def limitar_reservas(request: Request, usuario_id: int = Depends(usuario_autenticado)):
+    """
+    Dependência das escritas de reservas do usuário: limites de taxa por IP e por usuário
+    (429) e vaga no controle de admissão das escritas (503).
+    """
+    await limites.verificar_taxa("reservas_ip", limites.ip_do_cliente(request))
+    await limites.verificar_taxa("reservas_usuario", usuario_id)
+    async with limites.admissao_escritas.admitir():
+        yield
+
+
+async def admitir_escrita():
+    """Dependência das escritas administrativas: só o controle de admissão (503)."""
+    async with limites.admissao_escritas.admitir():
+        yield
+
+
 # Rotas de Páginas (Views HTML)
 
 @app.get("/equipe", response_class=HTMLResponse)
 async def ver_equipe(request: Request):
     """
-    Renderiza a página 'equipe.html' contendo o resumo do projeto e o carrossel da equipe.
+    Serve a página 'equipe.html' contendo o resumo do projeto e o carrossel da equipe.
     """
-    
-    
-    return templates.TemplateResponse("equipe.html", {"request": request})
+    # Página igual para todos: servida da memória, pré-renderizada na inicialização
+    return paginas_estaticas.responder(request, templates.env, "equipe.html")
 
 @app.get("/", summary="Página Inicial")
-def home(request: Request):
-    # Retorna o template 'index.html'
-    return templates.TemplateResponse("index.html", {"request": request})
+async def home(request: Request):
+    # Retorna o 'index.html' pré-renderizado (ou 304, se o navegador já tem esta versão)
+    return paginas_estaticas.responder(request, templates.env, "index.html")
 
 @app.get("/login", summary="Página de Login")
-def login_page(request: Request):
-    # Retorna o template 'login.html'
-    return templates.TemplateResponse("login.html", {"request": request})
+async def login_page(request: Request):
+    # Retorna o 'login.html' pré-renderizado
+    return paginas_estaticas.responder(request, templates.env, "login.html")
 
 @app.get("/cadastro", summary="Página de Cadastro")
-def cadastro_page(request: Request):
-    # Retorna o template 'cadastro.html'
-    return templates.TemplateResponse("cadastro.html", {"request": request})
+async def cadastro_page(request: Request):
+    # Retorna o 'cadastro.html' pré-renderizado
+    return paginas_estaticas.responder(request, templates.env, "cadastro.html")
 
 @app.get("/dashboard", summary="Página do Dashboard")
-def dashboard_page(request: Request):
-    # Redireciona para login se o usuário não estiver na sessão
-    if "usuario_id" not in request.session:
+def dashboard_page(request: Request, session: Session = Depends(get_session)):
+    # Redireciona para login se o usuário não estiver logado (ou tiver sido desativado)
+    perfil = perfil_da_sessao(request, session)
+    if perfil is None:
         return RedirectResponse(url="/login", status_code=status.HTTP_303_SEE_OTHER)
     # Retorna o template 'dashboard.html' com dados do usuário
-    tipo = request.session.get("tipo_usuario")
+    tipo = perfil.tipo.value
     nome = request.session.get("nome")
     return templates.TemplateResponse("dashboard.html", {"request": request, "tipo_usuario": tipo, "nome": nome})
 
 @app.get("/salas", summary="Página de Salas")
 def salas_page(request: Request, session: Session = Depends(get_session)):
     # Requer autenticação
-    if "usuario_id" not in request.session:
+    perfil = perfil_da_sessao(request, session)
+    if perfil is None:
         return RedirectResponse(url="/login", status_code=status.HTTP_303_SEE_OTHER)
 
     nome = request.session.get("nome")
-    tipo = request.session.get("tipo_usuario")
-    # Busca todas as salas no BD
-    salas = session.exec(select(Sala)).all()
+    tipo = perfil.tipo.value
+    # A página só muda com a versão do catálogo de salas (ou com o usuário)
+    etag = etag_de("salas.html", VERSAO_IMPLANTACAO, versoes_cache(session, catalogo_salas.NOME), nome, tipo)
+    if resposta := nao_modificado(request, etag):
+        return resposta
+    # Lista de salas do catálogo em memória (só consulta o BD após alterações)
+    salas = catalogo_salas.listar(session)
 
     # Retorna o template 'salas.html' com a lista de salas
-    return templates.TemplateResponse("salas.html", {"request": request, "nome": nome, "tipo_usuario": tipo, "salas": salas})
+    return marcar(templates.TemplateResponse("salas.html", {"request": request, "nome": nome, "tipo_usuario": tipo, "salas": salas}), etag)
 
 
 @app.get("/reservas", summary="Página de Reservas (Unificada)")
-def reservas_page(request: Request, session: Session = Depends(get_session)):
+def reservas_page(
+    request: Request,
+    filtros: FiltroReservas = Depends(),
+    cursor: Optional[str] = None,
+    limite: int = LIMITE_PADRAO,
+    session: Session = Depends(get_session)
+):
     # Requer autenticação
-    if "usuario_id" not in request.session:
+    perfil = perfil_da_sessao(request, session)
+    if perfil is None:
         return RedirectResponse(url="/login", status_code=status.HTTP_303_SEE_OTHER)
     
     nome = request.session.get("nome")
-    tipo = request.session.get("tipo_usuario")
+    tipo = perfil.tipo.value
     usuario_id = request.session.get("usuario_id")
     
-    # Se for Admin, lista todas as reservas.
-    if tipo == TipoUsuario.ADMINISTRADOR.value:
-        reservas_exibidas = session.exec(
-            select(Reserva).order_by(Reserva.data.desc())
-        ).all()
-    # Caso contrário, lista apenas as reservas do usuário logado.
-    else:
-        reservas_exibidas = session.exec(
-            select(Reserva).where(Reserva.usuario_id == usuario_id).order_by(Reserva.data.desc())
-        ).all()
+    # Nenhuma reserva, sala ou usuário mudou desde a última visita: 304 sem consultar a listagem
+    etag = etag_de(
+        "reservas.html", VERSAO_IMPLANTACAO, versoes_cache(session, catalogo_salas.NOME, cache_autorizacao.NOME, VERSAO_RESERVAS),
+        usuario_id, nome, tipo, str(request.query_params),
+    )
+    if resposta := nao_modificado(request, etag):
+        return resposta
+
+    # Admin vê todas as reservas; os demais usuários apenas as próprias.
+    if tipo != TipoUsuario.ADMINISTRADOR.value:
+        filtros.usuario_id = usuario_id
+
+    reservas_exibidas, proximo_cursor = servicos.buscar_pagina_reservas(session, filtros, cursor, limite)
+
+    # Monta os links de navegação preservando os filtros aplicados
+    parametros = {k: v for k, v in request.query_params.items() if k != "cursor"}
+    primeira_pagina = f"/reservas?{urlencode(parametros)}"
+    proxima_pagina = None
+    if proximo_cursor:
+        proxima_pagina = f"/reservas?{urlencode({**parametros, 'cursor': proximo_cursor})}"
     
-    # Busca todas as salas para exibição no formulário
-    salas = session.exec(select(Sala)).all() 
+    # Salas para exibição no formulário, do catálogo em memória
+    salas = catalogo_salas.listar(session)
     
     # Retorna o template 'reservas.html'
-    return templates.TemplateResponse(
+    return marcar(templates.TemplateResponse(
         "reservas.html", 
         {
             "request": request, 
@@ -193,16 +316,21 @@ def reservas_page(request: Request, session: Session = Depends(get_session)):
             "tipo_usuario": tipo,
             "todas_as_reservas": reservas_exibidas, 
             "salas_disponiveis": salas,
+            "filtros": filtros,
+            "proxima_pagina": proxima_pagina,
+            "primeira_pagina": primeira_pagina if cursor else None,
         }
-    )
+    ), etag)
 
 
 # Endpoints da API
+# As rotas abaixo são 'async def' e acessam o banco via executar(): no modo "sync" a lógica
+# roda no threadpool com Session; no modo "async" roda sobre AsyncSession (aiosqlite/asyncpg).
 
 @app.post("/api/v1/cadastro")
-def cadastrar_usuario(dados: CadastroInput, request: Request, session: Session = Depends(get_session)):
+async def cadastrar_usuario(dados: CadastroInput, request: Request, session = Depends(obter_sessao)):
     # Verifica se o e-mail já existe
-    existente = session.exec(select(Usuario).where(Usuario.email == dados.email)).first()
+    existente = await executar(session, servicos.buscar_usuario_por_email, dados.email)
     if existente:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="E-mail já cadastrado.")
 
@@ -212,13 +340,11 @@ def cadastrar_usuario(dados: CadastroInput, request: Request, session: Session =
     except ValueError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Tipo de usuário inválido.")
 
-    # Cria o hash da senha
-    senha_hash = hashlib.sha256(dados.senha.encode()).hexdigest()
+    # Cria o hash da senha no pool dedicado
+    senha_hash = await gerar_hash_senha_async(dados.senha)
     # Cria e salva o novo usuário
     usuario = Usuario(nome=dados.nome, email=dados.email, tipo=tipo_usuario, senha_hash=senha_hash)
-    session.add(usuario)
-    session.commit()
-    session.refresh(usuario)
+    usuario = await executar(session, salvar, usuario)
 
     # Inicia a sessão do usuário
     request.session["usuario_id"] = usuario.id
@@ -228,18 +354,28 @@ def cadastrar_usuario(dados: CadastroInput, request: Request, session: Session =
     return JSONResponse({"mensagem": f"Cadastro realizado com sucesso, {usuario.nome}!", "redirect": "/dashboard"})
 
 
-@app.post("/api/v1/login")
-def login(dados: LoginInput, request: Request, session: Session = Depends(get_session)):
+@app.post("/api/v1/login", dependencies=[Depends(limitar_login)])
+async def login(dados: LoginInput, request: Request, session = Depends(obter_sessao)):
     # Busca o usuário pelo email
-    usuario = session.exec(select(Usuario).where(Usuario.email == dados.email)).first()
+    usuario = await executar(session, servicos.buscar_usuario_por_email, dados.email)
     if not usuario:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="E-mail não encontrado.")
 
-    # Compara o hash da senha fornecida com o hash salvo
-    senha_hash = hashlib.sha256(dados.senha.encode()).hexdigest()
-    if usuario.senha_hash != senha_hash:
+    # Compara a senha fornecida com o hash salvo
+    senha_correta, novo_hash = await verificar_senha_async(dados.senha, usuario.senha_hash)
+    if not senha_correta:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Senha incorreta.")
 
+    if not usuario.ativo:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Usuário desativado.")
+
+    # Atualiza hashes legados (SHA-256) ou com custo desatualizado
+    if novo_hash:
+        usuario = await executar(session, servicos.atualizar_hash_senha, usuario, novo_hash)
+
+    # O perfil recém-lido já entra no cache de autorização
+    cache_autorizacao.registrar(usuario)
+
     # Preenche a sessão após o login bem-sucedido
     request.session["usuario_id"] = usuario.id
     request.session["nome"] = usuario.nome
@@ -264,25 +400,12 @@ def logout(request: Request):
     # Protege o endpoint com a dependência de Admin
     dependencies=[Depends(verificar_admin)]
 )
-def criar_sala(
+async def criar_sala(
     sala_input: SalaBase,
-    session: Session = Depends(get_session)
+    session = Depends(obter_sessao)
 ):
     """Endpoint para cadastrar uma nova sala. Requer privilégio de Administrador."""
-    
-    # Verifica se a sala já existe pelo nome
-    existente = session.exec(select(Sala).where(Sala.nome == sala_input.nome)).first()
-    if existente:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Sala com o nome '{sala_input.nome}' já cadastrada.")
-
-    # Cria e salva a nova sala
-    sala = Sala.model_validate(sala_input)
-
-    session.add(sala)
-    session.commit()
-    session.refresh(sala)
-
-    return sala
+    return await executar(session, servicos.criar_sala, sala_input)
 
 @app.put(
     "/api/v1/salas/{sala_id}",
@@ -290,27 +413,19 @@ def criar_sala(
     response_model=SalaBase, 
     dependencies=[Depends(verificar_admin)]
 )
-def atualizar_sala(
+async def atualizar_sala(
     sala_id: int,
     sala_input: SalaBase,
-    session: Session = Depends(get_session)
+    response: Response,
+    versao_esperada: Optional[int] = Depends(versao_if_match),
+    session = Depends(obter_sessao)
 ):
-    """Endpoint para atualizar uma sala existente. Requer privilégio de Administrador."""
-    
-    # Busca a sala pelo ID
-    sala = session.get(Sala, sala_id)
-    if not sala:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sala não encontrada.")
-
-    # Atualiza os campos fornecidos
-    update_data = sala_input.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(sala, key, value)
-
-    session.add(sala)
-    session.commit()
-    session.refresh(sala)
-    
+    """
+    Endpoint para atualizar uma sala existente. Requer privilégio de Administrador.
+    Com If-Match (ETag de GET /api/v1/salas/{id}), só grava se a sala não mudou desde a leitura.
+    """
+    sala = await executar(session, servicos.atualizar_sala, sala_id, sala_input, versao_esperada)
+    response.headers["ETag"] = etag_versao(sala.versao)
     return sala
 
 @app.delete(
@@ -319,198 +434,268 @@ def atualizar_sala(
     status_code=status.HTTP_204_NO_CONTENT, 
     dependencies=[Depends(verificar_admin)]
 )
-def excluir_sala(
+async def excluir_sala(
     sala_id: int,
-    session: Session = Depends(get_session)
+    session = Depends(obter_sessao)
 ):
     """Endpoint para excluir uma sala. Requer privilégio de Administrador e não permite exclusão se houver reservas ativas."""
-    
-    # Busca a sala
-    sala = session.get(Sala, sala_id)
-    if not sala:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sala não encontrada.")
-    
-    # Verifica se existem reservas ativas (PENDENTES ou APROVADAS)
-    reservas_ativas = session.exec(
-        select(Reserva)
-        .where(Reserva.sala_id == sala_id)
-        .where(Reserva.status.in_([StatusReserva.PENDENTE, StatusReserva.APROVADA]))
-    ).first()
-
-    if reservas_ativas:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Não é possível excluir a sala: existem reservas PENDENTES ou APROVADAS vinculadas."
-        )
-
-    # Exclui a sala
-    session.delete(sala)
-    session.commit()
-    
+    await executar(session, servicos.excluir_sala, sala_id)
     return
 
+@app.get(
+    "/api/v1/salas/disponiveis",
+    summary="Buscar salas livres em um dia (ou período) e horário",
+    dependencies=[Depends(usuario_autenticado)]
+)
+async def buscar_salas_disponiveis(
+    request: Request,
+    response: Response,
+    data: date,
+    hora_inicio: time,
+    hora_fim: time,
+    data_fim: Optional[date] = None,
+    capacidade: Optional[int] = None,
+    recursos: Optional[str] = None,
+    session = Depends(obter_sessao)
+):
+    """
+    Endpoint que lista, para cada dia do período, as salas com capacidade mínima e recursos
+    pedidos que estão livres entre hora_inicio e hora_fim. Consulta a grade de ocupação em memória.
+    """
+    if hora_fim <= hora_inicio:
+        raise HTTPException(status_code=400, detail="O horário de término deve ser posterior ao de início.")
+
+    dias = intervalo_de_dias(data, data_fim)
+    if not dias or len(dias) > MAX_DIAS_BUSCA:
+        raise HTTPException(status_code=400, detail=f"Período inválido: informe de 1 a {MAX_DIAS_BUSCA} dias.")
+
+    etag = etag_de("disponiveis", await executar(session, versoes_cache, catalogo_salas.NOME, VERSAO_RESERVAS), str(request.query_params))
+    if resposta := nao_modificado(request, etag):
+        return resposta
+    marcar(response, etag)
+
+    livres = await executar(session, servicos.buscar_salas_livres, dias, hora_inicio, hora_fim, capacidade, recursos)
+
+    return {
+        "disponibilidade": [
+            {"data": dia, "salas": [{"id": s.id, "nome": s.nome, "capacidade": s.capacidade, "recursos": s.recursos} for s in salas_dia]}
+            for dia, salas_dia in livres.items()
+        ]
+    }
+
+@app.get(
+    "/api/v1/salas/{sala_id}",
+    summary="Consultar uma Sala (com a versão atual na ETag)",
+    dependencies=[Depends(usuario_autenticado)]
+)
+async def consultar_sala(
+    request: Request,
+    response: Response,
+    sala_id: int,
+    session = Depends(obter_sessao)
+):
+    """Endpoint que devolve os dados atuais de uma sala; a ETag serve de If-Match para a alteração."""
+    sala = await executar(session, servicos.buscar_sala, sala_id)
+    etag = etag_versao(sala.versao)
+    if resposta := nao_modificado(request, etag):
+        return resposta
+    marcar(response, etag)
+    return sala
+
 @app.post(
     "/api/v1/reservas",
     summary="Solicitar reserva de uma sala",
-    status_code=status.HTTP_201_CREATED
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(limitar_reservas)]
 )
-def solicitar_reserva(
+async def solicitar_reserva(
     dados: ReservaInput,
-    request: Request,
-    session: Session = Depends(get_session)
+    usuario_id: int = Depends(usuario_autenticado),
+    session = Depends(obter_sessao)
 ):
     """Endpoint para solicitar uma nova reserva. Requer que o usuário esteja logado."""
-    if "usuario_id" not in request.session:
-        raise HTTPException(status_code=401, detail="Usuário não autenticado.")
+    reserva = await executar(session, servicos.criar_reserva, usuario_id, dados)
 
-    usuario_id = request.session["usuario_id"]
-
-    # Verifica se a sala existe
-    sala = session.get(Sala, dados.sala_id)
-    if not sala:
-        raise HTTPException(status_code=404, detail="Sala não encontrada.")
-
-    # Cria a reserva com status PENDENTE
-    reserva = Reserva(
-        data=dados.data,
-        hora_inicio=dados.hora_inicio,
-        hora_fim=dados.hora_fim,
-        sala_id=dados.sala_id,
-        usuario_id=usuario_id,
-        status=StatusReserva.PENDENTE
-    )
+    return {"mensagem": "Solicitação de reserva enviada com sucesso!", "reserva_id": reserva.id, "status": reserva.status.value}
 
-    session.add(reserva)
-    session.commit()
-    session.refresh(reserva)
 
-    return {"mensagem": "Solicitação de reserva enviada com sucesso!", "reserva_id": reserva.id, "status": reserva.status.value}
+@app.post(
+    "/api/v1/reservas/recorrentes",
+    summary="Solicitar uma série semanal de reservas",
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(limitar_reservas)]
+)
+async def solicitar_reservas_recorrentes(
+    dados: ReservaRecorrenteInput,
+    usuario_id: int = Depends(usuario_autenticado),
+    session = Depends(obter_sessao)
+):
+    """
+    Endpoint para reservar a mesma sala e horário em dias fixos da semana dentro de um período
+    (ex.: toda terça das 08:00 às 10:00 no semestre). Retorna o resultado de cada ocorrência.
+    """
+    resultado = await executar(session, servicos.criar_reservas_recorrentes, usuario_id, dados)
+
+    return {"mensagem": f"{resultado['criadas']} reserva(s) solicitada(s) com sucesso!", **resultado}
 
 
 @app.put(
     "/api/v1/reservas/{reserva_id}",
-    summary="Editar uma reserva existente do usuário"
+    summary="Editar uma reserva existente do usuário",
+    dependencies=[Depends(limitar_reservas)]
 )
-def editar_reserva(
+async def editar_reserva(
     reserva_id: int,
     dados: ReservaUpdate,
-    request: Request,
-    session: Session = Depends(get_session)
+    response: Response,
+    versao_esperada: Optional[int] = Depends(versao_if_match),
+    usuario_id: int = Depends(usuario_autenticado),
+    session = Depends(obter_sessao)
 ):
-    """Endpoint para editar uma reserva própria. Requer autenticação e muda o status para PENDENTE após edição."""
-    if "usuario_id" not in request.session:
-        raise HTTPException(status_code=401, detail="Usuário não autenticado.")
-
-    usuario_id = request.session["usuario_id"]
-
-    # Busca a reserva
-    reserva = session.get(Reserva, reserva_id)
-    if not reserva:
-        raise HTTPException(status_code=404, detail="Reserva não encontrada.")
-
-    # Verifica se o usuário é o dono da reserva
-    if reserva.usuario_id != usuario_id:
-        raise HTTPException(status_code=403, detail="Você não tem permissão para editar esta reserva.")
-
-    # Atualiza os campos e redefine o status para PENDENTE
-    update_data = dados.model_dump(exclude_unset=True)
-    for campo, valor in update_data.items():
-        setattr(reserva, campo, valor)
-
-    reserva.status = StatusReserva.PENDENTE
-
-    session.add(reserva)
-    session.commit()
-    session.refresh(reserva)
+    """
+    Endpoint para editar uma reserva própria. Requer autenticação e muda o status para PENDENTE após edição.
+    Com If-Match (campo 'versao' das listagens), só grava se a reserva não mudou desde a leitura.
+    """
+    reserva = await executar(session, servicos.editar_reserva, usuario_id, reserva_id, dados, versao_esperada)
+    response.headers["ETag"] = etag_versao(reserva.versao)
 
     return {"mensagem": "Reserva atualizada e reenviada para análise.", "reserva": reserva, "status": reserva.status.value}
 
 
 @app.put(
     "/api/v1/reservas/{reserva_id}/cancelar",
-    summary="Solicitar cancelamento de reserva pelo usuário"
+    summary="Solicitar cancelamento de reserva pelo usuário",
+    dependencies=[Depends(limitar_reservas)]
 )
-def solicitar_cancelamento_reserva(
+async def solicitar_cancelamento_reserva(
     reserva_id: int,
-    request: Request,
-    session: Session = Depends(get_session)
+    response: Response,
+    versao_esperada: Optional[int] = Depends(versao_if_match),
+    usuario_id: int = Depends(usuario_autenticado),
+    session = Depends(obter_sessao)
 ):
-    """Endpoint para cancelar uma reserva própria, alterando o status para CANCELADA."""
-    if "usuario_id" not in request.session:
-        raise HTTPException(status_code=401, detail="Usuário não autenticado.")
-
-    usuario_id = request.session["usuario_id"]
-    
-    # Busca a reserva
-    reserva = session.get(Reserva, reserva_id)
-    if not reserva:
-        raise HTTPException(status_code=404, detail="Reserva não encontrada.")
+    """Endpoint para cancelar uma reserva própria, alterando o status para CANCELADA. Aceita If-Match."""
+    reserva = await executar(session, servicos.cancelar_reserva, usuario_id, reserva_id, versao_esperada)
+    response.headers["ETag"] = etag_versao(reserva.versao)
 
-    # Verifica se é o dono e se já não está cancelada
-    if reserva.usuario_id != usuario_id:
-        raise HTTPException(status_code=403, detail="Você não pode cancelar esta reserva.")
+    return {"mensagem": "Reserva cancelada com sucesso.", "status": reserva.status.value}
 
-    if reserva.status == StatusReserva.CANCELADA:
-         raise HTTPException(status_code=400, detail="Reserva já está cancelada.")
 
-    # Altera o status para CANCELADA
-    reserva.status = StatusReserva.CANCELADA
+@app.get(
+    "/api/v1/minhas_reservas",
+    summary="Listar as reservas do usuário logado (paginado)"
+)
+async def listar_minhas_reservas(
+    request: Request,
+    response: Response,
+    usuario_id: int = Depends(usuario_autenticado),
+    filtros: FiltroReservas = Depends(),
+    cursor: Optional[str] = None,
+    limite: int = LIMITE_PADRAO,
+    session = Depends(obter_sessao)
+):
+    """Endpoint que lista, por página, as reservas associadas ao ID do usuário na sessão."""
+    # Restringe a listagem ao usuário logado, ignorando qualquer usuario_id recebido
+    filtros.usuario_id = usuario_id
 
-    session.add(reserva)
-    session.commit()
-    session.refresh(reserva)
+    etag = etag_de("minhas_reservas", await executar(session, versoes_cache, catalogo_salas.NOME, cache_autorizacao.NOME, VERSAO_RESERVAS), usuario_id, str(request.query_params))
+    if resposta := nao_modificado(request, etag):
+        return resposta
+    marcar(response, etag)
 
-    return {"mensagem": "Reserva cancelada com sucesso.", "status": reserva.status.value}
+    reservas, proximo_cursor = await executar(session, servicos.buscar_pagina_reservas, filtros, cursor, limite)
 
+    return {"reservas": [r._asdict() for r in reservas], "proximo_cursor": proximo_cursor}
 
 @app.get(
-    "/api/v1/minhas_reservas",
-    summary="Listar todas as reservas do usuário logado"
+    "/api/v1/admin/reservas",
+    summary="Listar todas as reservas (ADMIN, paginado)",
+    dependencies=[Depends(verificar_admin)]
 )
-def listar_minhas_reservas(
+async def listar_reservas_admin_api(
     request: Request,
-    session: Session = Depends(get_session)
+    response: Response,
+    filtros: FiltroReservas = Depends(),
+    cursor: Optional[str] = None,
+    limite: int = LIMITE_PADRAO,
+    session = Depends(obter_sessao)
 ):
-    """Endpoint que lista as reservas associadas ao ID do usuário na sessão."""
-    if "usuario_id" not in request.session:
-        raise HTTPException(status_code=401, detail="Usuário não autenticado.")
+    """Endpoint para listar, por página, as reservas do sistema. Requer privilégio de Administrador."""
+    etag = etag_de("admin_reservas", await executar(session, versoes_cache, catalogo_salas.NOME, cache_autorizacao.NOME, VERSAO_RESERVAS), str(request.query_params))
+    if resposta := nao_modificado(request, etag):
+        return resposta
+    marcar(response, etag)
 
-    usuario_id = request.session["usuario_id"]
+    reservas, proximo_cursor = await executar(session, servicos.buscar_pagina_reservas, filtros, cursor, limite)
 
-    # Busca reservas pelo ID do usuário
-    reservas = session.exec(
-        select(Reserva).where(Reserva.usuario_id == usuario_id)
-    ).all()
+    return {"reservas": [r._asdict() for r in reservas], "proximo_cursor": proximo_cursor}
 
-    return reservas
 
 @app.get(
-    "/api/v1/admin/reservas",
-    summary="Listar todas as reservas (ADMIN)",
+    "/api/v1/admin/reservas/exportar",
+    summary="Exportar o histórico de reservas em CSV ou NDJSON (ADMIN)",
     dependencies=[Depends(verificar_admin)]
 )
-def listar_reservas_admin_api(session: Session = Depends(get_session)):
-    """Endpoint para listar todas as reservas do sistema. Requer privilégio de Administrador."""
-    reservas = session.exec(select(Reserva)).all()
-    return reservas
+async def exportar_reservas(
+    filtros: FiltroReservas = Depends(),
+    formato: str = "csv",
+    arquivadas: bool = False
+):
+    """
+    Endpoint que transmite todas as reservas que atendem aos filtros, com nome da sala e do
+    usuário, em ordem cronológica. A resposta é gerada por lotes, sem montar a lista em memória.
+    Com 'arquivadas=true' inclui as reservas antigas já movidas para o arquivo.
+    """
+    formato = formato.lower()
+    if formato not in exportacao.FORMATOS:
+        raise HTTPException(status_code=400, detail=f"Formato inválido. Opções: {', '.join(exportacao.FORMATOS)}.")
+
+    if engine_async is not None:
+        conteudo = exportacao.exportar_async(engine_async, filtros, formato, arquivadas)
+    else:
+        conteudo = exportacao.exportar(engine, filtros, formato, arquivadas)
+
+    return StreamingResponse(
+        conteudo,
+        media_type=exportacao.FORMATOS[formato],
+        headers={"Content-Disposition": f'attachment; filename="reservas.{formato}"'},
+    )
+
+
+@app.put(
+    "/api/v1/admin/reservas/status",
+    summary="Mudar o status de várias reservas de uma vez (ADMIN)",
+    dependencies=[Depends(verificar_admin), Depends(admitir_escrita)]
+)
+async def mudar_status_em_lote(
+    dados: StatusLoteInput,
+    session = Depends(obter_sessao)
+):
+    """
+    Endpoint para o Administrador aprovar/rejeitar/cancelar em lote, escolhendo as reservas por
+    IDs ou por filtro (ex.: todas as pendentes da sala X no dia D). Respeita os conflitos de horário.
+    """
+    resultado = await executar(session, servicos.mudar_status_em_lote, dados)
+
+    return {"mensagem": f"{len(resultado['alteradas'])} reserva(s) alterada(s) para {resultado['status']}.", **resultado}
 
 
 @app.put(
     "/api/v1/reservas/{reserva_id}/status",
     summary="Mudar o status da reserva (ADMIN)",
-    dependencies=[Depends(verificar_admin)]
+    dependencies=[Depends(verificar_admin), Depends(admitir_escrita)]
 )
-def mudar_status_reserva(
+async def mudar_status_reserva(
     reserva_id: int,
     status_input: dict, 
-    session: Session = Depends(get_session)
+    response: Response,
+    versao_esperada: Optional[int] = Depends(versao_if_match),
+    session = Depends(obter_sessao)
 ):
-    """Endpoint para que o Administrador altere o status (Aprovada/Rejeitada/Cancelada) de uma reserva."""
-    # Busca a reserva
-    reserva = session.get(Reserva, reserva_id)
-    if not reserva:
-        raise HTTPException(status_code=404, detail="Reserva não encontrada.")
-
+    """
+    Endpoint para que o Administrador altere o status (Aprovada/Rejeitada/Cancelada) de uma reserva.
+    Com If-Match, só grava se a reserva não mudou desde a leitura (ex.: editada pelo usuário).
+    """
     # Extrai e valida o novo status
     novo_status_str = status_input.get("status")
     if not novo_status_str:
@@ -521,11 +706,169 @@ def mudar_status_reserva(
     except ValueError:
         raise HTTPException(status_code=400, detail="Status inválido.")
 
-    # Atualiza e salva o status
-    reserva.status = novo_status
+    reserva = await executar(session, servicos.mudar_status_reserva, reserva_id, novo_status, versao_esperada)
+    response.headers["ETag"] = etag_versao(reserva.versao)
+
+    return {"mensagem": f"Status alterado para {novo_status_str} com sucesso!", "status": reserva.status.value}
+
+
+# Rotas de Chaves (ADMIN)
+
+@app.post(
+    "/api/v1/admin/chaves/retirada",
+    summary="Registrar a retirada da chave de uma reserva aprovada (ADMIN)",
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(verificar_admin), Depends(admitir_escrita)]
+)
+async def retirar_chave(request: Request, dados: RetiradaChaveInput, session = Depends(obter_sessao)):
+    """Endpoint para o Administrador entregar a chave ao dono da reserva, no horário dela."""
+    return await executar(session, chaves.retirar_chave, dados, request.session["usuario_id"])
+
+
+@app.post(
+    "/api/v1/admin/chaves/devolucao",
+    summary="Registrar a devolução da chave de uma sala (ADMIN)",
+    dependencies=[Depends(verificar_admin), Depends(admitir_escrita)]
+)
+async def devolver_chave(request: Request, dados: DevolucaoChaveInput, session = Depends(obter_sessao)):
+    """Endpoint para o Administrador receber a chave de volta; informa o atraso em minutos."""
+    return await executar(session, chaves.devolver_chave, dados, request.session["usuario_id"])
+
+
+@app.get(
+    "/api/v1/admin/chaves",
+    summary="Chaves retiradas agora e com quem estão (ADMIN)",
+    dependencies=[Depends(verificar_admin)]
+)
+async def listar_chaves(atrasadas: bool = False, session = Depends(obter_sessao)):
+    """Endpoint com as chaves fora do claviculário; com 'atrasadas=true', só as de prazo vencido."""
+    return {"chaves": await executar(session, chaves.listar_posses, atrasadas)}
+
+
+@app.get(
+    "/api/v1/admin/chaves/{sala_id}/historico",
+    summary="Histórico de retiradas e devoluções da chave de uma sala (ADMIN)",
+    dependencies=[Depends(verificar_admin)]
+)
+async def historico_chave(
+    sala_id: int,
+    antes_de: Optional[int] = None,
+    limite: int = LIMITE_PADRAO,
+    session = Depends(obter_sessao)
+):
+    """Endpoint paginado do mais recente para o mais antigo; 'antes_de' vem da página anterior."""
+    eventos, proximo = await executar(session, chaves.historico_sala, sala_id, antes_de, limite)
+    return {"eventos": eventos, "proximo_antes_de": proximo}
+
+
+@app.get(
+    "/api/v1/admin/caches",
+    summary="Estatísticas dos caches em memória (ADMIN)",
+    dependencies=[Depends(verificar_admin)]
+)
+async def estatisticas_caches():
+    """Endpoint com os contadores de acerto/falha dos caches deste processo."""
+    return {
+        "salas": catalogo_salas.estatisticas(), "autorizacao": cache_autorizacao.estatisticas(),
+        "grade": grade_ocupacao.estatisticas(), "eventos": hub_eventos.estatisticas(),
+        "admissao": limites.estatisticas(),
+    }
+
 
-    session.add(reserva)
-    session.commit()
-    session.refresh(reserva)
+@app.get(
+    "/api/v1/admin/tarefas",
+    summary="Última execução e trava das tarefas periódicas (ADMIN)",
+    dependencies=[Depends(verificar_admin)]
+)
+async def estado_tarefas(session = Depends(obter_sessao)):
+    """Endpoint com quando cada tarefa rodou, quanto demorou, quantas reservas alterou e qual worker está com ela."""
+    return {"tarefas": await executar(session, listar_tarefas)}
+
+
+@app.get(
+    "/api/v1/eventos",
+    summary="Fluxo em tempo real (SSE) das mudanças de reservas",
+)
+async def fluxo_eventos(request: Request):
+    """
+    Endpoint Server-Sent Events: o usuário recebe as mudanças das próprias reservas e o
+    Administrador as de todas. A sessão do banco é usada só na autenticação e liberada
+    antes de o fluxo começar, para não prender uma conexão por cliente conectado.
+    """
+    async with sessao_avulsa() as session:
+        perfil = await perfil_atual(request, session)
+    if perfil is None:
+        raise HTTPException(status_code=401, detail="Usuário não autenticado.")
+
+    return StreamingResponse(
+        transmitir(hub_eventos, request.session["usuario_id"], perfil.tipo == TipoUsuario.ADMINISTRADOR),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    return {"mensagem": f"Status alterado para {novo_status_str} com sucesso!", "status": reserva.status.value}
\ No newline at end of file
+
+# Medidores lidos na hora da coleta de /metrics
+metricas.registrar_coletor(lambda: [
+    ("labkey_sse_conexoes", "Conexões SSE abertas neste processo", {(): hub_eventos.estatisticas()["conexoes"]}, ()),
+    ("labkey_cache_acertos", "Acertos acumulados dos caches em memória",
+     {("salas",): catalogo_salas.estatisticas()["acertos"], ("autorizacao",): cache_autorizacao.estatisticas()["acertos"]}, ("cache",)),
+    ("labkey_cache_falhas", "Falhas acumuladas dos caches em memória",
+     {("salas",): catalogo_salas.estatisticas()["falhas"], ("autorizacao",): cache_autorizacao.estatisticas()["falhas"]}, ("cache",)),
+])
+
+
+metricas.registrar_coletor(limites.medidores)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metricas_prometheus():
+    """Métricas deste processo no formato texto do Prometheus."""
+    return PlainTextResponse(metricas.exportar(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.put(
+    "/api/v1/admin/usuarios/{usuario_id}",
+    summary="Alterar o tipo ou desativar um usuário (ADMIN)",
+    dependencies=[Depends(verificar_admin)]
+)
+async def atualizar_usuario_admin(
+    usuario_id: int,
+    dados: UsuarioAdminUpdate,
+    session = Depends(obter_sessao)
+):
+    """Endpoint para o Administrador promover, rebaixar ou desativar um usuário. Vale já na próxima requisição dele."""
+    usuario = await executar(session, servicos.atualizar_usuario, usuario_id, dados)
+
+    return {"id": usuario.id, "nome": usuario.nome, "tipo": usuario.tipo.value, "ativo": usuario.ativo}
+
+
+@app.get(
+    "/api/v1/admin/analise",
+    summary="Painel de uso das salas (ADMIN)",
+    dependencies=[Depends(verificar_admin)]
+)
+async def painel_analise(
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    sala_id: Optional[int] = None,
+    limite_usuarios: int = 10,
+    session = Depends(obter_sessao)
+):
+    """
+    Endpoint com a utilização de cada sala (horas por semana, reservas por status, taxas de
+    aprovação/rejeição, horários de pico) e os usuários que mais reservam.
+    """
+    if data_inicio and data_fim and data_inicio > data_fim:
+        raise HTTPException(status_code=400, detail="A data de início deve ser anterior ou igual à data de fim.")
+    return await executar(session, analise.painel, data_inicio, data_fim, sala_id, max(1, min(limite_usuarios, 100)))
+
+
+@app.post(
+    "/api/v1/admin/analise/reconstruir",
+    summary="Recalcular os resumos de uso a partir das reservas (ADMIN)",
+    dependencies=[Depends(verificar_admin)]
+)
+async def reconstruir_analise(session = Depends(obter_sessao)):
+    """Endpoint para recalcular as tabelas de resumo (ex.: após importações feitas direto no banco)."""
+    await executar(session, servicos.reconstruir_resumos_de_uso)
+    return {"mensagem": "Resumos de uso recalculados."}
@@ -0,0 +1,250 @@
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from bisect import bisect_left
+from contextvars import ContextVar
+import logging
+import threading
+import time
+
+import jinja2
+from sqlalchemy import event
+
+import config
+
+# Métricas de Desempenho (formato Prometheus)
+#
+# Cada requisição HTTP carrega uma MedicaoRequisicao num ContextVar; os eventos do
+# SQLAlchemy e a renderização de templates somam nela (o contexto acompanha o threadpool
+# do modo "sync" e o run_sync do modo "async"). Ao final da requisição os totais vão para
+# os histogramas de uma só vez, sob uma única trava: o custo por consulta é só o de ler o
+# relógio e somar dois números.
+
+log = logging.getLogger("labkey.metricas")
+
+_trava = threading.Lock()
+
+LIMITES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+LIMITES_TEMPLATE = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
+
+def _rotulos(nomes: Tuple[str, ...], valores: tuple) -> str:
+    if not nomes:
+        return ""
+    pares = ",".join(f'{nome}="{str(valor)}"' for nome, valor in zip(nomes, valores))
+    return "{" + pares + "}"
+
+
+class Contador:
+    tipo = "counter"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Tuple[str, ...] = ()):
+        self.nome, self.ajuda, self.rotulos = nome, ajuda, rotulos
+        self._valores: Dict[tuple, float] = {}
+        _metricas.append(self)
+
+    def _incrementar(self, valores: tuple, quantidade: float = 1):
+        """Soma ao contador; quem chama já deve estar com _trava."""
+        self._valores[valores] = self._valores.get(valores, 0) + quantidade
+
+    def incrementar(self, valores: tuple = (), quantidade: float = 1):
+        with _trava:
+            self._incrementar(valores, quantidade)
+
+    def linhas(self) -> Iterable[str]:
+        for valores, total in sorted(self._valores.items()):
+            yield f"{self.nome}{_rotulos(self.rotulos, valores)} {total}"
+
+
+class Histograma:
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Tuple[str, ...], limites: Tuple[float, ...]):
+        self.nome, self.ajuda, self.rotulos, self.limites = nome, ajuda, rotulos, limites
+        # Por combinação de rótulos: contagem por faixa (a última é +Inf) e a soma
+        self._series: Dict[tuple, list] = {}
+        _metricas.append(self)
+
+    def _observar(self, valores: tuple, valor: float):
+        """Registra uma observação; quem chama já deve estar com _trava."""
+        serie = self._series.get(valores)
+        if serie is None:
+            serie = self._series[valores] = [0] * (len(self.limites) + 1) + [0.0]
+        serie[bisect_left(self.limites, valor)] += 1
+        serie[-1] += valor
+
+    def observar(self, valores: tuple, valor: float):
+        with _trava:
+            self._observar(valores, valor)
+
+    def linhas(self) -> Iterable[str]:
+        for valores, serie in sorted(self._series.items()):
+            acumulado = 0
+            for limite, contagem in zip(self.limites + ("+Inf",), serie):
+                acumulado += contagem
+                yield f"{self.nome}_bucket{_rotulos(self.rotulos + ('le',), valores + (limite,))} {acumulado}"
+            yield f"{self.nome}_sum{_rotulos(self.rotulos, valores)} {serie[-1]}"
+            yield f"{self.nome}_count{_rotulos(self.rotulos, valores)} {acumulado}"
+
+
+_metricas: List = []
+# Funções chamadas a cada coleta que devolvem medidores: (nome, ajuda, {rótulos: valor})
+_coletores: List[Callable[[], Iterable[Tuple[str, str, Dict[tuple, float], Tuple[str, ...]]]]] = []
+
+
+def registrar_coletor(coletor: Callable):
+    """Registra medidores (gauges) calculados na hora da coleta, ex.: conexões SSE abertas."""
+    _coletores.append(coletor)
+
+
+def exportar() -> str:
+    """Todas as métricas no formato texto do Prometheus (versão 0.0.4)."""
+    linhas = []
+    with _trava:
+        for metrica in _metricas:
+            linhas.append(f"# HELP {metrica.nome} {metrica.ajuda}")
+            linhas.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+            linhas.extend(metrica.linhas())
+    for coletor in _coletores:
+        for nome, ajuda, valores, rotulos in coletor():
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} gauge")
+            linhas.extend(f"{nome}{_rotulos(rotulos, chave)} {valor}" for chave, valor in valores.items())
+    return "\n".join(linhas) + "\n"
+
+
+# Métricas da Aplicação
+
+requisicoes = Contador("labkey_http_requisicoes_total", "Requisições HTTP atendidas", ("metodo", "rota", "status"))
+latencia = Histograma("labkey_http_requisicao_segundos", "Duração das requisições HTTP", ("metodo", "rota"), LIMITES_SEGUNDOS)
+consultas_requisicao = Histograma("labkey_db_consultas_por_requisicao", "Comandos SQL por requisição", ("rota",), LIMITES_CONSULTAS)
+tempo_db_requisicao = Histograma("labkey_db_segundos_por_requisicao", "Tempo em comandos SQL por requisição", ("rota",), LIMITES_SEGUNDOS)
+consultas_fora = Contador("labkey_db_consultas_fora_de_requisicao_total", "Comandos SQL fora de requisições HTTP (inicialização, tarefas)")
+render_template = Histograma("labkey_template_render_segundos", "Tempo de renderização por template", ("template",), LIMITES_TEMPLATE)
+requisicoes_lentas = Contador("labkey_http_requisicoes_lentas_total", "Requisições acima dos limites de lentidão", ("rota",))
+
+
+# Medição por Requisição
+
+class MedicaoRequisicao:
+    __slots__ = ("consultas", "tempo_db", "tempo_template")
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_db = 0.0
+        self.tempo_template = 0.0
+
+
+_medicao: ContextVar[Optional[MedicaoRequisicao]] = ContextVar("medicao_requisicao", default=None)
+
+
+def rota_da_requisicao(scope) -> str:
+    """Modelo de caminho da rota (ex.: /api/v1/reservas/{reserva_id}), para limitar os rótulos."""
+    rota = scope.get("route")
+    if rota is not None:
+        return getattr(rota, "path", "desconhecida")
+    if scope["path"].startswith("/static/"):
+        return "/static"
+    return "desconhecida"
+
+
+def registrar_requisicao(scope, status: int, duracao: Optional[float], medicao: MedicaoRequisicao):
+    metodo, rota = scope["method"], rota_da_requisicao(scope)
+    lenta = duracao is not None and (
+        duracao * 1000 >= config.METRICAS_LENTA_MS or medicao.consultas >= config.METRICAS_LENTA_CONSULTAS
+    )
+    with _trava:
+        requisicoes._incrementar((metodo, rota, status))
+        if duracao is not None:
+            latencia._observar((metodo, rota), duracao)
+        consultas_requisicao._observar((rota,), medicao.consultas)
+        tempo_db_requisicao._observar((rota,), medicao.tempo_db)
+        if lenta:
+            requisicoes_lentas._incrementar((rota,))
+    if lenta:
+        log.warning(
+            "Requisição lenta: %s %s -> %s em %.0f ms (%d comandos SQL em %.0f ms, templates %.0f ms)",
+            metodo, scope["path"], status, duracao * 1000, medicao.consultas, medicao.tempo_db * 1000, medicao.tempo_template * 1000,
+        )
+
+
+class MetricasMiddleware:
+    """
+    Middleware ASGI puro (não interfere no streaming das respostas) que mede cada requisição.
+    Respostas text/event-stream ficam fora do histograma de latência: duram o quanto o
+    cliente permanecer conectado.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        medicao = MedicaoRequisicao()
+        token = _medicao.set(medicao)
+        resposta = {"status": 500, "fluxo": False}
+        inicio = time.perf_counter()
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                resposta["status"] = mensagem["status"]
+                for nome, valor in mensagem.get("headers", ()):
+                    if nome == b"content-type":
+                        resposta["fluxo"] = valor.startswith(b"text/event-stream")
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _medicao.reset(token)
+            duracao = None if resposta["fluxo"] else time.perf_counter() - inicio
+            registrar_requisicao(scope, resposta["status"], duracao, medicao)
+
+
+# Ganchos do SQLAlchemy
+
+def instrumentar_engine(engine_sync):
+    """
+    Conta e cronometra os comandos SQL do engine (no assíncrono, passe engine.sync_engine).
+    O início fica no contexto de execução do próprio comando: um comando que falha não tem
+    after_cursor_execute, e nada dele sobra na conexão (que volta ao pool e é reaproveitada).
+    """
+
+    @event.listens_for(engine_sync, "before_cursor_execute")
+    def antes(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.inicio_metricas = time.perf_counter()
+
+    @event.listens_for(engine_sync, "after_cursor_execute")
+    def depois(conn, cursor, statement, parameters, context, executemany):
+        inicio = getattr(context, "inicio_metricas", None)
+        if inicio is None:
+            return
+        duracao = time.perf_counter() - inicio
+        medicao = _medicao.get()
+        if medicao is None:
+            consultas_fora.incrementar()
+        else:
+            medicao.consultas += 1
+            medicao.tempo_db += duracao
+        if duracao * 1000 >= config.METRICAS_SQL_LENTA_MS:
+            log.warning("Comando SQL lento (%.0f ms): %s", duracao * 1000, " ".join(statement.split())[:500])
+
+
+# Templates
+
+class TemplateMedido(jinja2.Template):
+    """Template do Jinja2 que cronometra render(); use com env.template_class = TemplateMedido."""
+
+    def render(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            duracao = time.perf_counter() - inicio
+            medicao = _medicao.get()
+            if medicao is not None:
+                medicao.tempo_template += duracao
+            render_template.observar((self.name,), duracao)
@@ -0,0 +1,148 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, MetaData, Table, select, inspect
+from sqlalchemy.schema import CreateTable
+from sqlmodel import SQLModel
+
+# Registra as tabelas dos modelos em SQLModel.metadata (as migrações procuram os índices lá)
+import models.models  # noqa: F401
+from analise import reconstruir_resumos
+
+# Migrações de Schema
+#
+# SQLModel.metadata.create_all só cria tabelas que ainda não existem; ele não altera
+# tabelas já criadas nem adiciona índices novos a elas. As migrações abaixo levam os
+# bancos já implantados ao schema atual e ficam registradas na tabela 'migracao_schema'.
+# Novas alterações entram no fim da lista MIGRACOES, com a próxima versão.
+
+_metadata_controle = MetaData()
+migracao_schema = Table(
+    "migracao_schema",
+    _metadata_controle,
+    Column("versao", Integer, primary_key=True),
+    Column("descricao", String, nullable=False),
+    Column("aplicada_em", DateTime, nullable=False),
+)
+
+
+def _criar_indices(*nomes: str):
+    """Migração que cria (se ainda não existirem) os índices declarados nos modelos."""
+    def migrar(conn):
+        for tabela in SQLModel.metadata.sorted_tables:
+            for indice in tabela.indexes:
+                if indice.name in nomes:
+                    indice.create(conn, checkfirst=True)
+    return migrar
+
+
+def _adicionar_coluna(nome_tabela: str, nome_coluna: str, padrao_sql: str):
+    """
+    Migração que adiciona uma coluna declarada nos modelos a uma tabela existente
+    (bancos criados depois dela já a recebem do create_all).
+    """
+    def migrar(conn):
+        if nome_coluna in {c["name"] for c in inspect(conn).get_columns(nome_tabela)}:
+            return
+        coluna = SQLModel.metadata.tables[nome_tabela].c[nome_coluna]
+        tipo = coluna.type.compile(dialect=conn.dialect)
+        nulo = "" if coluna.nullable else " NOT NULL"
+        conn.exec_driver_sql(f"ALTER TABLE {nome_tabela} ADD COLUMN {nome_coluna} {tipo}{nulo} DEFAULT {padrao_sql}")
+    return migrar
+
+
+def _em_sequencia(*passos):
+    """Migração formada por vários passos, aplicados na mesma transação."""
+    def migrar(conn):
+        for passo in passos:
+            passo(conn)
+    return migrar
+
+
+def _adicionar_valores_enum(nome_tipo: str, *valores: str):
+    """
+    Migração que acrescenta valores a um enum nativo do PostgreSQL. No SQLite o enum é
+    um VARCHAR sem CHECK e nada precisa mudar.
+    """
+    def migrar(conn):
+        if conn.dialect.name != "postgresql":
+            return
+        for valor in valores:
+            conn.exec_driver_sql(f"ALTER TYPE {nome_tipo} ADD VALUE IF NOT EXISTS '{valor}'")
+    return migrar
+
+
+def _ativar_autoincremento(nome_tabela: str, *tabelas_com_ids: str):
+    """
+    Migração (só SQLite) que recria a tabela com AUTOINCREMENT, como declarado no modelo
+    (sqlite_autoincrement), e leva o contador além do maior ID já usado nela e nas
+    'tabelas_com_ids'. Sem AUTOINCREMENT o SQLite reaproveita os IDs mais altos depois
+    que as linhas são apagadas (ex.: movidas para o arquivo).
+    """
+    def migrar(conn):
+        if conn.dialect.name != "sqlite":
+            return
+        tabela = SQLModel.metadata.tables[nome_tabela]
+        sql = conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (nome_tabela,)).scalar()
+        if "AUTOINCREMENT" not in sql.upper():
+            # A chave primária não muda com ALTER TABLE: copia as linhas para uma tabela nova
+            nova = f"{nome_tabela}_nova"
+            criar = str(CreateTable(tabela).compile(dialect=conn.dialect))
+            conn.exec_driver_sql("PRAGMA defer_foreign_keys = ON")
+            conn.exec_driver_sql(criar.replace(f"CREATE TABLE {nome_tabela} ", f"CREATE TABLE {nova} ", 1))
+            colunas = ", ".join(c.name for c in tabela.columns)
+            conn.exec_driver_sql(f"INSERT INTO {nova} ({colunas}) SELECT {colunas} FROM {nome_tabela}")
+            conn.exec_driver_sql(f"DROP TABLE {nome_tabela}")
+            conn.exec_driver_sql(f"ALTER TABLE {nova} RENAME TO {nome_tabela}")
+            for indice in tabela.indexes:
+                indice.create(conn)
+
+        maior = max(conn.exec_driver_sql(f"SELECT COALESCE(MAX(id), 0) FROM {t}").scalar()
+                    for t in (nome_tabela, *tabelas_com_ids))
+        atual = conn.exec_driver_sql("SELECT seq FROM sqlite_sequence WHERE name = ?", (nome_tabela,)).scalar()
+        if atual is None:
+            conn.exec_driver_sql("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (nome_tabela, maior))
+        elif atual < maior:
+            conn.exec_driver_sql("UPDATE sqlite_sequence SET seq = ? WHERE name = ?", (maior, nome_tabela))
+    return migrar
+
+
+# (versão, descrição, função que recebe a conexão)
+MIGRACOES = [
+    (1, "Índice de conflitos de horário em reserva (sala_id, data, hora_inicio)",
+     _criar_indices("ix_reserva_sala_data_inicio")),
+    (2, "Índices das listagens de reserva e do login por e-mail",
+     _criar_indices("ix_reserva_data_id", "ix_reserva_usuario_data_id", "ix_reserva_status_data_id",
+                    "ix_reserva_sala_status", "ix_usuario_email")),
+    (3, "Coluna usuario.ativo",
+     _adicionar_coluna("usuario", "ativo", "1")),
+    # As tabelas de resumo são criadas pelo create_all; aqui elas recebem o histórico existente
+    (4, "Carga inicial dos resumos de uso (analise.py)",
+     reconstruir_resumos),
+    # Os enums são gravados pelo nome do membro
+    (5, "Status EXPIRADA e CONCLUIDA de reserva (agendador.py)",
+     _adicionar_valores_enum("statusreserva", "EXPIRADA", "CONCLUIDA")),
+    (6, "Coluna versao de reserva, sala e reservaarquivada (concorrência otimista)",
+     _em_sequencia(*(_adicionar_coluna(t, "versao", "1") for t in ("reserva", "sala", "reservaarquivada")))),
+    # IDs arquivados não podem voltar a ser usados em reserva (colidiriam no próximo arquivamento)
+    (7, "AUTOINCREMENT em reserva, com o contador além dos IDs já arquivados",
+     _ativar_autoincremento("reserva", "reservaarquivada")),
+]
+
+
+def aplicar_migracoes(engine) -> list:
+    """
+    Aplica, em ordem e cada uma na sua transação, as migrações ainda não registradas.
+    Retorna as versões aplicadas nesta execução.
+    """
+    _metadata_controle.create_all(engine)
+    with engine.connect() as conn:
+        aplicadas = set(conn.execute(select(migracao_schema.c.versao)).scalars())
+
+    novas = []
+    for versao, descricao, migrar in MIGRACOES:
+        if versao in aplicadas:
+            continue
+        with engine.begin() as conn:
+            migrar(conn)
+            conn.execute(migracao_schema.insert().values(versao=versao, descricao=descricao, aplicada_em=datetime.now()))
+        novas.append(versao)
+    return novas
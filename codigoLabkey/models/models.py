@@ -1,7 +1,8 @@
 from typing import Optional, List
 # Importa Field, SQLModel e Relationship, essenciais para definir modelos e mapeamento de banco de dados
 from sqlmodel import Field, SQLModel, Relationship
-from datetime import date, time
+from sqlalchemy import Index
+from datetime import date, time, datetime
 import enum
 
 # Definições de Enums (Tipos Enumerados)
@@ -14,6 +15,14 @@ class TipoUsuario(str, enum.Enum):
     ADMINISTRADOR = "ADMINISTRADOR"
 
 
+class TipoEventoChave(str, enum.Enum):
+    """
+    Define os movimentos físicos de uma chave de sala.
+    """
+    RETIRADA = "Retirada"
+    DEVOLUCAO = "Devolução"
+
+
 class StatusReserva(str, enum.Enum):
     """
     Define os possíveis estados de uma reserva no sistema.
@@ -22,6 +31,9 @@ class StatusReserva(str, enum.Enum):
     APROVADA = "Aprovada"
     REJEITADA = "Rejeitada"
     CANCELADA = "Cancelada"
+    # Estados finais atribuídos pelas tarefas periódicas (ver agendador.py)
+    EXPIRADA = "Expirada"      # Pendente cujo dia passou sem decisão
+    CONCLUIDA = "Concluída"    # Aprovada cujo horário já terminou
 
 
 # Schemas Base (Modelos de Dados Sem Relações/ID de Tabela)
@@ -31,7 +43,7 @@ class UsuarioBase(SQLModel):
     Schema base para dados de Usuário, usado em criações e visualizações.
     """
     nome: str = Field(index=True, description="Nome completo do usuário")
-    email: str = Field(unique=True, description="E-mail único para login")
+    email: str = Field(unique=True, index=True, description="E-mail único para login")
     tipo: TipoUsuario = Field(default=TipoUsuario.COMUM, description="Tipo de usuário")
 
 
@@ -89,6 +101,21 @@ class ReservaInput(SQLModel):
     sala_id: int
 
 
+class ReservaRecorrenteInput(SQLModel):
+    """
+    Modelo de input para reservas semanais recorrentes (ex.: toda terça, 08:00-10:00, no semestre).
+    dias_semana segue date.weekday(): 0 = segunda ... 6 = domingo.
+    """
+    sala_id: int
+    data_inicio: date
+    data_fim: date
+    dias_semana: List[int]
+    hora_inicio: time
+    hora_fim: time
+    # Se verdadeiro, cria as ocorrências livres mesmo que outras estejam em conflito
+    parcial: bool = False
+
+
 class SalaUpdate(SQLModel):
     """
     Modelo de input para atualização parcial de dados da Sala.
@@ -112,6 +139,51 @@ class ReservaUpdate(SQLModel):
     status: Optional[StatusReserva] = None # Embora o usuário não deva alterar o status, a estrutura permite
 
 
+class UsuarioAdminUpdate(SQLModel):
+    """
+    Modelo de input para o Administrador alterar o tipo ou desativar um usuário.
+    """
+    tipo: Optional[TipoUsuario] = None
+    ativo: Optional[bool] = None
+
+
+class FiltroReservas(SQLModel):
+    """
+    Filtros opcionais (query string) aplicados às listagens de reservas.
+    """
+    data_inicio: Optional[date] = None
+    data_fim: Optional[date] = None
+    sala_id: Optional[int] = None
+    usuario_id: Optional[int] = None
+    status: Optional[StatusReserva] = None
+
+
+class StatusLoteInput(SQLModel):
+    """
+    Modelo de input para a mudança de status em lote (ADMIN).
+    As reservas são escolhidas pela lista de IDs ou por um filtro (ex.: pendentes da sala X no dia D).
+    """
+    status: StatusReserva
+    ids: Optional[List[int]] = None
+    filtros: Optional[FiltroReservas] = None
+
+
+class RetiradaChaveInput(SQLModel):
+    """
+    Modelo de input para registrar a retirada da chave de uma reserva aprovada (ADMIN).
+    """
+    reserva_id: int
+    observacao: Optional[str] = None
+
+
+class DevolucaoChaveInput(SQLModel):
+    """
+    Modelo de input para registrar a devolução da chave de uma sala (ADMIN).
+    """
+    sala_id: int
+    observacao: Optional[str] = None
+
+
 # Modelos de Tabela (Mapeamento ORM)
 
 class Usuario(UsuarioBase, table=True):
@@ -121,6 +193,7 @@ class Usuario(UsuarioBase, table=True):
     """
     id: Optional[int] = Field(default=None, primary_key=True)
     senha_hash: str # Campo para armazenar o hash da senha
+    ativo: bool = Field(default=True, description="Usuários desativados não conseguem entrar nem usar a API")
 
     # Define o relacionamento com a tabela Reserva (Um Usuário tem muitas Reservas)
     reservas: List["Reserva"] = Relationship(back_populates="usuario")
@@ -132,6 +205,8 @@ class Sala(SalaBase, table=True):
     Herdando de SalaBase e adicionando o ID.
     """
     id: Optional[int] = Field(default=None, primary_key=True)
+    # Incrementada a cada alteração; as escritas só valem sobre a versão lida (If-Match)
+    versao: int = Field(default=1, description="Versão da sala, para o controle de concorrência")
 
     # Define o relacionamento com a tabela Reserva (Uma Sala tem muitas Reservas)
     reservas: List["Reserva"] = Relationship(back_populates="sala")
@@ -142,14 +217,158 @@ class Reserva(ReservaBase, table=True):
     Modelo de Tabela para Reservas.
     Herdando de ReservaBase e definindo chaves estrangeiras para Usuário e Sala.
     """
+    __table_args__ = (
+        # Índice composto usado na detecção de conflitos de horário por sala e dia
+        Index("ix_reserva_sala_data_inicio", "sala_id", "data", "hora_inicio"),
+        # Listagem geral, ordenada por (data, id), e leitura da grade de ocupação por dia
+        Index("ix_reserva_data_id", "data", "id"),
+        # "Minhas reservas": filtro por usuário já na ordem da paginação
+        Index("ix_reserva_usuario_data_id", "usuario_id", "data", "id"),
+        # Filtro por status (ex.: pendentes) na ordem da paginação
+        Index("ix_reserva_status_data_id", "status", "data", "id"),
+        # Exclusão de sala: existem reservas ativas nesta sala?
+        Index("ix_reserva_sala_status", "sala_id", "status"),
+        # IDs nunca reaproveitados: os das reservas arquivadas continuam em uso em ReservaArquivada
+        {"sqlite_autoincrement": True},
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
 
     # Chave estrangeira ligando à tabela Usuario
     usuario_id: int = Field(foreign_key="usuario.id")
     # Chave estrangeira ligando à tabela Sala
     sala_id: int = Field(foreign_key="sala.id")
+    # Incrementada a cada alteração; as escritas só valem sobre a versão lida (If-Match)
+    versao: int = Field(default=1, description="Versão da reserva, para o controle de concorrência")
 
     # Define o relacionamento de volta para a tabela Usuario (Muitas Reservas têm um Usuário)
     usuario: Optional[Usuario] = Relationship(back_populates="reservas")
     # Define o relacionamento de volta para a tabela Sala (Muitas Reservas têm uma Sala)
-    sala: Optional[Sala] = Relationship(back_populates="reservas")
\ No newline at end of file
+    sala: Optional[Sala] = Relationship(back_populates="reservas")
+
+
+class ReservaArquivada(ReservaBase, table=True):
+    """
+    Modelo de Tabela com as reservas já encerradas e mais antigas que o horizonte de
+    arquivamento (ver arquivamento.py). Mesmas colunas de Reserva, com o mesmo ID, e sem
+    chaves estrangeiras: o arquivo não impede a exclusão de salas e usuários.
+    """
+    __table_args__ = (
+        # Exportação em ordem cronológica, junto com a tabela de reservas
+        Index("ix_reservaarquivada_data_id", "data", "id"),
+        Index("ix_reservaarquivada_usuario_data_id", "usuario_id", "data", "id"),
+    )
+
+    id: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    usuario_id: int
+    sala_id: int
+    versao: int = Field(default=1)
+    arquivada_em: datetime
+
+
+# Controle de Chaves
+# O histórico é só de inclusão; a posse atual é mantida na mesma transação (ver chaves.py).
+
+class EventoChave(SQLModel, table=True):
+    """
+    Modelo de Tabela com cada retirada e devolução de chave (histórico imutável).
+    """
+    __table_args__ = (
+        # Histórico de uma sala, do mais recente para o mais antigo
+        Index("ix_eventochave_sala_id", "sala_id", "id"),
+        # Movimentos ligados a uma reserva
+        Index("ix_eventochave_reserva", "reserva_id"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    tipo: TipoEventoChave
+    sala_id: int = Field(foreign_key="sala.id")
+    # Sem chave estrangeira: o histórico continua válido depois que a reserva é arquivada
+    reserva_id: Optional[int] = None
+    # Quem está com a chave (na retirada) ou quem a devolveu
+    usuario_id: int = Field(foreign_key="usuario.id")
+    # Administrador que registrou o movimento
+    registrado_por: int = Field(foreign_key="usuario.id")
+    momento: datetime
+    observacao: Optional[str] = None
+
+
+class PosseChave(SQLModel, table=True):
+    """
+    Modelo de Tabela com quem está com a chave de cada sala agora: uma linha por chave
+    retirada, removida na devolução. Nunca passa do número de salas.
+    """
+    # Chaves atrasadas: faixa do índice com prazo já vencido
+    __table_args__ = (Index("ix_possechave_devolver_ate", "devolver_ate"),)
+
+    sala_id: int = Field(primary_key=True, foreign_key="sala.id")
+    usuario_id: int = Field(foreign_key="usuario.id")
+    reserva_id: Optional[int] = Field(default=None, foreign_key="reserva.id")
+    # Evento de retirada que abriu a posse
+    evento_id: int = Field(foreign_key="eventochave.id")
+    retirada_em: datetime
+    # Fim da reserva: depois disso a chave está atrasada
+    devolver_ate: datetime
+
+
+class VersaoCache(SQLModel, table=True):
+    """
+    Modelo de Tabela com o número de versão de cada cache em memória.
+    Toda escrita que invalida um cache incrementa a sua versão; os demais processos
+    (workers do uvicorn) comparam a versão para saber que precisam recarregar.
+    """
+    nome: str = Field(primary_key=True)
+    versao: int = Field(default=0)
+
+
+class TarefaAgendada(SQLModel, table=True):
+    """
+    Modelo de Tabela com a trava e a última execução de cada tarefa periódica.
+    O worker que consegue a trava (travada_ate no futuro) é o único a rodar a tarefa.
+    """
+    nome: str = Field(primary_key=True)
+    dono: Optional[str] = None
+    travada_ate: Optional[datetime] = None
+    proxima_execucao: Optional[datetime] = None
+    ultima_execucao: Optional[datetime] = None
+    ultima_duracao_ms: Optional[float] = None
+    ultimas_alteradas: int = Field(default=0)
+    ultimo_erro: Optional[str] = None
+
+
+# Tabelas de Resumo (Análise de Uso)
+# Mantidas de forma incremental a cada escrita de reserva (ver analise.py).
+
+class ResumoSemanalSala(SQLModel, table=True):
+    """
+    Reservas e minutos reservados por sala, semana (segunda-feira) e status.
+    """
+    # O painel filtra por período sem sala: a chave primária começa por sala_id
+    __table_args__ = (Index("ix_resumosemanalsala_semana", "semana"),)
+
+    sala_id: int = Field(primary_key=True)
+    semana: date = Field(primary_key=True)
+    status: StatusReserva = Field(primary_key=True)
+    quantidade: int = Field(default=0)
+    minutos: int = Field(default=0)
+
+
+class ResumoHorarioSala(SQLModel, table=True):
+    """
+    Reservas por sala, hora do dia e status.
+    Cada reserva conta em todas as horas que ela ocupa (base dos horários de pico).
+    """
+    sala_id: int = Field(primary_key=True)
+    hora: int = Field(primary_key=True)
+    status: StatusReserva = Field(primary_key=True)
+    quantidade: int = Field(default=0)
+
+
+class ResumoUsuario(SQLModel, table=True):
+    """
+    Reservas e minutos reservados por usuário e status.
+    """
+    usuario_id: int = Field(primary_key=True)
+    status: StatusReserva = Field(primary_key=True)
+    quantidade: int = Field(default=0)
+    minutos: int = Field(default=0)
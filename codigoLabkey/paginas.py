@@ -0,0 +1,70 @@
+from typing import Dict, NamedTuple
+from pathlib import Path
+import gzip
+
+from fastapi import Request, Response
+from jinja2 import Environment, FileSystemBytecodeCache
+
+from cache_http import VERSAO_IMPLANTACAO, PUBLICO, COMPRESSAO_MINIMO, etag_de, nao_modificado
+import config
+
+# Páginas Pré-renderizadas e Cache de Bytecode dos Templates
+#
+# As páginas públicas (início, login, cadastro, equipe) não dependem da requisição: são
+# renderizadas uma vez na inicialização e servidas da memória, já comprimidas. Os demais
+# templates são compilados na inicialização; o código gerado fica no cache de bytecode em
+# disco, e os próximos processos (outros workers, reinícios) o carregam sem recompilar.
+
+PAGINAS_ESTATICAS = ("index.html", "login.html", "cadastro.html", "equipe.html")
+
+
+class PaginaPronta(NamedTuple):
+    corpo: bytes
+    corpo_gzip: bytes
+    etag: str
+
+
+def configurar_bytecode(env: Environment):
+    """Liga o cache de bytecode em disco (config.JINJA_CACHE_DIR; vazio desliga)."""
+    if config.JINJA_CACHE_DIR:
+        pasta = Path(config.JINJA_CACHE_DIR)
+        pasta.mkdir(parents=True, exist_ok=True)
+        env.bytecode_cache = FileSystemBytecodeCache(str(pasta))
+
+
+def precompilar(env: Environment) -> int:
+    """Carrega (compilando, se preciso) todos os templates; retorna quantos foram carregados."""
+    nomes = env.list_templates(extensions=["html"])
+    for nome in nomes:
+        env.get_template(nome)
+    return len(nomes)
+
+
+class PaginasEstaticas:
+    def __init__(self):
+        self._paginas: Dict[str, PaginaPronta] = {}
+
+    def renderizar(self, env: Environment, nome: str) -> PaginaPronta:
+        corpo = env.get_template(nome).render().encode("utf-8")
+        pagina = PaginaPronta(corpo, gzip.compress(corpo, compresslevel=9), etag_de(nome, VERSAO_IMPLANTACAO))
+        self._paginas[nome] = pagina
+        return pagina
+
+    def preparar(self, env: Environment):
+        for nome in PAGINAS_ESTATICAS:
+            self.renderizar(env, nome)
+
+    def responder(self, request: Request, env: Environment, nome: str) -> Response:
+        """A página pronta (ou 304), comprimida se o cliente aceitar gzip."""
+        pagina = self._paginas.get(nome) or self.renderizar(env, nome)
+        if resposta := nao_modificado(request, pagina.etag, PUBLICO):
+            return resposta
+        cabecalhos = {"ETag": pagina.etag, "Cache-Control": PUBLICO, "Vary": "Accept-Encoding"}
+        corpo = pagina.corpo
+        if len(corpo) >= COMPRESSAO_MINIMO and "gzip" in request.headers.get("accept-encoding", ""):
+            corpo = pagina.corpo_gzip
+            cabecalhos["Content-Encoding"] = "gzip"
+        return Response(corpo, media_type="text/html; charset=utf-8", headers=cabecalhos)
+
+
+paginas_estaticas = PaginasEstaticas()
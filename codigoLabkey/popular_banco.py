@@ -1,8 +1,8 @@
 from sqlmodel import SQLModel, Session, select
 from main import engine
-from models.models import Usuario, TipoUsuario, Sala, Reserva, StatusReserva
+from models.models import Usuario, Sala, Reserva, StatusReserva
 from datetime import date, time
-import hashlib
+from importacao import importar
 
 # ==============================
 # Criar tabelas
@@ -13,75 +13,37 @@ print("Tabelas criadas ou já existentes.")
 # ==============================
 # Popula Usuários
 # ==============================
-with Session(engine) as session:
-    usuarios = [
-        Usuario(
-            nome="Administrador Geral",
-            email="admin@sistema.com",
-            tipo=TipoUsuario.ADMINISTRADOR,
-            senha_hash=hashlib.sha256("admin123".encode()).hexdigest()
-        ),
-        Usuario(
-            nome="João Silva",
-            email="joao.silva@email.com",
-            tipo=TipoUsuario.COMUM,
-            senha_hash=hashlib.sha256("joao123".encode()).hexdigest()
-        ),
-        Usuario(
-            nome="Maria Oliveira",
-            email="maria.oliveira@email.com",
-            tipo=TipoUsuario.COMUM,
-            senha_hash=hashlib.sha256("maria123".encode()).hexdigest()
-        ),
-        Usuario(
-            nome="Pedro Almeida",
-            email="pedro.almeida@email.com",
-            tipo=TipoUsuario.COMUM,
-            senha_hash=hashlib.sha256("pedro123".encode()).hexdigest()
-        ),
-        Usuario(
-            nome="Ana Beatriz",
-            email="ana.beatriz@email.com",
-            tipo=TipoUsuario.COMUM,
-            senha_hash=hashlib.sha256("ana123".encode()).hexdigest()
-        ),
-    ]
+# Importação em lote: uma consulta por lote em vez de uma por usuário (ver importacao.py)
+usuarios = [
+    {"nome": "Administrador Geral", "email": "admin@sistema.com", "tipo": "ADMINISTRADOR", "senha": "admin123"},
+    {"nome": "João Silva", "email": "joao.silva@email.com", "tipo": "COMUM", "senha": "joao123"},
+    {"nome": "Maria Oliveira", "email": "maria.oliveira@email.com", "tipo": "COMUM", "senha": "maria123"},
+    {"nome": "Pedro Almeida", "email": "pedro.almeida@email.com", "tipo": "COMUM", "senha": "pedro123"},
+    {"nome": "Ana Beatriz", "email": "ana.beatriz@email.com", "tipo": "COMUM", "senha": "ana123"},
+]
 
-    adicionados = 0
-    for u in usuarios:
-        # Adiciona somente se o e-mail ainda não estiver no banco
-        if not session.exec(select(Usuario).where(Usuario.email == u.email)).first():
-            session.add(u)
-            adicionados += 1
-
-    session.commit()
-    print(f"{adicionados} usuário(s) adicionados ao banco.")
+# Adiciona somente os e-mails que ainda não estão no banco
+resultado = importar("usuarios", enumerate(usuarios, start=1), atualizar=False)
+print(f"{resultado.inseridos} usuário(s) adicionados ao banco.")
 
 # ==============================
 # Popula Salas
 # ==============================
-with Session(engine) as session:
-    salas = [
-        Sala(nome="Sala Alfa", descricao="Sala pequena", capacidade=8, localizacao="Bloco A", recursos="TV, Ar"),
-        Sala(nome="Sala Beta", descricao="Sala média", capacidade=15, localizacao="Bloco A", recursos="Projetor"),
-        Sala(nome="Sala Gama", descricao="Sala para reuniões", capacidade=12, localizacao="Bloco B", recursos="Mesa ampla"),
-        Sala(nome="Sala Delta", descricao="Espaço multiuso", capacidade=25, localizacao="Bloco B", recursos="Som e TV"),
-        Sala(nome="Sala Sigma", descricao="Sala compacta", capacidade=6, localizacao="Bloco C", recursos="Ar"),
-        Sala(nome="Sala Ômega", descricao="Sala grande", capacidade=30, localizacao="Bloco C", recursos="Projetor, Ar"),
-        Sala(nome="Sala Polo", descricao="Ambiente para estudos", capacidade=20, localizacao="Bloco D", recursos="Computadores"),
-        Sala(nome="Sala Atlas", descricao="Sala executiva", capacidade=10, localizacao="Bloco D", recursos="TV"),
-        Sala(nome="Sala Orion", descricao="Sala de apresentações", capacidade=40, localizacao="Bloco E", recursos="Som, Projetor"),
-        Sala(nome="Sala Kronos", descricao="Sala premium", capacidade=18, localizacao="Bloco E", recursos="Ar, TV, Projetor"),
-    ]
+salas = [
+    {"nome": "Sala Alfa", "descricao": "Sala pequena", "capacidade": 8, "localizacao": "Bloco A", "recursos": "TV, Ar"},
+    {"nome": "Sala Beta", "descricao": "Sala média", "capacidade": 15, "localizacao": "Bloco A", "recursos": "Projetor"},
+    {"nome": "Sala Gama", "descricao": "Sala para reuniões", "capacidade": 12, "localizacao": "Bloco B", "recursos": "Mesa ampla"},
+    {"nome": "Sala Delta", "descricao": "Espaço multiuso", "capacidade": 25, "localizacao": "Bloco B", "recursos": "Som e TV"},
+    {"nome": "Sala Sigma", "descricao": "Sala compacta", "capacidade": 6, "localizacao": "Bloco C", "recursos": "Ar"},
+    {"nome": "Sala Ômega", "descricao": "Sala grande", "capacidade": 30, "localizacao": "Bloco C", "recursos": "Projetor, Ar"},
+    {"nome": "Sala Polo", "descricao": "Ambiente para estudos", "capacidade": 20, "localizacao": "Bloco D", "recursos": "Computadores"},
+    {"nome": "Sala Atlas", "descricao": "Sala executiva", "capacidade": 10, "localizacao": "Bloco D", "recursos": "TV"},
+    {"nome": "Sala Orion", "descricao": "Sala de apresentações", "capacidade": 40, "localizacao": "Bloco E", "recursos": "Som, Projetor"},
+    {"nome": "Sala Kronos", "descricao": "Sala premium", "capacidade": 18, "localizacao": "Bloco E", "recursos": "Ar, TV, Projetor"},
+]
 
-    adicionadas = 0
-    for s in salas:
-        if not session.exec(select(Sala).where(Sala.nome == s.nome)).first():
-            session.add(s)
-            adicionadas += 1
-
-    session.commit()
-    print(f"{adicionadas} sala(s) adicionada(s) ao banco.")
+resultado = importar("salas", enumerate(salas, start=1), atualizar=False)
+print(f"{resultado.inseridos} sala(s) adicionada(s) ao banco.")
 
 # ==============================
 # Popula Reservas
@@ -0,0 +1,66 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+import asyncio
+import base64
+import hashlib
+import hmac
+
+import bcrypt
+
+import config
+
+# Pool limitado de threads para os hashes: o bcrypt libera o GIL, então os hashes rodam
+# em paralelo sem ocupar o event loop nem o threadpool das rotas.
+_pool = ThreadPoolExecutor(max_workers=config.HASH_WORKERS, thread_name_prefix="labkey-hash")
+
+
+def _pre_hash(senha: str) -> bytes:
+    """
+    Reduz a senha a 44 bytes (SHA-256 em base64) antes do bcrypt, que só considera
+    os primeiros 72 bytes da entrada.
+    """
+    return base64.b64encode(hashlib.sha256(senha.encode()).digest())
+
+
+def _hash_legado(senha_hash: str) -> bool:
+    """Indica se o hash salvo está no formato antigo (SHA-256 hexadecimal, sem salt)."""
+    return not senha_hash.startswith("$2")
+
+
+# Funções Síncronas
+
+def gerar_hash_senha(senha: str, rounds: Optional[int] = None) -> str:
+    """Gera o hash bcrypt (com salt) da senha usando o custo configurado."""
+    salt = bcrypt.gensalt(rounds=rounds or config.BCRYPT_ROUNDS)
+    return bcrypt.hashpw(_pre_hash(senha), salt).decode()
+
+
+def verificar_senha(senha: str, senha_hash: str) -> Tuple[bool, Optional[str]]:
+    """
+    Confere a senha com o hash salvo.
+    Retorna (senha_correta, novo_hash). O novo hash vem preenchido quando o salvo
+    precisa ser atualizado: formato SHA-256 legado ou custo bcrypt diferente do configurado.
+    """
+    if _hash_legado(senha_hash):
+        correta = hmac.compare_digest(hashlib.sha256(senha.encode()).hexdigest(), senha_hash)
+        return correta, (gerar_hash_senha(senha) if correta else None)
+
+    correta = bcrypt.checkpw(_pre_hash(senha), senha_hash.encode())
+    # O custo fica gravado no próprio hash: "$2b$<rounds>$..."
+    rounds_salvo = int(senha_hash.split("$")[2])
+    precisa_atualizar = correta and rounds_salvo != config.BCRYPT_ROUNDS
+    return correta, (gerar_hash_senha(senha) if precisa_atualizar else None)
+
+
+# Funções Assíncronas (usadas pelas rotas)
+
+async def gerar_hash_senha_async(senha: str) -> str:
+    """Gera o hash no pool dedicado, sem bloquear o event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool, gerar_hash_senha, senha)
+
+
+async def verificar_senha_async(senha: str, senha_hash: str) -> Tuple[bool, Optional[str]]:
+    """Confere a senha no pool dedicado, sem bloquear o event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool, verificar_senha, senha, senha_hash)
@@ -0,0 +1,555 @@
+from typing import Optional, List
+from sqlmodel import Session, select, insert, update
+from fastapi import HTTPException, status
+from datetime import date, time, timedelta
+
+# Regras de negócio e acesso ao banco das rotas de usuários, salas e reservas.
+# Todas as funções recebem uma Session síncrona como primeiro argumento, para que
+# possam ser chamadas via database.executar tanto no modo "sync" quanto no "async".
+
+from models.models import (
+    Usuario, UsuarioAdminUpdate, Sala, SalaBase, Reserva, ReservaInput, ReservaRecorrenteInput, ReservaUpdate,
+    StatusReserva, StatusLoteInput, FiltroReservas
+)
+from consultas import paginar_reservas, aplicar_filtros
+from conflitos import buscar_conflito, buscar_conflitos_em_lote, buscar_ativas_por_sala_e_dia, STATUS_ATIVOS
+from disponibilidade import grade_ocupacao, filtrar_salas
+from database import iniciar_escrita
+from caches import catalogo_salas, cache_autorizacao, incrementar_versao_cache, VERSAO_RESERVAS
+from analise import FotoReserva, foto, registrar_alteracoes, reconstruir_resumos
+from eventos import publicar_reserva
+from cache_http import etag_versao
+
+
+# Funções Auxiliares
+
+def buscar_usuario_por_email(session: Session, email: str) -> Optional[Usuario]:
+    """Busca o usuário pelo e-mail (usado no cadastro e no login)."""
+    return session.exec(select(Usuario).where(Usuario.email == email)).first()
+
+
+def buscar_pagina_reservas(session: Session, filtros: FiltroReservas, cursor: Optional[str], limite: int):
+    """
+    Executa a paginação das reservas convertendo cursor inválido em erro 400.
+    """
+    try:
+        return paginar_reservas(session, filtros, cursor=cursor, limite=limite)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+def verificar_conflito(session: Session, sala_id: int, data, hora_inicio, hora_fim, ignorar_id: Optional[int] = None):
+    """
+    Valida o intervalo de horário e levanta HTTPException 409 se a sala já estiver
+    ocupada (reserva PENDENTE ou APROVADA) no mesmo dia e horário.
+    """
+    if hora_fim <= hora_inicio:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="O horário de término deve ser posterior ao de início.")
+
+    conflito = buscar_conflito(session, sala_id, data, hora_inicio, hora_fim, ignorar_id=ignorar_id)
+    if conflito:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=(
+                f"Conflito de horário: a sala já possui reserva {conflito.status.value.upper()} "
+                f"das {conflito.hora_inicio:%H:%M} às {conflito.hora_fim:%H:%M} neste dia (reserva {conflito.id})."
+            )
+        )
+
+
+# Concorrência Otimista
+#
+# Salas e reservas são alteradas com UPDATE ... WHERE id = ? AND versao = ?, que também
+# incrementa a versão. Nenhuma trava é mantida entre a leitura feita pelo cliente e a
+# gravação: se o cliente informou a versão que leu (If-Match) e ela não é mais a atual,
+# ou se outra transação alterou o registro entre a leitura e o UPDATE desta (possível no
+# PostgreSQL; no SQLite a escrita já é exclusiva desde iniciar_escrita), a resposta é 409
+# com o estado atual, e o cliente decide se refaz a alteração sobre ele.
+
+def conflito_de_versao(registro, nome: str) -> HTTPException:
+    """409 com o estado atual do registro e a ETag da versão atual."""
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={
+            "mensagem": f"{nome} foi alterada por outra requisição (versão atual: {registro.versao}). Confira os dados e tente novamente.",
+            "atual": registro.model_dump(mode="json"),
+        },
+        headers={"ETag": etag_versao(registro.versao)},
+    )
+
+
+def verificar_versao(registro, versao_esperada: Optional[int], nome: str):
+    """Recusa a alteração se o cliente leu uma versão diferente da atual (None = sem If-Match)."""
+    if versao_esperada is not None and registro.versao != versao_esperada:
+        raise conflito_de_versao(registro, nome)
+
+
+def gravar_versionado(session: Session, registro, valores: dict, nome: str):
+    """
+    Grava 'valores' no registro e incrementa a versão, desde que ele ainda esteja na versão
+    lida. Se nenhuma linha mudou, desfaz a transação e levanta 409 com o estado atual.
+    O registro é recarregado ainda na transação e sai da sessão: o commit não o expira, e a
+    resposta (e a ETag) mostra a versão gravada aqui, mesmo que outra requisição altere o
+    registro logo depois do commit.
+    """
+    modelo = type(registro)
+    resultado = session.exec(
+        update(modelo)
+        .where(modelo.id == registro.id, modelo.versao == registro.versao)
+        .values(**valores, versao=modelo.versao + 1),
+        execution_options={"synchronize_session": False},
+    )
+    if resultado.rowcount == 0:
+        session.rollback()
+        atual = session.get(modelo, registro.id)
+        if atual is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{nome} foi excluída.")
+        raise conflito_de_versao(atual, nome)
+    session.refresh(registro)
+    session.expunge(registro)
+
+
+# Usuários
+
+def atualizar_hash_senha(session: Session, usuario: Usuario, novo_hash: str) -> Usuario:
+    """
+    Grava o novo hash da senha (formato legado ou custo desatualizado) após o login.
+    A alteração só é feita depois de iniciar_escrita: com o objeto já modificado, a
+    leitura do login continuaria aberta e o UPDATE tentaria promovê-la a escrita.
+    """
+    iniciar_escrita(session)
+    usuario.senha_hash = novo_hash
+    session.add(usuario)
+    session.commit()
+    session.refresh(usuario)
+    return usuario
+
+
+def atualizar_usuario(session: Session, usuario_id: int, dados: UsuarioAdminUpdate) -> Usuario:
+    """Altera o tipo ou a situação (ativo) de um usuário (ação do Administrador)."""
+    iniciar_escrita(session)
+    usuario = session.get(Usuario, usuario_id)
+    if not usuario:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuário não encontrado.")
+
+    for campo, valor in dados.model_dump(exclude_unset=True, exclude_none=True).items():
+        setattr(usuario, campo, valor)
+
+    session.add(usuario)
+    # Os caches de autorização dos outros processos percebem a alteração pela versão
+    incrementar_versao_cache(session, cache_autorizacao.NOME)
+    session.commit()
+    session.refresh(usuario)
+    cache_autorizacao.invalidar(usuario.id)
+
+    return usuario
+
+
+# Salas
+
+def criar_sala(session: Session, sala_input: SalaBase) -> Sala:
+    """Cadastra uma nova sala, recusando nomes repetidos."""
+    iniciar_escrita(session)
+    # Verifica se a sala já existe pelo nome
+    existente = session.exec(select(Sala).where(Sala.nome == sala_input.nome)).first()
+    if existente:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Sala com o nome '{sala_input.nome}' já cadastrada.")
+
+    # Cria e salva a nova sala
+    sala = Sala.model_validate(sala_input)
+
+    session.add(sala)
+    # A versão do catálogo muda na mesma transação; os outros processos recarregam a lista
+    incrementar_versao_cache(session, catalogo_salas.NOME)
+    session.commit()
+    session.refresh(sala)
+    catalogo_salas.invalidar()
+
+    return sala
+
+
+def buscar_sala(session: Session, sala_id: int) -> Sala:
+    """Lê a sala direto do banco (não do catálogo em memória), com a versão atual."""
+    sala = session.get(Sala, sala_id)
+    if not sala:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sala não encontrada.")
+    return sala
+
+
+def atualizar_sala(session: Session, sala_id: int, sala_input: SalaBase, versao_esperada: Optional[int] = None) -> Sala:
+    """Atualiza os campos informados de uma sala existente (na versão 'versao_esperada', se informada)."""
+    iniciar_escrita(session)
+    # Busca a sala pelo ID
+    sala = session.get(Sala, sala_id)
+    if not sala:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sala não encontrada.")
+    verificar_versao(sala, versao_esperada, "A sala")
+
+    # Atualiza os campos fornecidos
+    gravar_versionado(session, sala, sala_input.model_dump(exclude_unset=True), "A sala")
+    # A versão do catálogo muda na mesma transação; os outros processos recarregam a lista
+    incrementar_versao_cache(session, catalogo_salas.NOME)
+    session.commit()
+    catalogo_salas.invalidar()
+
+    return sala
+
+
+def excluir_sala(session: Session, sala_id: int):
+    """Exclui uma sala que não possua reservas ativas."""
+    iniciar_escrita(session)
+    # Busca a sala
+    sala = session.get(Sala, sala_id)
+    if not sala:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sala não encontrada.")
+
+    # Verifica se existem reservas ativas (PENDENTES ou APROVADAS)
+    reservas_ativas = session.exec(
+        select(Reserva)
+        .where(Reserva.sala_id == sala_id)
+        .where(Reserva.status.in_(STATUS_ATIVOS))
+    ).first()
+
+    if reservas_ativas:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Não é possível excluir a sala: existem reservas PENDENTES ou APROVADAS vinculadas."
+        )
+
+    # Exclui a sala
+    session.delete(sala)
+    incrementar_versao_cache(session, catalogo_salas.NOME)
+    session.commit()
+    catalogo_salas.invalidar()
+
+
+def buscar_salas_livres(
+    session: Session,
+    dias: List[date],
+    hora_inicio: time,
+    hora_fim: time,
+    capacidade: Optional[int] = None,
+    recursos: Optional[str] = None,
+):
+    """Retorna, para cada dia, as salas compatíveis que estão livres no intervalo."""
+    salas = filtrar_salas(catalogo_salas.listar(session), capacidade=capacidade, recursos=recursos)
+    return grade_ocupacao.salas_livres(session, salas, dias, hora_inicio, hora_fim)
+
+
+# Reservas
+
+def criar_reserva(session: Session, usuario_id: int, dados: ReservaInput) -> Reserva:
+    """Cria uma reserva PENDENTE para o usuário, se a sala existir e o horário estiver livre."""
+    # Reserva o lock de escrita já no início: a verificação de conflito e o INSERT ficam atômicos
+    iniciar_escrita(session)
+    # Verifica se a sala existe
+    sala = session.get(Sala, dados.sala_id)
+    if not sala:
+        raise HTTPException(status_code=404, detail="Sala não encontrada.")
+
+    # Impede a sobreposição com reservas ativas da mesma sala
+    verificar_conflito(session, dados.sala_id, dados.data, dados.hora_inicio, dados.hora_fim)
+
+    # Cria a reserva com status PENDENTE
+    reserva = Reserva(
+        data=dados.data,
+        hora_inicio=dados.hora_inicio,
+        hora_fim=dados.hora_fim,
+        sala_id=dados.sala_id,
+        usuario_id=usuario_id,
+        status=StatusReserva.PENDENTE
+    )
+
+    session.add(reserva)
+    # Resumos de uso atualizados na mesma transação
+    registrar_alteracoes(session, [(None, foto(reserva))])
+    versao = incrementar_versao_cache(session, VERSAO_RESERVAS)
+    session.commit()
+    session.refresh(reserva)
+    grade_ocupacao.registrar(reserva, versao)
+    publicar_reserva(reserva, "criada")
+
+    return reserva
+
+
+# Maior número de ocorrências aceito numa única solicitação recorrente
+MAX_OCORRENCIAS = 200
+
+
+def expandir_recorrencia(data_inicio: date, data_fim: date, dias_semana: List[int]) -> List[date]:
+    """Datas entre data_inicio e data_fim (inclusive) que caem nos dias da semana pedidos, em ordem."""
+    datas = []
+    for dia_semana in set(dias_semana):
+        atual = data_inicio + timedelta(days=(dia_semana - data_inicio.weekday()) % 7)
+        while atual <= data_fim:
+            datas.append(atual)
+            atual += timedelta(weeks=1)
+    return sorted(datas)
+
+
+def _descrever_conflito(reserva: Reserva) -> dict:
+    return {
+        "reserva_id": reserva.id,
+        "status": reserva.status.value,
+        "hora_inicio": f"{reserva.hora_inicio:%H:%M}",
+        "hora_fim": f"{reserva.hora_fim:%H:%M}",
+    }
+
+
+def criar_reservas_recorrentes(session: Session, usuario_id: int, dados: ReservaRecorrenteInput) -> dict:
+    """
+    Expande a série semanal e cria todas as ocorrências como PENDENTE numa única transação.
+    Os conflitos de todas as datas são verificados numa só consulta e a inserção é feita em
+    lote (executemany). Sem 'parcial', qualquer conflito cancela a série inteira (409).
+    Retorna o resultado de cada ocorrência.
+    """
+    if dados.hora_fim <= dados.hora_inicio:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="O horário de término deve ser posterior ao de início.")
+    if dados.data_fim < dados.data_inicio:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="A data final deve ser igual ou posterior à inicial.")
+    if not dados.dias_semana or any(d not in range(7) for d in dados.dias_semana):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Informe os dias da semana de 0 (segunda) a 6 (domingo).")
+
+    datas = expandir_recorrencia(dados.data_inicio, dados.data_fim, dados.dias_semana)
+    if not datas:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nenhuma data do período cai nos dias da semana informados.")
+    if len(datas) > MAX_OCORRENCIAS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"A série gera {len(datas)} ocorrências (máximo {MAX_OCORRENCIAS}).")
+
+    iniciar_escrita(session)
+    if not session.get(Sala, dados.sala_id):
+        raise HTTPException(status_code=404, detail="Sala não encontrada.")
+
+    conflitos = buscar_conflitos_em_lote(session, dados.sala_id, datas, dados.hora_inicio, dados.hora_fim)
+    ocorrencias = {d: {"data": d.isoformat(), "resultado": "conflito", "conflito": _descrever_conflito(r)} for d, r in conflitos.items()}
+
+    if conflitos and not dados.parcial:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "mensagem": f"{len(conflitos)} de {len(datas)} ocorrências conflitam com reservas existentes; nenhuma foi criada.",
+                "ocorrencias": [ocorrencias[d] for d in datas if d in ocorrencias],
+            }
+        )
+
+    livres = [d for d in datas if d not in conflitos]
+    criadas = []
+    if livres:
+        # INSERT em lote, com os IDs gerados devolvidos na ordem dos parâmetros
+        linhas = [
+            {
+                "data": d,
+                "hora_inicio": dados.hora_inicio,
+                "hora_fim": dados.hora_fim,
+                "sala_id": dados.sala_id,
+                "usuario_id": usuario_id,
+                "status": StatusReserva.PENDENTE,
+            }
+            for d in livres
+        ]
+        ids = session.exec(
+            insert(Reserva).returning(Reserva.id, sort_by_parameter_order=True), params=linhas
+        ).scalars().all()
+        registrar_alteracoes(session, [(None, FotoReserva(**{c: linha[c] for c in FotoReserva._fields})) for linha in linhas])
+        versao = incrementar_versao_cache(session, VERSAO_RESERVAS)
+        session.commit()
+        criadas = [Reserva(id=reserva_id, **linha) for reserva_id, linha in zip(ids, linhas)]
+
+    for reserva in criadas:
+        grade_ocupacao.registrar(reserva, versao)
+        ocorrencias[reserva.data] = {"data": reserva.data.isoformat(), "resultado": "criada", "reserva_id": reserva.id}
+
+    return {
+        "criadas": len(criadas),
+        "conflitos": len(conflitos),
+        "ocorrencias": [ocorrencias[d] for d in datas],
+    }
+
+
+def editar_reserva(session: Session, usuario_id: int, reserva_id: int, dados: ReservaUpdate,
+                   versao_esperada: Optional[int] = None) -> Reserva:
+    """Edita uma reserva do próprio usuário e a devolve para PENDENTE."""
+    iniciar_escrita(session)
+    # Busca a reserva
+    reserva = session.get(Reserva, reserva_id)
+    if not reserva:
+        raise HTTPException(status_code=404, detail="Reserva não encontrada.")
+
+    # Verifica se o usuário é o dono da reserva
+    if reserva.usuario_id != usuario_id:
+        raise HTTPException(status_code=403, detail="Você não tem permissão para editar esta reserva.")
+    verificar_versao(reserva, versao_esperada, "A reserva")
+
+    # Novos valores dos campos, com o status redefinido para PENDENTE
+    valores = {**dados.model_dump(exclude_unset=True), "status": StatusReserva.PENDENTE}
+    antes = foto(reserva)
+    depois = antes._replace(**{c: v for c, v in valores.items() if c in FotoReserva._fields})
+
+    # Verifica o novo horário contra as demais reservas ativas da sala
+    verificar_conflito(session, depois.sala_id, depois.data, depois.hora_inicio, depois.hora_fim, ignorar_id=reserva.id)
+
+    gravar_versionado(session, reserva, valores, "A reserva")
+    registrar_alteracoes(session, [(antes, depois)])
+    versao = incrementar_versao_cache(session, VERSAO_RESERVAS)
+    session.commit()
+    grade_ocupacao.registrar(reserva, versao)
+    publicar_reserva(reserva, "editada")
+
+    return reserva
+
+
+def cancelar_reserva(session: Session, usuario_id: int, reserva_id: int, versao_esperada: Optional[int] = None) -> Reserva:
+    """Cancela uma reserva do próprio usuário."""
+    iniciar_escrita(session)
+    # Busca a reserva
+    reserva = session.get(Reserva, reserva_id)
+    if not reserva:
+        raise HTTPException(status_code=404, detail="Reserva não encontrada.")
+
+    # Verifica se é o dono e se já não está cancelada
+    if reserva.usuario_id != usuario_id:
+        raise HTTPException(status_code=403, detail="Você não pode cancelar esta reserva.")
+
+    if reserva.status == StatusReserva.CANCELADA:
+        raise HTTPException(status_code=400, detail="Reserva já está cancelada.")
+    verificar_versao(reserva, versao_esperada, "A reserva")
+
+    # Altera o status para CANCELADA
+    antes = foto(reserva)
+    gravar_versionado(session, reserva, {"status": StatusReserva.CANCELADA}, "A reserva")
+    registrar_alteracoes(session, [(antes, antes._replace(status=StatusReserva.CANCELADA))])
+    versao = incrementar_versao_cache(session, VERSAO_RESERVAS)
+    session.commit()
+    grade_ocupacao.registrar(reserva, versao)
+    publicar_reserva(reserva, "cancelada")
+
+    return reserva
+
+
+# Status atribuídos só pelas tarefas periódicas (agendador.py), a partir da data da reserva
+STATUS_AUTOMATICOS = (StatusReserva.EXPIRADA, StatusReserva.CONCLUIDA)
+
+
+def verificar_status_do_admin(novo_status: StatusReserva):
+    """Recusa (400) os status que o Administrador não pode escolher."""
+    if novo_status in STATUS_AUTOMATICOS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"O status '{novo_status.value}' é atribuído automaticamente e não pode ser escolhido.",
+        )
+
+
+def mudar_status_reserva(session: Session, reserva_id: int, novo_status: StatusReserva,
+                         versao_esperada: Optional[int] = None) -> Reserva:
+    """Altera o status de uma reserva (ação do Administrador)."""
+    verificar_status_do_admin(novo_status)
+    iniciar_escrita(session)
+    # Busca a reserva
+    reserva = session.get(Reserva, reserva_id)
+    if not reserva:
+        raise HTTPException(status_code=404, detail="Reserva não encontrada.")
+    verificar_versao(reserva, versao_esperada, "A reserva")
+
+    # Reativar ou aprovar uma reserva exige que o horário continue livre
+    if novo_status in STATUS_ATIVOS:
+        verificar_conflito(session, reserva.sala_id, reserva.data, reserva.hora_inicio, reserva.hora_fim, ignorar_id=reserva.id)
+
+    # Atualiza e salva o status
+    antes = foto(reserva)
+    gravar_versionado(session, reserva, {"status": novo_status}, "A reserva")
+    registrar_alteracoes(session, [(antes, antes._replace(status=novo_status))])
+    versao = incrementar_versao_cache(session, VERSAO_RESERVAS)
+    session.commit()
+    grade_ocupacao.registrar(reserva, versao)
+    publicar_reserva(reserva, "status")
+
+    return reserva
+
+
+# Maior número de reservas alcançadas por uma única mudança de status em lote
+MAX_LOTE_STATUS = 1000
+
+
+def mudar_status_em_lote(session: Session, dados: StatusLoteInput) -> dict:
+    """
+    Altera o status de várias reservas (ação do Administrador) com um único UPDATE.
+    Reservas que voltariam a ocupar a sala (REJEITADA/CANCELADA -> PENDENTE/APROVADA) só
+    mudam se o horário estiver livre, inclusive em relação às demais reservas do lote.
+    Retorna quais IDs mudaram, quais já estavam no status, quais conflitaram e quais não existem.
+    """
+    if bool(dados.ids) == (dados.filtros is not None):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Informe a lista de IDs ou um filtro (apenas um deles).")
+    if dados.filtros is not None and not dados.filtros.model_dump(exclude_none=True):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="O filtro precisa de ao menos um critério.")
+    if dados.ids and len(set(dados.ids)) > MAX_LOTE_STATUS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Máximo de {MAX_LOTE_STATUS} reservas por lote.")
+
+    novo_status = dados.status
+    verificar_status_do_admin(novo_status)
+    iniciar_escrita(session)
+
+    consulta = select(
+        Reserva.id, Reserva.sala_id, Reserva.usuario_id, Reserva.data, Reserva.hora_inicio, Reserva.hora_fim, Reserva.status
+    )
+    if dados.ids:
+        consulta = consulta.where(Reserva.id.in_(set(dados.ids)))
+    else:
+        consulta = aplicar_filtros(consulta, dados.filtros)
+    linhas = session.exec(consulta.order_by(Reserva.id).limit(MAX_LOTE_STATUS + 1)).all()
+    if len(linhas) > MAX_LOTE_STATUS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"O filtro alcança mais de {MAX_LOTE_STATUS} reservas; refine-o.")
+
+    inalteradas = [l.id for l in linhas if l.status == novo_status]
+    candidatas = [l for l in linhas if l.status != novo_status]
+
+    # Só quem estava inativa pode criar conflito; PENDENTE <-> APROVADA já ocupava a sala
+    conflitos = []
+    if novo_status in STATUS_ATIVOS:
+        reativadas = [l for l in candidatas if l.status not in STATUS_ATIVOS]
+        ocupacao = buscar_ativas_por_sala_e_dia(session, ((l.sala_id, l.data) for l in reativadas))
+        for linha in reativadas:
+            intervalos = ocupacao[(linha.sala_id, linha.data)]
+            conflito = next((i for i in intervalos if i[0] < linha.hora_fim and i[1] > linha.hora_inicio), None)
+            if conflito:
+                conflitos.append({"reserva_id": linha.id, "conflito_com": conflito[2]})
+            else:
+                # As próximas do lote passam a concorrer com esta
+                intervalos.append((linha.hora_inicio, linha.hora_fim, linha.id))
+        com_conflito = {c["reserva_id"] for c in conflitos}
+        candidatas = [l for l in candidatas if l.id not in com_conflito]
+
+    alteradas = [l.id for l in candidatas]
+    if alteradas:
+        session.exec(
+            update(Reserva).where(Reserva.id.in_(alteradas)).values(status=novo_status, versao=Reserva.versao + 1),
+            execution_options={"synchronize_session": False},
+        )
+        registrar_alteracoes(session, [(foto(l), foto(l)._replace(status=novo_status)) for l in candidatas])
+        versao = incrementar_versao_cache(session, VERSAO_RESERVAS)
+    session.commit()
+
+    for linha in candidatas:
+        reserva = Reserva(
+            id=linha.id, sala_id=linha.sala_id, usuario_id=linha.usuario_id, data=linha.data,
+            hora_inicio=linha.hora_inicio, hora_fim=linha.hora_fim, status=novo_status,
+        )
+        grade_ocupacao.registrar(reserva, versao)
+        publicar_reserva(reserva, "status")
+
+    encontradas = {l.id for l in linhas}
+    return {
+        "status": novo_status.value,
+        "alteradas": alteradas,
+        "inalteradas": inalteradas,
+        "conflitos": conflitos,
+        "nao_encontradas": sorted(set(dados.ids or []) - encontradas),
+    }
+
+
+# Análise de Uso
+
+def reconstruir_resumos_de_uso(session: Session):
+    """Recalcula as tabelas de resumo a partir de todas as reservas (ação do Administrador)."""
+    iniciar_escrita(session)
+    reconstruir_resumos(session)
+    session.commit()
@@ -0,0 +1,70 @@
+"""
+Configuração comum dos testes: o banco é um SQLite temporário, definido antes de importar
+a aplicação (os engines são criados na importação de database.py), e o bcrypt usa o custo
+mínimo para os logins não dominarem o tempo dos testes. O agendador e os limites de taxa
+ficam desligados: os testes acionam as rotinas diretamente e fazem vários logins seguidos.
+
+Uso (a partir de codigoLabkey/):
+    python -m pytest -q tests
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+PASTA_BANCO = Path(tempfile.mkdtemp(prefix="labkey-testes-"))
+os.environ["LABKEY_DATABASE_URL"] = f"sqlite:///{PASTA_BANCO / 'testes.db'}"
+os.environ.setdefault("LABKEY_BCRYPT_ROUNDS", "4")
+os.environ.setdefault("LABKEY_AGENDADOR_ATIVO", "0")
+os.environ.setdefault("LABKEY_LIMITES_ATIVOS", "0")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlmodel import SQLModel, Session  # noqa: E402
+
+import database  # noqa: E402
+from caches import catalogo_salas, cache_autorizacao  # noqa: E402
+from disponibilidade import grade_ocupacao  # noqa: E402
+from models.models import Usuario, TipoUsuario  # noqa: E402
+from senhas import gerar_hash_senha  # noqa: E402
+
+SENHA = "segredo"
+
+
+@pytest.fixture
+def banco():
+    """Engine síncrono com as tabelas recriadas, vazias, para cada teste."""
+    database.engine.dispose()
+    SQLModel.metadata.drop_all(database.engine)
+    database.create_db()
+    # Os ids recomeçam do 1: nada do teste anterior pode sobrar nos caches do processo
+    catalogo_salas.invalidar()
+    cache_autorizacao.invalidar()
+    grade_ocupacao.invalidar()
+    yield database.engine
+
+
+def criar_usuario(email: str, tipo: TipoUsuario = TipoUsuario.COMUM) -> int:
+    """Cria um usuário com a senha SENHA e devolve o id."""
+    with Session(database.engine) as session:
+        usuario = Usuario(nome=email.split("@")[0], email=email, tipo=tipo, senha_hash=gerar_hash_senha(SENHA))
+        session.add(usuario)
+        session.commit()
+        return usuario.id
+
+
+def entrar(cliente: TestClient, email: str):
+    resposta = cliente.post("/api/v1/login", json={"email": email, "senha": SENHA})
+    assert resposta.status_code == 200, resposta.text
+
+
+@pytest.fixture
+def cliente_admin(banco):
+    """TestClient (com o ciclo de vida do app) autenticado como administrador."""
+    import main
+
+    criar_usuario("admin@teste.com", TipoUsuario.ADMINISTRADOR)
+    with TestClient(main.app) as cliente:
+        entrar(cliente, "admin@teste.com")
+        yield cliente
@@ -0,0 +1,38 @@
+from datetime import date, time
+
+from sqlmodel import Session
+
+from analise import painel, reconstruir_resumos
+from models.models import Reserva, Sala, StatusReserva
+from tests.conftest import criar_usuario
+
+
+def test_media_semanal_considera_todas_as_semanas_do_periodo(banco):
+    """Duas semanas com reservas num período de quatro: a média divide as horas por quatro."""
+    usuario_id = criar_usuario("usuario@teste.com")
+    with Session(banco) as session:
+        sala = Sala(nome="Sala 1", capacidade=10)
+        session.add(sala)
+        session.commit()
+        for dia in (date(2030, 1, 7), date(2030, 1, 15)):
+            session.add(Reserva(data=dia, hora_inicio=time(8), hora_fim=time(10), status=StatusReserva.APROVADA,
+                                usuario_id=usuario_id, sala_id=sala.id))
+        session.commit()
+    with banco.begin() as conn:
+        reconstruir_resumos(conn)
+
+    with Session(banco) as session:
+        resultado = painel(session, data_inicio=date(2030, 1, 7), data_fim=date(2030, 2, 3))
+
+    assert resultado["periodo"]["semanas"] == 4
+    [sala] = resultado["salas"]
+    assert sala["horas_aprovadas"] == 4.0
+    assert len(sala["semanas"]) == 2
+    assert sala["media_horas_aprovadas_por_semana"] == 1.0
+
+
+def test_periodo_invertido_e_rejeitado(cliente_admin):
+    """Início depois do fim é erro do cliente (400); um período de um dia só é válido."""
+    resposta = cliente_admin.get("/api/v1/admin/analise", params={"data_inicio": "2030-02-03", "data_fim": "2030-01-07"})
+    assert resposta.status_code == 400
+    assert cliente_admin.get("/api/v1/admin/analise", params={"data_inicio": "2030-01-07", "data_fim": "2030-01-07"}).status_code == 200
@@ -0,0 +1,86 @@
+from datetime import date, datetime, time
+
+from sqlmodel import Session, select
+
+from arquivamento import arquivar_lote
+from tests.conftest import criar_usuario
+from migracoes import MIGRACOES
+from models.models import EventoChave, PosseChave, Reserva, ReservaArquivada, Sala, StatusReserva, TipoEventoChave
+
+AGORA = datetime(2030, 1, 1, 12, 0)
+
+
+def nova_reserva(session: Session, usuario_id: int, sala_id: int) -> Reserva:
+    reserva = Reserva(data=date(2020, 1, 6), hora_inicio=time(8), hora_fim=time(9),
+                      status=StatusReserva.CONCLUIDA, usuario_id=usuario_id, sala_id=sala_id)
+    session.add(reserva)
+    session.commit()
+    return reserva
+
+
+def test_id_arquivado_nao_e_reaproveitado(banco):
+    """Com a tabela de reservas vazia após o arquivamento, a próxima reserva não pode voltar ao ID 1."""
+    usuario_id = criar_usuario("usuario@teste.com")
+    with Session(banco) as session:
+        sala = Sala(nome="Sala 1", capacidade=10)
+        session.add(sala)
+        session.commit()
+
+        assert nova_reserva(session, usuario_id, sala.id).id == 1
+        assert arquivar_lote(session, AGORA, 100, horizonte_dias=30) == 1
+
+        assert nova_reserva(session, usuario_id, sala.id).id == 2
+        assert arquivar_lote(session, AGORA, 100, horizonte_dias=30) == 1
+        assert session.exec(select(ReservaArquivada.id).order_by(ReservaArquivada.id)).all() == [1, 2]
+
+
+def test_migracao_ativa_autoincremento_em_banco_existente(banco):
+    """A migração recria a tabela antiga (sem AUTOINCREMENT) e pula os IDs já arquivados."""
+    usuario_id = criar_usuario("usuario@teste.com")
+    with banco.begin() as conn:
+        sql = conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE name = 'reserva'").scalar()
+        conn.exec_driver_sql("DROP TABLE reserva")
+        conn.exec_driver_sql(sql.replace(" AUTOINCREMENT", ""))
+        conn.exec_driver_sql("INSERT INTO sala (id, nome, capacidade, versao) VALUES (1, 'Sala 1', 10, 1)")
+        conn.exec_driver_sql(
+            "INSERT INTO reserva (id, data, hora_inicio, hora_fim, status, usuario_id, sala_id, versao) "
+            f"VALUES (3, '2030-01-07', '08:00:00', '09:00:00', 'PENDENTE', {usuario_id}, 1, 1)")
+        conn.exec_driver_sql(
+            "INSERT INTO reservaarquivada (id, data, hora_inicio, hora_fim, status, usuario_id, sala_id, versao, arquivada_em) "
+            f"VALUES (5, '2020-01-06', '08:00:00', '09:00:00', 'CONCLUIDA', {usuario_id}, 1, 1, '2029-01-01 00:00:00')")
+
+    migrar = next(funcao for versao, _, funcao in MIGRACOES if versao == 7)
+    with banco.begin() as conn:
+        migrar(conn)
+        assert "AUTOINCREMENT" in conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE name = 'reserva'").scalar()
+        indices = set(conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'reserva'").scalars())
+        assert {"ix_reserva_data_id", "ix_reserva_sala_data_inicio"} <= indices
+
+    with Session(banco) as session:
+        assert session.get(Reserva, 3).status == StatusReserva.PENDENTE
+        assert nova_reserva(session, usuario_id, 1).id == 6
+
+
+def test_reserva_com_chave_fora_so_e_arquivada_apos_a_devolucao(banco):
+    """Uma reserva encerrada cuja chave não voltou continua na tabela enquanto a posse apontar para ela."""
+    usuario_id = criar_usuario("usuario@teste.com")
+    with Session(banco) as session:
+        sala = Sala(nome="Sala 1", capacidade=10)
+        session.add(sala)
+        session.commit()
+        sala_id, reserva_id = sala.id, nova_reserva(session, usuario_id, sala.id).id
+        evento = EventoChave(tipo=TipoEventoChave.RETIRADA, sala_id=sala_id, reserva_id=reserva_id,
+                             usuario_id=usuario_id, registrado_por=usuario_id, momento=datetime(2020, 1, 6, 8))
+        session.add(evento)
+        session.flush()
+        session.add(PosseChave(sala_id=sala_id, usuario_id=usuario_id, reserva_id=reserva_id, evento_id=evento.id,
+                               retirada_em=datetime(2020, 1, 6, 8), devolver_ate=datetime(2020, 1, 6, 9)))
+        session.commit()
+
+        assert arquivar_lote(session, AGORA, 100, horizonte_dias=30) == 0
+        assert session.get(Reserva, reserva_id) is not None
+
+        session.delete(session.get(PosseChave, sala_id))
+        session.commit()
+        assert arquivar_lote(session, AGORA, 100, horizonte_dias=30) == 1
+        assert session.get(ReservaArquivada, reserva_id) is not None
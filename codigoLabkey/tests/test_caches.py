@@ -0,0 +1,21 @@
+from sqlmodel import Session
+
+from caches import incrementar_versao_cache, versao_cache
+from database import iniciar_escrita
+
+
+def test_incrementar_versao_cria_o_nome_e_depois_incrementa(banco):
+    """O primeiro incremento cria a versão 1; os seguintes, na mesma transação ou em outra, somam."""
+    with Session(banco) as session, Session(banco) as outra:
+        # A outra sessão viu o nome ausente antes de a primeira gravá-lo
+        assert versao_cache(outra, "novo") == 0
+
+        iniciar_escrita(session)
+        assert incrementar_versao_cache(session, "novo") == 1
+        assert incrementar_versao_cache(session, "novo") == 2
+        session.commit()
+
+        iniciar_escrita(outra)
+        assert incrementar_versao_cache(outra, "novo") == 3
+        outra.commit()
+        assert versao_cache(outra, "novo") == 3
@@ -0,0 +1,82 @@
+from contextlib import contextmanager
+from datetime import date, time, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+import database
+from importacao import importar
+from models.models import Reserva, Sala, TipoUsuario, Usuario
+from tests.conftest import criar_usuario
+
+
+@contextmanager
+def contar_selects():
+    """Conta os SELECTs emitidos pelo engine síncrono dentro do bloco."""
+    selects = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            selects.append(statement)
+
+    event.listen(database.engine, "before_cursor_execute", contar)
+    try:
+        yield selects
+    finally:
+        event.remove(database.engine, "before_cursor_execute", contar)
+
+
+def adicionar_reservas(quantidade: int):
+    """Reservas espalhadas por 5 salas e 10 usuários distintos (criados na primeira chamada)."""
+    with Session(database.engine) as session:
+        vazio = session.exec(select(Sala.id)).first() is None
+    if vazio:
+        for i in range(10):
+            criar_usuario(f"usuario{i}@teste.com")
+        with Session(database.engine) as session:
+            session.add_all(Sala(nome=f"Sala {i}", capacidade=10) for i in range(5))
+            session.commit()
+
+    with Session(database.engine) as session:
+        database.iniciar_escrita(session)
+        salas = session.exec(select(Sala.id)).all()
+        usuarios = session.exec(select(Usuario.id).where(Usuario.tipo == TipoUsuario.COMUM)).all()
+        inicio = len(session.exec(select(Reserva.id)).all())
+        session.add_all(
+            Reserva(data=date(2030, 1, 7) + timedelta(days=i // 10), hora_inicio=time(8 + i % 10), hora_fim=time(9 + i % 10),
+                    usuario_id=usuarios[i % len(usuarios)], sala_id=salas[i % len(salas)])
+            for i in range(inicio, inicio + quantidade)
+        )
+        session.commit()
+
+
+@pytest.mark.parametrize("caminho", ["/reservas?limite=200", "/api/v1/admin/reservas?limite=200"])
+def test_listagem_nao_faz_uma_consulta_por_reserva(cliente_admin, caminho):
+    """A listagem de 10 ou de 100 reservas (com nomes de sala e usuário) faz os mesmos SELECTs."""
+    contagens = {}
+    for total, novas in ((10, 10), (100, 90)):
+        adicionar_reservas(novas)
+        # A primeira requisição aquece os caches (catálogo de salas, autorização)
+        assert cliente_admin.get(caminho).status_code == 200
+        with contar_selects() as selects:
+            resposta = cliente_admin.get(caminho)
+        assert resposta.status_code == 200
+        contagens[total] = len(selects)
+
+    assert len(cliente_admin.get("/api/v1/admin/reservas?limite=200").json()["reservas"]) == 100
+    assert contagens[10] == contagens[100]
+
+
+@pytest.mark.parametrize("caminho", ["/reservas", "/api/v1/admin/reservas"])
+def test_listagem_muda_de_etag_quando_um_usuario_e_renomeado(cliente_admin, caminho):
+    """A listagem mostra o nome do usuário: renomeá-lo (importação) invalida a ETag."""
+    adicionar_reservas(1)
+    etag = cliente_admin.get(caminho).headers["etag"]
+    assert cliente_admin.get(caminho, headers={"If-None-Match": etag}).status_code == 304
+
+    importar("usuarios", [(1, {"nome": "Nome Novo", "email": "usuario0@teste.com"})])
+
+    resposta = cliente_admin.get(caminho, headers={"If-None-Match": etag})
+    assert resposta.status_code == 200
+    assert "Nome Novo" in resposta.text
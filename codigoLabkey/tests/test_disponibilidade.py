@@ -0,0 +1,74 @@
+from datetime import date, time, timedelta
+
+from sqlmodel import Session
+
+from caches import incrementar_versao_cache, VERSAO_RESERVAS
+from disponibilidade import GradeOcupacao
+from models.models import Reserva, Sala, StatusReserva
+from tests.conftest import criar_usuario
+
+DIA = date(2030, 1, 7)
+
+
+def preparar(banco):
+    usuario_id = criar_usuario("usuario@teste.com")
+    with Session(banco) as session:
+        salas = [Sala(nome=f"Sala {i}", capacidade=10) for i in (1, 2)]
+        session.add_all(salas)
+        session.commit()
+        for sala in salas:
+            session.refresh(sala)
+        return usuario_id, [Sala(**s.model_dump()) for s in salas]
+
+
+def gravar_reserva(banco, usuario_id: int, sala_id: int, dia: date = DIA) -> tuple:
+    """Grava uma reserva aprovada como outro processo faria (sem passar pela grade deste)."""
+    with Session(banco) as session:
+        reserva = Reserva(data=dia, hora_inicio=time(8), hora_fim=time(10), status=StatusReserva.APROVADA,
+                          usuario_id=usuario_id, sala_id=sala_id)
+        session.add(reserva)
+        versao = incrementar_versao_cache(session, VERSAO_RESERVAS)
+        session.commit()
+        session.refresh(reserva)
+        return reserva, versao
+
+
+def livres(grade: GradeOcupacao, banco, salas, dias=(DIA,)) -> dict:
+    with Session(banco) as session:
+        resultado = grade.salas_livres(session, salas, list(dias), time(9), time(9, 30))
+    return {dia: [s.nome for s in salas_dia] for dia, salas_dia in resultado.items()}
+
+
+def test_alteracao_de_outro_processo_descarta_os_dias_carregados(banco):
+    usuario_id, salas = preparar(banco)
+    grade = GradeOcupacao()
+    assert livres(grade, banco, salas) == {DIA: ["Sala 1", "Sala 2"]}
+
+    gravar_reserva(banco, usuario_id, salas[0].id)
+    assert livres(grade, banco, salas) == {DIA: ["Sala 2"]}
+
+
+def test_alteracao_registrada_mantem_a_grade(banco):
+    usuario_id, salas = preparar(banco)
+    grade = GradeOcupacao()
+    livres(grade, banco, salas)
+
+    reserva, versao = gravar_reserva(banco, usuario_id, salas[1].id)
+    grade.registrar(reserva, versao)
+    assert grade.estatisticas()["versao"] == versao
+    assert livres(grade, banco, salas) == {DIA: ["Sala 1"]}
+    assert grade.estatisticas()["reservas"] == 1
+
+
+def test_grade_guarda_so_os_dias_mais_recentes(banco):
+    usuario_id, salas = preparar(banco)
+    dias = [DIA + timedelta(days=i) for i in range(3)]
+    for dia in dias:
+        gravar_reserva(banco, usuario_id, salas[0].id, dia)
+
+    grade = GradeOcupacao(max_dias=2)
+    assert livres(grade, banco, salas, dias) == {dia: ["Sala 2"] for dia in dias}
+    assert grade.estatisticas()["dias"] == 2
+    # O dia descartado volta a ser lido do banco quando consultado de novo
+    assert livres(grade, banco, salas, dias[:1]) == {dias[0]: ["Sala 2"]}
+    assert grade.estatisticas()["dias"] == 2
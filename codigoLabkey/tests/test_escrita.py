@@ -0,0 +1,41 @@
+from sqlmodel import Session, select, func
+
+from database import iniciar_escrita
+from models.models import Sala
+
+
+def test_escrita_depois_de_leitura_na_mesma_sessao(banco):
+    """
+    A sessão já leu (ex.: a autenticação) e outro escritor confirmou depois dessa leitura:
+    iniciar_escrita encerra a leitura antes do BEGIN IMMEDIATE, em vez de deixar o INSERT
+    promover a transação antiga, o que falharia com "database is locked".
+    """
+    with Session(banco) as session:
+        session.add(Sala(nome="Sala A", capacidade=10))
+        session.commit()
+
+    with Session(banco) as sessao_requisicao:
+        assert len(sessao_requisicao.exec(select(Sala)).all()) == 1
+
+        with Session(banco) as outro_escritor:
+            iniciar_escrita(outro_escritor)
+            outro_escritor.add(Sala(nome="Sala B", capacidade=20))
+            outro_escritor.commit()
+
+        iniciar_escrita(sessao_requisicao)
+        sessao_requisicao.add(Sala(nome="Sala C", capacidade=30))
+        sessao_requisicao.commit()
+
+    with Session(banco) as session:
+        assert session.exec(select(func.count()).select_from(Sala)).one() == 3
+
+
+def test_escrita_ja_iniciada_e_mantida(banco):
+    """Chamadas repetidas de iniciar_escrita na mesma transação não a encerram."""
+    with Session(banco) as session:
+        iniciar_escrita(session)
+        session.add(Sala(nome="Sala A", capacidade=10))
+        iniciar_escrita(session)
+        session.add(Sala(nome="Sala B", capacidade=20))
+        session.rollback()
+        assert session.exec(select(func.count()).select_from(Sala)).one() == 0
@@ -0,0 +1,121 @@
+"""
+Planos das consultas "quentes" (login, listagens, filtros, conflitos, grade de ocupação,
+exclusão de sala): cada caminho é executado num banco com dados sintéticos, o SQL que ele
+gera é capturado e o EXPLAIN QUERY PLAN de cada SELECT não pode ter varredura completa de
+tabela (SCAN sem índice). Assim um índice removido, ou uma consulta reescrita sem
+aproveitá-lo, aparece como falha de teste.
+"""
+import random
+from contextlib import contextmanager
+from datetime import date, time, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlmodel import Session, insert
+
+import servicos
+from conflitos import buscar_conflito, buscar_conflitos_em_lote
+from consultas import paginar_reservas, codificar_cursor
+from disponibilidade import GradeOcupacao
+from models.models import Usuario, Sala, Reserva, TipoUsuario, StatusReserva, FiltroReservas
+
+NUM_SALAS = 30
+NUM_USUARIOS = 300
+NUM_RESERVAS = 5000
+DIA_BASE = date(2025, 1, 1)
+
+
+def popular(engine):
+    """Dados sintéticos, com as estatísticas do planejador atualizadas (ANALYZE) como num banco em uso."""
+    aleatorio = random.Random(42)
+    with Session(engine) as session:
+        session.exec(insert(Usuario), params=[
+            {"nome": f"Usuário {i}", "email": f"u{i}@labkey.com", "tipo": TipoUsuario.COMUM, "senha_hash": "x"}
+            for i in range(NUM_USUARIOS)
+        ])
+        session.exec(insert(Sala), params=[{"nome": f"Sala {i}", "capacidade": 20} for i in range(NUM_SALAS)])
+        reservas = []
+        for _ in range(NUM_RESERVAS):
+            inicio = aleatorio.randrange(7, 21)
+            reservas.append({
+                "data": DIA_BASE + timedelta(days=aleatorio.randrange(730)),
+                "hora_inicio": time(inicio),
+                "hora_fim": time(inicio + 1),
+                "status": aleatorio.choice(list(StatusReserva)),
+                "sala_id": aleatorio.randrange(1, NUM_SALAS + 1),
+                "usuario_id": aleatorio.randrange(1, NUM_USUARIOS + 1),
+            })
+        session.exec(insert(Reserva), params=reservas)
+        session.commit()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+
+@contextmanager
+def capturar_selects(engine):
+    """Coleta (sql, parâmetros) de cada SELECT enviado ao driver enquanto o bloco executa."""
+    capturadas = []
+
+    def antes_de_executar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            capturadas.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", antes_de_executar)
+    try:
+        yield capturadas
+    finally:
+        event.remove(engine, "before_cursor_execute", antes_de_executar)
+
+
+def plano(engine, statement, parameters):
+    """Linhas 'detail' do EXPLAIN QUERY PLAN da consulta."""
+    with engine.connect() as conn:
+        cursor = conn.connection.cursor()
+        cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+        return [linha[3] for linha in cursor.fetchall()]
+
+
+def varreduras_completas(detalhes):
+    """Passos do plano que leem a tabela inteira (SCAN sem índice)."""
+    return [d for d in detalhes if d.startswith("SCAN ") and " USING " not in d]
+
+
+def excluir_sala_ocupada(session: Session):
+    # A sala tem reservas ativas: a exclusão para no SELECT de verificação (400)
+    try:
+        servicos.excluir_sala(session, 3)
+    except HTTPException:
+        session.rollback()
+
+
+CURSOR = codificar_cursor(DIA_BASE + timedelta(days=365), 10**9)
+SEMANA = [DIA_BASE + timedelta(days=i) for i in range(7)]
+
+CAMINHOS_QUENTES = {
+    "login por e-mail": lambda s: servicos.buscar_usuario_por_email(s, "u7@labkey.com"),
+    "listagem geral": lambda s: paginar_reservas(s),
+    "listagem geral com cursor": lambda s: paginar_reservas(s, cursor=CURSOR),
+    "minhas reservas": lambda s: paginar_reservas(s, FiltroReservas(usuario_id=7)),
+    "minhas reservas com cursor": lambda s: paginar_reservas(s, FiltroReservas(usuario_id=7), cursor=CURSOR),
+    "filtro por status": lambda s: paginar_reservas(s, FiltroReservas(status=StatusReserva.PENDENTE)),
+    "filtro por sala e período": lambda s: paginar_reservas(s, FiltroReservas(
+        sala_id=3, data_inicio=DIA_BASE, data_fim=DIA_BASE + timedelta(days=30))),
+    "conflito de horário": lambda s: buscar_conflito(s, 3, DIA_BASE, time(9), time(10)),
+    "conflitos em lote": lambda s: buscar_conflitos_em_lote(s, 3, SEMANA, time(9), time(10)),
+    "grade de ocupação": lambda s: GradeOcupacao().salas_livres(s, [], SEMANA, time(9), time(10)),
+    "exclusão de sala com reservas ativas": excluir_sala_ocupada,
+}
+
+
+@pytest.mark.parametrize("caminho", CAMINHOS_QUENTES)
+def test_consulta_quente_usa_indice(banco, caminho):
+    popular(banco)
+    with Session(banco) as session:
+        with capturar_selects(banco) as capturadas:
+            CAMINHOS_QUENTES[caminho](session)
+
+    assert capturadas, "o caminho não executou nenhum SELECT"
+    for statement, parameters in capturadas:
+        detalhes = plano(banco, statement, parameters)
+        assert not varreduras_completas(detalhes), f"{' '.join(statement.split())}\n" + "\n".join(detalhes)
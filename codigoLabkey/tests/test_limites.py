@@ -0,0 +1,58 @@
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+import limites
+from limites import EstadoCompartilhado, LimitadorTaxa
+
+
+@pytest.fixture
+def estado(tmp_path):
+    return EstadoCompartilhado(str(tmp_path / "limites.db"))
+
+
+def test_estado_compartilhado_e_consultado_fora_do_event_loop(estado, monkeypatch):
+    threads = []
+    consumir = estado.consumir
+
+    def consumir_registrando(*args):
+        threads.append(threading.current_thread().name)
+        return consumir(*args)
+
+    monkeypatch.setattr(estado, "consumir", consumir_registrando)
+    limitador = LimitadorTaxa("teste", rajada=2, por_minuto=1, estado=estado)
+
+    async def cenario():
+        await limitador.verificar("10.0.0.1")
+        await limitador.verificar("10.0.0.1")
+        with pytest.raises(HTTPException) as excecao:
+            await limitador.verificar("10.0.0.1")
+        return excecao.value
+
+    excecao = asyncio.run(cenario())
+    assert excecao.status_code == 429 and int(excecao.headers["Retry-After"]) > 0
+    assert len(threads) == 3 and all(nome.startswith("labkey-limites") for nome in threads)
+
+
+def test_contador_de_consultas_entre_threads(estado, monkeypatch):
+    monkeypatch.setattr(limites, "LIMPEZA_A_CADA", 7)
+    feitas = []
+
+    def consumir_varias():
+        for i in range(50):
+            try:
+                estado.consumir(f"chave-{i}", 10, 1.0)
+                feitas.append(i)
+            except sqlite3.OperationalError:
+                # Lock do arquivo ocupado além da espera curta: a consulta não foi contada
+                pass
+
+    threads = [threading.Thread(target=consumir_varias) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert next(estado._consultas) == len(feitas) + 1
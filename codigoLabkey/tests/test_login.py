@@ -0,0 +1,37 @@
+import hashlib
+import sqlite3
+import threading
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+import main
+from models.models import Usuario, TipoUsuario
+
+
+def test_login_com_hash_legado_enquanto_outro_escritor_segura_a_trava(banco):
+    """
+    O login com hash SHA-256 legado regrava a senha em bcrypt. Se outro escritor segura o
+    lock e confirma enquanto o login lê o usuário, a regravação deve esperar o lock (BEGIN
+    IMMEDIATE numa transação nova) em vez de falhar ao promover a leitura.
+    """
+    with Session(banco) as session:
+        session.add(Usuario(nome="Legado", email="legado@teste.com", tipo=TipoUsuario.COMUM,
+                            senha_hash=hashlib.sha256(b"segredo").hexdigest()))
+        session.commit()
+
+    with TestClient(main.app) as cliente:
+        outro_escritor = sqlite3.connect(banco.url.database, isolation_level=None, check_same_thread=False)
+        outro_escritor.execute("BEGIN IMMEDIATE")
+        outro_escritor.execute("UPDATE usuario SET nome = 'Legado (renomeado)' WHERE email = 'legado@teste.com'")
+        confirmar = threading.Timer(0.5, outro_escritor.execute, ("COMMIT",))
+        confirmar.start()
+        try:
+            resposta = cliente.post("/api/v1/login", json={"email": "legado@teste.com", "senha": "segredo"})
+        finally:
+            confirmar.join()
+            outro_escritor.close()
+
+    assert resposta.status_code == 200, resposta.text
+    with Session(banco) as session:
+        assert session.exec(select(Usuario.senha_hash).where(Usuario.email == "legado@teste.com")).one().startswith("$2")
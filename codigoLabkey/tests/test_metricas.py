@@ -0,0 +1,22 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+
+import metricas
+
+
+def test_comando_com_erro_nao_deixa_inicio_pendurado_na_conexao():
+    engine = create_engine("sqlite://")
+    metricas.instrumentar_engine(engine)
+    medicao = metricas.MedicaoRequisicao()
+    token = metricas._medicao.set(medicao)
+    try:
+        with engine.connect() as conn:
+            for _ in range(3):
+                with pytest.raises(OperationalError):
+                    conn.exec_driver_sql("SELECT * FROM tabela_inexistente")
+                conn.exec_driver_sql("SELECT 1")
+            assert not conn.info.get("inicio_consultas")
+    finally:
+        metricas._medicao.reset(token)
+    assert medicao.consultas == 3
@@ -0,0 +1,58 @@
+import asyncio
+import sqlite3
+
+import pytest
+from fastapi import HTTPException
+
+import config
+import database
+
+
+@pytest.fixture(params=["sync", "async"])
+def modo(request, monkeypatch):
+    """Roda o teste com a sessão síncrona e com a AsyncSession (engine assíncrono próprio)."""
+    if request.param == "sync":
+        yield request.param
+        return
+    engine_async = database.criar_engine(database.url, assincrono=True)
+    monkeypatch.setattr(config, "DB_MODO", "async")
+    monkeypatch.setattr(database, "engine_async", engine_async)
+    yield request.param
+    asyncio.run(engine_async.dispose())
+
+
+def test_excecao_na_rota_libera_o_lock_de_escrita(modo, cliente_admin, banco):
+    """Um 404 levantado depois do BEGIN IMMEDIATE não pode deixar o lock de escrita preso."""
+    resposta = cliente_admin.put("/api/v1/reservas/9999/status", json={"status": "Aprovada"})
+    assert resposta.status_code == 404
+
+    outro_escritor = sqlite3.connect(banco.url.database, isolation_level=None, timeout=1)
+    try:
+        outro_escritor.execute("BEGIN IMMEDIATE")
+        outro_escritor.execute("ROLLBACK")
+    finally:
+        outro_escritor.close()
+
+
+def test_sessao_e_fechada_quando_a_excecao_chega_na_dependencia(modo, banco):
+    """
+    O lock tem de ser liberado quando a exceção passa pela dependência, e não só quando o
+    coletor de lixo finalizar a sessão: aqui a exceção (e o seu traceback) continua viva,
+    como acontece quando ela é registrada no log ou guardada pelo middleware.
+    """
+    async def cenario():
+        dependencia = database.obter_sessao()
+        session = await dependencia.__anext__()
+        await database.executar(session, database.iniciar_escrita)
+        with pytest.raises(HTTPException) as excecao:
+            await dependencia.athrow(HTTPException(status_code=404))
+
+        outro_escritor = sqlite3.connect(banco.url.database, isolation_level=None, timeout=0.2)
+        try:
+            outro_escritor.execute("BEGIN IMMEDIATE")
+            outro_escritor.execute("ROLLBACK")
+        finally:
+            outro_escritor.close()
+        return excecao
+
+    asyncio.run(cenario())
@@ -0,0 +1,41 @@
+from datetime import date, time
+
+import pytest
+from sqlmodel import Session
+
+from models.models import Reserva, Sala, StatusReserva
+from tests.conftest import criar_usuario
+
+
+@pytest.fixture
+def reserva_id(banco):
+    usuario_id = criar_usuario("usuario@teste.com")
+    with Session(banco) as session:
+        sala = Sala(nome="Sala 1", capacidade=10)
+        session.add(sala)
+        session.commit()
+        reserva = Reserva(data=date(2030, 1, 7), hora_inicio=time(8), hora_fim=time(9), usuario_id=usuario_id, sala_id=sala.id)
+        session.add(reserva)
+        session.commit()
+        return reserva.id
+
+
+def status_atual(banco, reserva_id: int) -> StatusReserva:
+    with Session(banco) as session:
+        return session.get(Reserva, reserva_id).status
+
+
+@pytest.mark.parametrize("novo", [StatusReserva.EXPIRADA, StatusReserva.CONCLUIDA])
+def test_admin_nao_atribui_status_automaticos(cliente_admin, banco, reserva_id, novo):
+    resposta = cliente_admin.put(f"/api/v1/reservas/{reserva_id}/status", json={"status": novo.value})
+    assert resposta.status_code == 400
+
+    resposta = cliente_admin.put("/api/v1/admin/reservas/status", json={"status": novo.value, "ids": [reserva_id]})
+    assert resposta.status_code == 400
+    assert status_atual(banco, reserva_id) == StatusReserva.PENDENTE
+
+
+def test_admin_continua_aprovando(cliente_admin, banco, reserva_id):
+    resposta = cliente_admin.put(f"/api/v1/reservas/{reserva_id}/status", json={"status": "Aprovada"})
+    assert resposta.status_code == 200
+    assert status_atual(banco, reserva_id) == StatusReserva.APROVADA